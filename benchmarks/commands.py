@@ -0,0 +1,194 @@
+"""
+Benchmark suite for the repo_metrics commands, run against a local stand-in for the GitHub and
+DockerHub APIs (see fake_api.py) so no real requests are made. Reports the requests made, the wall
+time and the peak memory of each command for each number of repos
+
+github_download_stats and dockerhub_tag_stats only take a single repo, so they're scaled by giving
+that repo as many releases or tags as the number of repos instead
+
+Run with: python benchmarks/commands.py [--repos 1,100,10000] [--latency SECONDS]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_api import INSTALLATION_ID, FakeApi, FakeApiConfig  # noqa: E402 pylint: disable=C0413
+
+COMMANDS = ["get", "github_download_stats", "github_traffic_stats", "dockerhub_tag_stats"]
+OWNER = "benchmark"
+GITHUB_APP_CLIENT_ID = "benchmark_client_id"
+
+# Runs the CLI (with the arguments after the first one) and writes its peak memory use, in bytes, to
+# the file named by the first argument. The peak is read from /proc where it's available, since
+# on Linux ru_maxrss includes the memory of the benchmark process it was forked from
+CHILD_SCRIPT = """
+import resource
+import sys
+
+from repo_metrics.__main__ import main_entry
+
+try:
+    main_entry(sys.argv[2:], prog_name="repo_metrics")
+finally:
+    try:
+        with open("/proc/self/status", "r") as f:
+            peak_memory = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+    except FileNotFoundError:
+        # ru_maxrss is in bytes on macOS
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(sys.argv[1], "w") as f:
+        f.write(str(peak_memory))
+"""
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    The cost of one run of a command
+    """
+
+    command: str
+    repos: int
+    requests: int
+    wall_time: float
+    # In bytes
+    peak_memory: int
+
+
+def run_command(command: str, repos: int, latency: float, max_workers: int, work_dir: str) -> BenchmarkResult:
+    """
+    Run a command against a new fake API, in a new interpreter so its peak memory is its own
+
+    :param command: The name of the command
+    :param repos: The number of repos to run it for
+    :param latency: How long the fake API waits before each response, in seconds
+    :param max_workers: The maximum number of requests in flight at once
+    :param work_dir: A directory for the repo list, output and GitHub App credentials
+
+    :return: The cost of the run
+
+    :raises RuntimeError: If the command fails
+    """
+    config = FakeApiConfig(installation_repos=repos, latency=latency)
+    output = os.path.join(work_dir, f"{command}_{repos}.jsonl")
+    if command == "get":
+        repo_list = os.path.join(work_dir, f"repos_{repos}.txt")
+        with open(repo_list, "w") as f:
+            f.writelines(f"{OWNER}/repo{i},{OWNER}/repo{i}\n" for i in range(repos))
+        args = ["-r", repo_list, "-w", str(max_workers)]
+    elif command == "github_download_stats":
+        config.releases = repos
+        args = ["-gh", f"{OWNER}/repo0"]
+    elif command == "dockerhub_tag_stats":
+        config.tags = repos
+        args = ["-dh", f"{OWNER}/repo0", "-w", str(max_workers)]
+    else:
+        args = ["--org", OWNER, "-w", str(max_workers)]
+    args += ["-of", "jsonl", "-o", output]
+
+    with FakeApi(config) as api:
+        env = {
+            **os.environ,
+            "GITHUB_API_URL": api.url,
+            "DOCKERHUB_API_URL": api.url,
+            **get_github_app_env(work_dir),
+        }
+        for name in ["GITHUB_TOKEN", "REPO_METRICS_CACHE_DIR"]:
+            env.pop(name, None)
+        peak_memory_path = os.path.join(work_dir, "peak_memory.txt")
+        with open(os.path.join(work_dir, "log.txt"), "w+") as log:
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, "-c", CHILD_SCRIPT, peak_memory_path, "-q", command, *args],
+                env=env,
+                stderr=log,
+                check=False,
+            )
+            wall_time = time.perf_counter() - start
+            if process.returncode != 0:
+                log.seek(0)
+                raise RuntimeError(f"{command} failed for {repos} repos:\n{log.read()}")
+        requests = sum(api.requests.values())
+
+    with open(peak_memory_path, "r") as f:
+        peak_memory = int(f.read())
+    return BenchmarkResult(command, repos, requests, wall_time, peak_memory)
+
+
+def get_github_app_env(work_dir: str) -> dict:
+    """
+    Get the environment variables for the GitHub App credentials github_traffic_stats needs. If
+    cryptography is installed (which signing the JWT needs), a new private key is used, so the
+    installation token is created through the fake API. Otherwise, the installation token is put
+    in the token cache file, so no JWT is needed
+
+    :param work_dir: The directory to put the private key or token cache file in
+
+    :return: The environment variables
+    """
+    env = {"GITHUB_APP_CLIENT_ID": GITHUB_APP_CLIENT_ID}
+    try:
+        from cryptography.hazmat.primitives import serialization  # pylint: disable=C0415
+        from cryptography.hazmat.primitives.asymmetric import rsa  # pylint: disable=C0415
+    except ImportError:
+        cache_path = os.path.join(work_dir, "github_app_tokens.json")
+        expires_at = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)).timestamp()
+        with open(cache_path, "w") as f:
+            json.dump(
+                {
+                    GITHUB_APP_CLIENT_ID: {
+                        "installation_ids": {OWNER: INSTALLATION_ID},
+                        "installation_tokens": {
+                            str(INSTALLATION_ID): {"token": "fake_installation_token", "expires_at": expires_at}
+                        },
+                    }
+                },
+                f,
+            )
+        env["GITHUB_APP_TOKEN_CACHE_PATH"] = cache_path
+        return env
+
+    key_path = os.path.join(work_dir, "github_app_key.pem")
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )
+        )
+    env["GITHUB_APP_PRIVATE_KEY_PATH"] = key_path
+    env.pop("GITHUB_APP_TOKEN_CACHE_PATH", None)
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", default="1,100,10000", help="Comma-separated numbers of repos to run for")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help="Comma-separated commands to run")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the fake API waits before responding")
+    parser.add_argument("-w", "--max-workers", type=int, default=8, help="Maximum requests in flight at once")
+    args = parser.parse_args()
+
+    print(f"{'command':<24}{'repos':>8}{'requests':>10}{'wall time':>12}{'peak memory':>14}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for command in args.commands.split(","):
+            for repos in [int(repos) for repos in args.repos.split(",")]:
+                result = run_command(command, repos, args.latency, args.max_workers, work_dir)
+                print(
+                    f"{result.command:<24}{result.repos:>8}{result.requests:>10}{result.wall_time:>11.2f}s"
+                    f"{result.peak_memory / 2**20:>12.1f}MB",
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
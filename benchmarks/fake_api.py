@@ -0,0 +1,308 @@
+"""
+A local stand-in for the parts of the GitHub and DockerHub APIs that repo_metrics uses, so the
+commands can be run (and timed) without making real requests. Point repo_metrics at it with the
+GITHUB_API_URL and DOCKERHUB_API_URL environment variables
+"""
+
+import collections
+import datetime
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# GitHub's maximum page size, and the default when per_page isn't set
+MAX_PER_PAGE = 100
+DEFAULT_PER_PAGE = 30
+# How many days of traffic GitHub returns
+TRAFFIC_DAYS = 14
+INSTALLATION_ID = 1
+
+
+@dataclass
+class FakeApiConfig:
+    """
+    The shape of the data the fake API serves
+    """
+
+    # The number of repositories the GitHub App installation has access to (repo0, repo1, ...)
+    installation_repos: int = 1
+    # The number of repositories in each DockerHub namespace (repo0, repo1, ...)
+    namespace_repos: int = 1
+    # The number of tags in each DockerHub repository
+    tags: int = 3
+    # The number of releases in each repository
+    releases: int = 3
+    # The number of assets in each release
+    assets: int = 2
+    # How long to wait before sending each response, in seconds
+    latency: float = 0.0
+
+
+class FakeApi:
+    """
+    An HTTP server on localhost serving the GitHub REST API endpoints for repositories, releases,
+    traffic, installations and installation repositories, and the DockerHub repository, namespace
+    repositories and tags endpoints.
+    It counts the requests made to each endpoint
+    """
+
+    def __init__(self, config: FakeApiConfig | None = None):
+        """
+        Constructor for the FakeApi class
+
+        :param config: The shape of the data to serve
+        """
+        self.config = config if config else FakeApiConfig()
+        self.requests: collections.Counter = collections.Counter()
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.__server.daemon_threads = True
+        self.__server.api = self
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the server, to use as both GITHUB_API_URL and DOCKERHUB_API_URL
+        """
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """
+        Start serving requests in a background thread
+        """
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving requests
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def __enter__(self) -> "FakeApi":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def count(self, endpoint: str) -> None:
+        """
+        Count a request to an endpoint
+        """
+        with self.__lock:
+            self.requests[endpoint] += 1
+
+    def route(self, method: str, path: str, query: dict) -> tuple[str, int, object, dict]:
+        """
+        Get the response for a request
+
+        :param method: The HTTP method
+        :param path: The path of the URL
+        :param query: The parsed query string
+
+        :return: The name of the endpoint, the status code, the body (to send as json) and any
+        extra headers
+        """
+        for endpoint, endpoint_method, pattern, handler in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and method == endpoint_method:
+                status, body, headers = handler(self, query, *match.groups())
+                return endpoint, status, body, headers
+        return "not_found", 404, {"message": "Not Found"}, {}
+
+    def get_repo(self, query, owner, repo):
+        """GET /repos/{owner}/{repo}"""
+        return (
+            200,
+            {
+                "name": repo,
+                "full_name": f"{owner}/{repo}",
+                "forks": 10,
+                "forks_count": 10,
+                "open_issues": 5,
+                "open_issues_count": 5,
+                "watchers": 100,
+                "watchers_count": 100,
+                "stargazers_count": 100,
+                "subscribers_count": 20,
+            },
+            {},
+        )
+
+    def get_releases(self, query, owner, repo):
+        """GET /repos/{owner}/{repo}/releases, paginated"""
+        releases = [
+            {
+                "tag_name": f"v{i}",
+                "assets": [{"name": f"asset{j}", "download_count": i + j} for j in range(self.config.assets)],
+            }
+            for i in range(self.config.releases)
+        ]
+        return self.__paginate(f"/repos/{owner}/{repo}/releases", query, releases, lambda page: page)
+
+    def get_traffic(self, query, owner, repo, kind):
+        """GET /repos/{owner}/{repo}/traffic/clones and /traffic/views, for the last TRAFFIC_DAYS days"""
+        today = datetime.datetime.combine(datetime.datetime.now(datetime.timezone.utc), datetime.time.min)
+        days = [
+            {
+                "timestamp": (today - datetime.timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "count": 10 + i,
+                "uniques": 1 + i,
+            }
+            for i in range(TRAFFIC_DAYS)
+        ]
+        return 200, {"count": sum(day["count"] for day in days), "uniques": TRAFFIC_DAYS, kind: days}, {}
+
+    def get_installation(self, query, *owner_and_repo):
+        """GET /repos/{owner}/{repo}/installation and /users/{owner}/installation"""
+        return 200, {"id": INSTALLATION_ID}, {}
+
+    def create_installation_token(self, query, installation_id):
+        """POST /app/installations/{installation_id}/access_tokens"""
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+        return 201, {"token": "fake_installation_token", "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")}, {}
+
+    def get_installation_repos(self, query):
+        """GET /installation/repositories, paginated"""
+        repos = [{"name": f"repo{i}"} for i in range(self.config.installation_repos)]
+        return self.__paginate(
+            "/installation/repositories",
+            query,
+            repos,
+            lambda page: {"total_count": len(repos), "repositories": page},
+        )
+
+    def get_dockerhub_repo(self, query, namespace, repo):
+        """GET /v2/repositories/{namespace}/{repo} (DockerHub)"""
+        return 200, {"namespace": namespace, "name": repo, "star_count": 50, "pull_count": 100000}, {}
+
+    def get_dockerhub_namespace_repos(self, query, namespace):
+        """GET /v2/repositories/{namespace}/ (DockerHub), paginated"""
+        return self.__paginate_dockerhub(
+            f"/v2/repositories/{namespace}/",
+            query,
+            self.config.namespace_repos,
+            lambda i: self.get_dockerhub_repo(query, namespace, f"repo{i}")[1],
+        )
+
+    def get_dockerhub_tags(self, query, namespace, repo):
+        """GET /v2/repositories/{namespace}/{repo}/tags (DockerHub), paginated"""
+        return self.__paginate_dockerhub(
+            f"/v2/repositories/{namespace}/{repo}/tags",
+            query,
+            self.config.tags,
+            lambda i: {
+                "name": f"v{i}",
+                "full_size": 100000000 + i,
+                "last_updated": "2024-01-01T00:00:00.000000Z",
+                "tag_last_pulled": "2024-01-02T00:00:00.000000Z",
+                "tag_last_pushed": "2024-01-01T00:00:00.000000Z",
+                "digest": f"sha256:{i:064x}",
+                "images": [{"architecture": "amd64", "os": "linux", "size": 100000000 + i}],
+            },
+        )
+
+    def __paginate(self, path, query, items, make_body):
+        """
+        Get a page of a list, with a Link header like GitHub's for the next and last pages
+        """
+        page = int(query.get("page", ["1"])[0])
+        per_page = min(int(query.get("per_page", [str(DEFAULT_PER_PAGE)])[0]), MAX_PER_PAGE)
+        last_page = max((len(items) + per_page - 1) // per_page, 1)
+        headers = {}
+        if last_page > 1:
+            links = []
+            if page < last_page:
+                links.append(f'<{self.url}{path}?page={page + 1}&per_page={per_page}>; rel="next"')
+            links.append(f'<{self.url}{path}?page={last_page}&per_page={per_page}>; rel="last"')
+            headers["Link"] = ", ".join(links)
+        return 200, make_body(items[(page - 1) * per_page : page * per_page]), headers
+
+    def __paginate_dockerhub(self, path, query, count, make_item):
+        """
+        Get a page of a DockerHub list, with the total count and the URLs of the next and previous
+        pages in the body. make_item makes the item at an index, so the whole list isn't built
+        """
+        page = int(query.get("page", ["1"])[0])
+        page_size = min(int(query.get("page_size", ["10"])[0]), MAX_PER_PAGE)
+        start = (page - 1) * page_size
+        end = min(page * page_size, count)
+        if start >= count and page > 1:
+            return 404, {"message": "object not found"}, {}
+        url = f"{self.url}{path}"
+        return (
+            200,
+            {
+                "count": count,
+                "next": f"{url}?page={page + 1}&page_size={page_size}" if end < count else None,
+                "previous": f"{url}?page={page - 1}&page_size={page_size}" if page > 1 else None,
+                "results": [make_item(i) for i in range(start, end)],
+            },
+            {},
+        )
+
+
+# The endpoints, as (name, method, path pattern, handler)
+ROUTES = [
+    ("repo", "GET", r"/repos/([^/]+)/([^/]+)", FakeApi.get_repo),
+    ("releases", "GET", r"/repos/([^/]+)/([^/]+)/releases", FakeApi.get_releases),
+    ("traffic", "GET", r"/repos/([^/]+)/([^/]+)/traffic/(clones|views)", FakeApi.get_traffic),
+    ("installation", "GET", r"/repos/([^/]+)/([^/]+)/installation", FakeApi.get_installation),
+    ("installation", "GET", r"/users/([^/]+)/installation", FakeApi.get_installation),
+    ("installation_token", "POST", r"/app/installations/([^/]+)/access_tokens", FakeApi.create_installation_token),
+    ("installation_repos", "GET", r"/installation/repositories", FakeApi.get_installation_repos),
+    ("dockerhub_repo", "GET", r"/v2/repositories/([^/]+)/([^/]+)/?", FakeApi.get_dockerhub_repo),
+    ("dockerhub_tags", "GET", r"/v2/repositories/([^/]+)/([^/]+)/tags/?", FakeApi.get_dockerhub_tags),
+    ("dockerhub_namespace_repos", "GET", r"/v2/repositories/([^/]+)/?", FakeApi.get_dockerhub_namespace_repos),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Handles each request to the fake API
+    """
+
+    # Keep connections alive, like the real APIs, so the client's connection pooling is exercised
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, so don't wait to coalesce them
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.__respond("GET")
+
+    def do_POST(self):  # pylint: disable=C0103
+        self.__respond("POST")
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+    def __respond(self, method: str) -> None:
+        api: FakeApi = self.server.api
+        # Read any request body, so it isn't mistaken for the next request on the connection
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urlparse(self.path)
+        endpoint, status, body, headers = api.route(method, url.path, parse_qs(url.query))
+        api.count(endpoint)
+        if api.config.latency:
+            time.sleep(api.config.latency)
+
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        # A healthy rate limit budget, so requests aren't held back
+        self.send_header("X-RateLimit-Limit", "5000")
+        self.send_header("X-RateLimit-Remaining", "5000")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
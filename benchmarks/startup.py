@@ -0,0 +1,41 @@
+"""
+Benchmark for how long the repo_metrics CLI takes to start, measured by running
+`repo_metrics version` in a new interpreter (so nothing is already imported) a number of times
+
+Run with: python benchmarks/startup.py [-n RUNS]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_startup(runs: int) -> list[float]:
+    """
+    Time cold starts of the CLI
+
+    :param runs: The number of times to start it
+
+    :return: The time each start took, in seconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "repo_metrics", "-q", "version"], check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--runs", type=int, default=20, help="The number of times to start the CLI")
+    args = parser.parse_args()
+
+    times = time_startup(args.runs)
+    print(f"repo_metrics version: median {statistics.median(times) * 1000:.1f}ms, min {min(times) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
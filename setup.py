@@ -21,6 +21,7 @@ setup(
     """.split(
         "\n"
     ),
+    extras_require={"parquet": ["pyarrow"], "zstd": ["zstandard"]},
     tests_require=["coverage", "pytest"],
     python_requires=">=3.10",
     packages=find_packages("src"),
@@ -1,13 +1,8 @@
+import importlib
 import logging
 from sys import argv
 
 import click
-from dotenv import load_dotenv
-
-# porcelain
-from .get import command as get
-from .github_download_stats import command as github_download_stats
-from .github_traffic_stats import command as github_traffic_stats
 
 # Version number is automatically set via bumpversion.
 # DO NOT MODIFY:
@@ -16,8 +11,33 @@ __version__ = "0.0.1"
 # Create a logger for this module:
 LOGGER = logging.getLogger(__name__)
 
+# Update with new sub-commands. Each one is the module that defines it as `main`, which is only
+# imported when the sub-command is run, so starting the CLI doesn't import requests, jwt and the
+# rest of the dependencies of every sub-command
+LAZY_SUBCOMMANDS = {
+    "dockerhub_tag_stats": "repo_metrics.dockerhub_tag_stats.command",
+    "get": "repo_metrics.get.command",
+    "github_download_stats": "repo_metrics.github_download_stats.command",
+    "github_traffic_stats": "repo_metrics.github_traffic_stats.command",
+}
+
+
+class LazyGroup(click.Group):
+    """
+    A click group that imports the modules of the sub-commands in LAZY_SUBCOMMANDS when they're
+    needed, instead of when the group is defined
+    """
+
+    def list_commands(self, ctx):
+        return sorted(list(super().list_commands(ctx)) + list(LAZY_SUBCOMMANDS))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in LAZY_SUBCOMMANDS:
+            return importlib.import_module(LAZY_SUBCOMMANDS[cmd_name]).main
+        return super().get_command(ctx, cmd_name)
 
-@click.group(name="repo_metrics")
+
+@click.group(name="repo_metrics", cls=LazyGroup)
 @click.option(
     "-q",
     "--quiet",
@@ -38,13 +58,18 @@ LOGGER = logging.getLogger(__name__)
     flag_value=logging.NOTSET,
     help="Highest level logging for debugging",
 )
-def main_entry(verbosity):
+@click.pass_context
+def main_entry(ctx, verbosity):
     # Set up our log verbosity
     from . import log  # pylint: disable=C0415
 
     log.configure_logging(verbosity)
 
-    load_dotenv()
+    # The .env file only has settings for the sub-commands that get metrics
+    if ctx.invoked_subcommand in LAZY_SUBCOMMANDS:
+        from dotenv import load_dotenv  # pylint: disable=C0415
+
+        load_dotenv()
 
     # Log our command-line and log level so we can have it in the log file:
     LOGGER.info("Invoked by: %s", " ".join(argv))
@@ -57,11 +82,5 @@ def version():
     LOGGER.info("repo_metrics: %s", __version__)
 
 
-# Update with new sub-commands:
-main_entry.add_command(get.main)
-main_entry.add_command(github_download_stats.main)
-main_entry.add_command(github_traffic_stats.main)
-
-
 if __name__ == "__main__":
     main_entry()  # pylint: disable=E1120
@@ -0,0 +1,144 @@
+"""
+Defines a command for getting the stats for each tag of a dockerhub repository
+"""
+
+import logging
+from datetime import datetime
+
+import click
+
+from repo_metrics.metrics import DockerHubMetricsHelper, FetchEngine
+from repo_metrics.metrics.concurrency import DEFAULT_MAX_WORKERS
+from repo_metrics.output import CsvOutput, JsonLinesOutput, JsonOutput, Output, OutputType, ParquetOutput, SqliteOutput
+from repo_metrics.profiler import Profiler
+
+LOGGER = logging.getLogger(__name__)
+
+# The fields of each tag to include in its row, as named by DockerHub
+TAG_FIELDS = ["tag_last_pulled", "tag_last_pushed", "last_updated", "full_size", "digest"]
+
+
+@click.command(name="dockerhub_tag_stats")
+@click.option(
+    "--dockerhub-repo",
+    "-dh",
+    required=True,
+    type=str,
+    help="The dockerhub repository to get tag stats for, in the form {owner}/{repo}",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=str,
+    default="/dev/stdout",
+    help="The output file",
+)
+@click.option(
+    "--output-format",
+    "-of",
+    type=click.Choice([o.value for o in OutputType]),
+    default=OutputType.JSON.value,
+    help="The output format. Parquet output is written all at once at the end, so every tag's row is held in memory "
+    "until then",
+)
+@click.option(
+    "--append",
+    "-a",
+    is_flag=True,
+    help="Append to the output file, if the selected format supports it",
+)
+@click.option(
+    "--include-timestamp",
+    "-t",
+    is_flag=True,
+    help="Include a timestamp in the output",
+)
+@click.option(
+    "--max-workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    help="The maximum number of API requests to have in flight at once",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Log a summary of the requests made (counts, bytes and latencies for each endpoint) and the time spent "
+    "writing the output",
+)
+@click.option(
+    "--profile-output",
+    required=False,
+    type=str,
+    help="Write the profile summary to this file as json (implies --profile)",
+)
+def main(
+    dockerhub_repo: str,
+    output: str,
+    output_format: str,
+    append: bool,
+    include_timestamp: bool,
+    max_workers: int,
+    profile: bool,
+    profile_output: str,
+):
+    """
+    Get the stats (last pulled and pushed, and size) for each tag of a dockerhub repository
+    """
+    # The repo, tag and timestamp are the key in the database, so they're always included for sqlite
+    include_key = output_format == "sqlite"
+    timestamp = datetime.now().isoformat() if include_timestamp or include_key else None
+
+    owner, repo = dockerhub_repo.split("/")
+    helper = DockerHubMetricsHelper(engine=FetchEngine(max_workers))
+    profiler = Profiler() if profile or profile_output else None
+    if profiler:
+        profiler.attach(helper.session)
+
+    output_writer: Output = None
+    if output_format == "csv":
+        output_writer = CsvOutput(output, append)
+    elif output_format == "jsonl":
+        output_writer = JsonLinesOutput(output, append)
+    elif output_format == "parquet":
+        output_writer = ParquetOutput(output, append)
+    elif output_format == "sqlite":
+        output_writer = SqliteOutput(output, "dockerhub_tag_stats", ["repo", "tag", "date_and_time"])
+    else:
+        output_writer = JsonOutput(output, append)
+    if profiler:
+        output_writer = profiler.wrap_output(output_writer)
+
+    # The tags are written as their pages arrive, so only a few pages are held in memory at once
+    # (except with Parquet output, which is written all at once since a file's schema can't change
+    # after its first row group). The first page is fetched before the output is opened, so a
+    # missing repo leaves the output untouched
+    tags = helper.get_tags(owner, repo)
+    with output_writer:
+        for tag in tags:
+            output_writer.write_row(build_row(dockerhub_repo if include_key else None, tag, timestamp))
+
+    if profiler:
+        profiler.report(profile_output)
+
+
+def build_row(dockerhub_repo: str | None, tag: dict, timestamp: str | None) -> dict:
+    """
+    Build the row for a tag
+
+    :param dockerhub_repo: The dockerhub repository, in the form {owner}/{repo}, or None to leave it
+    out
+    :param tag: The info for the tag
+    :param timestamp: The timestamp to include in the row, or None to leave it out
+
+    :return: The row, with the tag's name under "tag" and its TAG_FIELDS
+    """
+    row = {}
+    if timestamp:
+        row["date_and_time"] = timestamp
+    if dockerhub_repo:
+        row["repo"] = dockerhub_repo
+    row["tag"] = tag["name"]
+    for field in TAG_FIELDS:
+        row[field] = tag.get(field)
+    return row
@@ -2,16 +2,27 @@
 Defines a command for getting top-level metrics for a repository
 """
 
+import itertools
 import logging
 from datetime import datetime
+from typing import IO, List, Tuple
 
 import click
 
-from repo_metrics.metrics import DockerHubMetricsHelper, GitHubMetricsHelper
-from repo_metrics.output import CsvOutput, JsonOutput, Output, OutputConfig, OutputType, preprocess
+from repo_metrics.metrics import DockerHubMetricsHelper, FetchEngine, GitHubGraphQLMetricsHelper, GitHubMetricsHelper
+from repo_metrics.metrics.concurrency import DEFAULT_MAX_WORKERS
+from repo_metrics.metrics.session import create_session
+from repo_metrics.output import CsvOutput, JsonLinesOutput, JsonOutput, ParquetOutput, SqliteOutput, preprocess
+from repo_metrics.output.config import OutputConfig
+from repo_metrics.output.output_type import Output, OutputType
+from repo_metrics.profiler import Profiler
 
 LOGGER = logging.getLogger(__name__)
 
+# The number of repos in a batch to fetch before writing their rows, which bounds how many of the
+# API responses are held in memory at once
+STREAM_CHUNK_SIZE = 100
+
 
 @click.command(name="get")
 @click.option(
@@ -28,6 +39,23 @@ LOGGER = logging.getLogger(__name__)
     type=str,
     help="The dockerhub repository to get metrics for, in the form {owner}/{repo}",
 )
+@click.option(
+    "--repo-list",
+    "-r",
+    required=False,
+    type=click.File("r"),
+    help="A file (or - for stdin) listing the repositories to get metrics for, one per line in the form "
+    "{github_owner}/{github_repo}[,{dockerhub_owner}/{dockerhub_repo}]. Either repository may be left empty. "
+    "Cannot be used with --github-repo or --dockerhub-repo.",
+)
+@click.option(
+    "--dockerhub-namespace",
+    "-dhn",
+    required=False,
+    type=str,
+    help="A dockerhub namespace (user or organization) to get metrics for every repository in, with the repository "
+    "name in each row. Cannot be used with the other repository options.",
+)
 @click.option(
     "--output",
     "-o",
@@ -61,10 +89,56 @@ LOGGER = logging.getLogger(__name__)
     default="just_metrics",
     help="Configuration to use. Use 'just_metrics' for just metrics that change over time, 'everything' for all available fields from the APIs, or a path to a json file with a custom configuration.",
 )
-def main(github_repo, dockerhub_repo, output, output_format, append, include_timestamp, config):
+@click.option(
+    "--max-workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    help="The maximum number of API requests to have in flight at once",
+)
+@click.option(
+    "--backend",
+    "-b",
+    type=click.Choice(["rest", "graphql"]),
+    default="rest",
+    help="The GitHub API to use. The GraphQL API gets the metrics for many repos in one request, but needs a "
+    "GitHub token and only provides the fields in the just_metrics config",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Log a summary of the requests made (counts, bytes and latencies for each endpoint) and the time spent "
+    "writing the output",
+)
+@click.option(
+    "--profile-output",
+    required=False,
+    type=str,
+    help="Write the profile summary to this file as json (implies --profile)",
+)
+def main(
+    github_repo,
+    dockerhub_repo,
+    repo_list,
+    dockerhub_namespace,
+    output,
+    output_format,
+    append,
+    include_timestamp,
+    config,
+    max_workers,
+    backend,
+    profile,
+    profile_output,
+):
     """
-    Get metrics for the specified repository
+    Get metrics for the specified repository, or for every repository in a repo list or dockerhub namespace
     """
+    if repo_list and (github_repo or dockerhub_repo):
+        raise click.UsageError("--repo-list cannot be used with --github-repo or --dockerhub-repo")
+    if dockerhub_namespace and (github_repo or dockerhub_repo or repo_list):
+        raise click.UsageError("--dockerhub-namespace cannot be used with the other repository options")
+
     if config == "just_metrics":
         config = OutputConfig.just_metrics()
     elif config == "everything":
@@ -72,40 +146,194 @@ def main(github_repo, dockerhub_repo, output, output_format, append, include_tim
     else:
         config = OutputConfig.load_from_json_file(config)
 
+    # Use the same timestamp for every row so a batch is recorded as a single snapshot. The repos and
+    # timestamp are the key in the database, so they're always included for sqlite
+    include_key = output_format == "sqlite"
+    timestamp = datetime.now().isoformat() if include_timestamp or include_key else None
+
+    # The helpers (and the engine and session they make requests through) are shared by every repo
+    # so a batch runs inside a single process and reuses the same connections
+    engine = FetchEngine(max_workers)
+    session = create_session(pool_size=max_workers)
+    github_helper_class = GitHubGraphQLMetricsHelper if backend == "graphql" else GitHubMetricsHelper
+    github_helper = github_helper_class(engine=engine, session=session)
+    dockerhub_helper = DockerHubMetricsHelper(engine=engine, session=session)
+    profiler = Profiler() if profile or profile_output else None
+    if profiler:
+        profiler.attach(session)
+
+    if dockerhub_namespace:
+        repos = []
+    elif repo_list:
+        repos = parse_repo_list(repo_list)
+    else:
+        repos = [(github_repo, dockerhub_repo)]
+
+    output_writer: Output = None
+    if output_format == "csv":
+        output_writer = CsvOutput(output, append)
+    elif output_format == "jsonl":
+        output_writer = JsonLinesOutput(output, append)
+    elif output_format == "parquet":
+        output_writer = ParquetOutput(output, append)
+    elif output_format == "sqlite":
+        output_writer = SqliteOutput(output, "get", ["github_repo", "dockerhub_repo", "date_and_time"])
+    else:
+        output_writer = JsonOutput(output, append)
+    if profiler:
+        output_writer = profiler.wrap_output(output_writer)
+
+    failed_repos = []
+
+    def get_rows(chunk: List[Tuple[str | None, str | None]]) -> List[dict]:
+        # Get the data for all the github repos and all the dockerhub repos in the chunk at once, so
+        # the helpers can batch their requests. The github helper is told which fields are
+        # configured so it can skip requests that don't contribute to them
+        github_repos = [tuple(github_repo.split("/")) for github_repo, _ in chunk if github_repo]
+        dockerhub_repos = [tuple(dockerhub_repo.split("/")) for _, dockerhub_repo in chunk if dockerhub_repo]
+        github_results, dockerhub_results = engine.map(
+            lambda fetch: fetch(),
+            [
+                lambda: github_helper.get_repo_info_batch(github_repos, config.github_fields),
+                lambda: dockerhub_helper.get_repo_info_batch(dockerhub_repos),
+            ],
+        )
+        github_results = iter(github_results)
+        dockerhub_results = iter(dockerhub_results)
+
+        rows = []
+        for github_repo, dockerhub_repo in chunk:
+            github_data = next(github_results) if github_repo else None
+            dockerhub_data = next(dockerhub_results) if dockerhub_repo else None
+            errors = [data for data in [github_data, dockerhub_data] if isinstance(data, Exception)]
+            if errors:
+                if not repo_list:
+                    raise errors[0]
+                # Don't let one bad repo throw away the metrics for the rest of the batch
+                LOGGER.error("Failed to get metrics for %s,%s: %s", github_repo or "", dockerhub_repo or "", errors[0])
+                failed_repos.append(github_repo or dockerhub_repo)
+                continue
+            rows.append(
+                build_row(
+                    github_repo,
+                    github_data,
+                    dockerhub_repo,
+                    dockerhub_data,
+                    config,
+                    timestamp,
+                    include_repo_names=bool(repo_list) or include_key,
+                )
+            )
+        return rows
+
+    # Fetch the repos a chunk at a time, writing each chunk's rows as soon as they're ready, so only
+    # one chunk's API responses are held in memory and a crash keeps the rows already written. The
+    # first chunk is fetched before the output is opened, so a single repo that fails leaves the
+    # output untouched
+    chunks = (repos[i : i + STREAM_CHUNK_SIZE] for i in range(0, len(repos), STREAM_CHUNK_SIZE))
+    if dockerhub_namespace:
+        # Each page of the namespace's repositories has the metrics for up to 100 of them, so there's
+        # no need for a request per repository
+        first_rows = [
+            build_row(
+                None,
+                None,
+                f"{dockerhub_namespace}/{dockerhub_data['name']}",
+                dockerhub_data,
+                config,
+                timestamp,
+                include_repo_names=True,
+            )
+            for dockerhub_data in dockerhub_helper.get_namespace_repos(dockerhub_namespace)
+        ]
+    else:
+        first_rows = get_rows(next(chunks, []))
+    with output_writer:
+        for rows in itertools.chain([first_rows], map(get_rows, chunks)):
+            for row in rows:
+                output_writer.write_row(row)
+
+    if any(github_repo for github_repo, _ in repos):
+        github_helper.rate_limiter.log_usage()
+    if profiler:
+        profiler.report(profile_output)
+
+    if failed_repos:
+        raise click.ClickException(f"Failed to get metrics for {len(failed_repos)} repositories")
+
+
+def parse_repo_list(repo_list: IO[str]) -> List[Tuple[str | None, str | None]]:
+    """
+    Parse a repo list, where each line is in the form
+    {github_owner}/{github_repo}[,{dockerhub_owner}/{dockerhub_repo}]
+
+    Blank lines and lines starting with # are ignored.
+
+    :param repo_list: The file to read the repo list from
+
+    :return: A list of (github_repo, dockerhub_repo) tuples, with None for a repo that is not specified
+    """
+    repos = []
+    for line_number, line in enumerate(repo_list, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [part.strip() for part in line.split(",")]
+        if len(parts) > 2 or not any(parts):
+            raise click.BadParameter(f"Invalid entry on line {line_number}: {line}", param_hint="--repo-list")
+        github_repo = parts[0] or None
+        dockerhub_repo = (parts[1] or None) if len(parts) > 1 else None
+        repos.append((github_repo, dockerhub_repo))
+    return repos
+
+
+def build_row(
+    github_repo: str | None,
+    github_data: dict | None,
+    dockerhub_repo: str | None,
+    dockerhub_data: dict | None,
+    config: OutputConfig,
+    timestamp: str | None,
+    include_repo_names: bool = False,
+) -> dict:
+    """
+    Merge the metrics for a github and/or dockerhub repository into one row
+
+    :param github_repo: The github repository, in the form {owner}/{repo}, or None
+    :param github_data: The info for the github repository, or None
+    :param dockerhub_repo: The dockerhub repository, in the form {owner}/{repo}, or None
+    :param dockerhub_data: The info for the dockerhub repository, or None
+    :param config: The output config specifying which fields to include
+    :param timestamp: The timestamp to include in the row, or None to leave it out
+    :param include_repo_names: Whether to include the repository names in the row (so rows in a
+    batch can be told apart)
+
+    :return: The merged metrics for the repositories
+    """
     data_to_print = []
     data_to_print_labels = []
 
     # Include the timestamp if set, with some clever labelling so I don't need to special case it
-    if include_timestamp:
-        data_to_print.append({"time": datetime.now().isoformat()})
+    if timestamp:
+        data_to_print.append({"time": timestamp})
         data_to_print_labels.append("date_and_")
 
     if github_repo:
-        owner, repo = github_repo.split("/")
-        helper = GitHubMetricsHelper()
-        github_data = helper.get_repo_info(owner, repo)
         # Filter the fields if specified
         if config.github_fields:
             github_data = preprocess.filter(github_data, config.github_fields)
+        if include_repo_names:
+            github_data = {"repo": github_repo, **github_data}
         data_to_print.append(github_data)
         data_to_print_labels.append("github_")
 
     if dockerhub_repo:
-        owner, repo = dockerhub_repo.split("/")
-        helper = DockerHubMetricsHelper()
-        dockerhub_data = helper.get_repo_info(owner, repo)
         # Filter the fields if specified
         if config.dockerhub_fields:
             dockerhub_data = preprocess.filter(dockerhub_data, config.dockerhub_fields)
+        if include_repo_names:
+            dockerhub_data = {"repo": dockerhub_repo, **dockerhub_data}
         data_to_print.append(dockerhub_data)
         data_to_print_labels.append("dockerhub_")
 
-    repo_info = preprocess.merge(data_to_print, data_to_print_labels)
-
-    output_writer: Output = None
-    if output_format == "csv":
-        output_writer = CsvOutput(output, append)
-    else:
-        output_writer = JsonOutput(output, append)
-
-    output_writer.write([repo_info])
+    return preprocess.merge(data_to_print, data_to_print_labels)
@@ -7,8 +7,10 @@ from datetime import datetime
 
 import click
 
-from repo_metrics.metrics import GitHubMetricsHelper
-from repo_metrics.output import CsvOutput, JsonOutput, Output, OutputType, preprocess
+from repo_metrics.metrics import GitHubGraphQLMetricsHelper, GitHubMetricsHelper
+from repo_metrics.output import CsvOutput, JsonLinesOutput, JsonOutput, ParquetOutput, SqliteOutput, preprocess
+from repo_metrics.output.output_type import Output, OutputType
+from repo_metrics.profiler import Profiler
 
 LOGGER = logging.getLogger(__name__)
 
@@ -47,12 +49,34 @@ LOGGER = logging.getLogger(__name__)
     is_flag=True,
     help="Include a timestamp in the output",
 )
+@click.option(
+    "--backend",
+    "-b",
+    type=click.Choice(["rest", "graphql"]),
+    default="rest",
+    help="The GitHub API to use. The GraphQL API needs a GitHub token",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Log a summary of the requests made (counts, bytes and latencies for each endpoint) and the time spent "
+    "writing the output",
+)
+@click.option(
+    "--profile-output",
+    required=False,
+    type=str,
+    help="Write the profile summary to this file as json (implies --profile)",
+)
 def main(
     github_repo: str,
     output: str,
     output_format: str,
     append: bool,
     include_timestamp: bool,
+    backend: str,
+    profile: bool,
+    profile_output: str,
 ):
     """
     Get the download stats for a github repository
@@ -61,15 +85,21 @@ def main(
     data_to_print = []
     data_to_print_labels = []
 
-    # Include the timestamp if set, with some clever labelling so I don't need to special case it
-    if include_timestamp:
+    # Include the timestamp if set, with some clever labelling so I don't need to special case it.
+    # The repo and timestamp are the key in the database, so they're always included for sqlite
+    if include_timestamp or output_format == "sqlite":
         data_to_print.append({"time": datetime.now().isoformat()})
         data_to_print_labels.append("date_and_")
 
     # Get the owner and repo from the github_repo string
     owner, repo = github_repo.split("/")
-    helper = GitHubMetricsHelper()
+    helper = GitHubGraphQLMetricsHelper() if backend == "graphql" else GitHubMetricsHelper()
+    profiler = Profiler() if profile or profile_output else None
+    if profiler:
+        profiler.attach(helper.session)
     github_data = helper.get_release_download_counts(owner, repo)
+    if output_format == "sqlite":
+        github_data = {"repo": github_repo, **github_data}
     data_to_print.append(github_data)
     data_to_print_labels.append("")
 
@@ -78,7 +108,19 @@ def main(
     output_writer: Output = None
     if output_format == "csv":
         output_writer = CsvOutput(output, append)
+    elif output_format == "jsonl":
+        output_writer = JsonLinesOutput(output, append)
+    elif output_format == "parquet":
+        output_writer = ParquetOutput(output, append)
+    elif output_format == "sqlite":
+        output_writer = SqliteOutput(output, "github_download_stats", ["repo", "date_and_time"])
     else:
         output_writer = JsonOutput(output, append)
+    if profiler:
+        output_writer = profiler.wrap_output(output_writer)
 
     output_writer.write([output_data])
+
+    helper.rate_limiter.log_usage()
+    if profiler:
+        profiler.report(profile_output)
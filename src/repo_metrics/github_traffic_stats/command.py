@@ -1,13 +1,17 @@
 """
-Defines a command for getting traffic data for a specific GitHub repository
+Defines a command for getting traffic data for a specific GitHub repository, or for every repository
+a GitHub App installation has access to
 """
 
 import logging
 
 import click
 
-from repo_metrics.metrics import GitHubMetricsHelper
-from repo_metrics.output import CsvOutput, JsonOutput, Output
+from repo_metrics.github_traffic_stats.state import TrafficState
+from repo_metrics.metrics import FetchEngine, GitHubMetricsHelper
+from repo_metrics.metrics.concurrency import DEFAULT_MAX_WORKERS
+from repo_metrics.output import CsvOutput, JsonLinesOutput, JsonOutput, Output, OutputType, ParquetOutput, SqliteOutput
+from repo_metrics.profiler import Profiler
 
 LOGGER = logging.getLogger(__name__)
 
@@ -20,6 +24,14 @@ LOGGER = logging.getLogger(__name__)
     type=str,
     help="The GitHub repository to get traffic stats for, in the form {owner}/{repo}",
 )
+@click.option(
+    "--org",
+    "-org",
+    required=False,
+    type=str,
+    help="Get traffic stats for every repository the GitHub App installation for this user or organization has "
+    "access to, with the repository name in each row. Cannot be used with --github-repo.",
+)
 @click.option(
     "--output",
     "-o",
@@ -30,8 +42,8 @@ LOGGER = logging.getLogger(__name__)
 @click.option(
     "--output-format",
     "-of",
-    type=click.Choice(["json", "csv"]),
-    default="json",
+    type=click.Choice([o.value for o in OutputType]),
+    default=OutputType.JSON.value,
     help="The output format",
 )
 @click.option(
@@ -46,24 +58,133 @@ LOGGER = logging.getLogger(__name__)
     is_flag=True,
     help="Only include the data for yesterday (by default includes all available data for the last 14 days)",
 )
+@click.option(
+    "--state-file",
+    "-s",
+    required=False,
+    type=str,
+    help="Only write the days that haven't been written by an earlier run using this state file (for sqlite "
+    "output, days that have changed since, including today's incomplete data, are updated too). Needs --append, "
+    "except with sqlite output. Cannot be used with --only-yesterday.",
+)
+@click.option(
+    "--max-workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    help="The maximum number of API requests to have in flight at once",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Log a summary of the requests made (counts, bytes and latencies for each endpoint) and the time spent "
+    "writing the output",
+)
+@click.option(
+    "--profile-output",
+    required=False,
+    type=str,
+    help="Write the profile summary to this file as json (implies --profile)",
+)
 def main(
     github_repo: str,
+    org: str,
     output: str,
     output_format: str,
     append: bool,
     only_yesterday: bool,
+    state_file: str,
+    max_workers: int,
+    profile: bool,
+    profile_output: str,
 ):
     """
-    Get the traffic data for a specific GitHub repository
+    Get the traffic data for a specific GitHub repository, or for every repository in an org
     """
-    owner, repo = github_repo.split("/")
-    helper = GitHubMetricsHelper()
-    data = helper.get_repo_traffic(owner, repo, only_yesterday)
+    if bool(github_repo) == bool(org):
+        raise click.UsageError("Exactly one of --github-repo or --org must be given")
+    if state_file and only_yesterday:
+        raise click.UsageError("--state-file cannot be used with --only-yesterday")
+    # Overwriting the output with only the new days would lose the days written before them
+    if state_file and not append and output_format != "sqlite":
+        raise click.UsageError("--state-file needs --append, except with sqlite output")
+
+    # Outputs that update existing rows can take today's incomplete traffic, and have it updated by
+    # later runs. Everything else only gets complete days, so each day is written once
+    updates_rows = output_format == "sqlite"
+    exclude_today = not (state_file and updates_rows)
+
+    helper = GitHubMetricsHelper(engine=FetchEngine(max_workers))
+    profiler = Profiler() if profile or profile_output else None
+    if profiler:
+        profiler.attach(helper.session)
+    failures = {}
+    if org:
+        data, failures = helper.get_org_traffic(org, only_yesterday, exclude_today)
+        for repo, error in failures.items():
+            # Don't let one bad repo throw away the traffic for the rest of the org
+            LOGGER.error("Failed to get traffic for %s/%s: %s", org, repo, error)
+    else:
+        owner, repo = github_repo.split("/")
+        data = helper.get_repo_traffic(owner, repo, only_yesterday, exclude_today)
+        if output_format == "sqlite":
+            # The repo is part of the key in the database, so it's needed even for a single repo
+            data = [{"repo": github_repo, **row} for row in data]
+
+    state = None
+    if state_file:
+        state = TrafficState(state_file)
+        data = select_new_rows(state, data, github_repo, updates_rows)
 
     output_writer: Output = None
     if output_format == "json":
         output_writer = JsonOutput(output, append)
+    elif output_format == "jsonl":
+        output_writer = JsonLinesOutput(output, append)
+    elif output_format == "parquet":
+        output_writer = ParquetOutput(output, append)
+    elif output_format == "sqlite":
+        output_writer = SqliteOutput(output, "github_traffic_stats", ["repo", "timestamp"])
     else:
         output_writer = CsvOutput(output, append)
+    if profiler:
+        output_writer = profiler.wrap_output(output_writer)
 
     output_writer.write(data)
+
+    # Only record the rows as written once they have been
+    if state:
+        state.save()
+
+    helper.rate_limiter.log_usage()
+    if profiler:
+        profiler.report(profile_output)
+
+    if failures:
+        raise click.ClickException(f"Failed to get traffic for {len(failures)} repositories")
+
+
+def select_new_rows(
+    state: TrafficState, data: list[dict], github_repo: str | None, include_changed: bool
+) -> list[dict]:
+    """
+    Select the rows of the traffic data that haven't been written by an earlier run
+
+    :param state: The state of the earlier runs
+    :param data: The traffic data, for a single repo or (with a "repo" key in each row) for an org
+    :param github_repo: The repo the traffic data is for, or None if it's for an org
+    :param include_changed: Whether to also select rows that have changed since they were written
+
+    :return: The rows to write, sorted the same way as the traffic data
+    """
+    if github_repo:
+        return state.select(github_repo, data, include_changed)
+
+    rows_by_repo: dict[str, list[dict]] = {}
+    for row in data:
+        rows_by_repo.setdefault(row["repo"], []).append(row)
+    selected = []
+    for repo, rows in rows_by_repo.items():
+        selected.extend(state.select(repo, rows, include_changed))
+    selected.sort(key=lambda row: (row["timestamp"], row["repo"]))
+    return selected
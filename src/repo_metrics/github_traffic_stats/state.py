@@ -0,0 +1,77 @@
+"""
+Defines a state file that remembers which days of traffic data have been written for each
+repository, so incremental runs only write the days that are new (or have changed)
+"""
+
+import json
+import logging
+import os
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TrafficState:
+    """
+    The traffic data written for each repository: the latest day written, and the values written
+    for each day still in GitHub's 14 day traffic window (so changes to them can be spotted)
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor for the TrafficState class, which loads the state file if it exists
+
+        :param path: The path to the state file
+        """
+        self.path = path
+        # Map of repository to {"last_timestamp": ..., "days": {timestamp: values}}
+        self.__repos: dict[str, dict] = {}
+        try:
+            with open(path, "r") as f:
+                self.__repos = json.load(f)
+        except FileNotFoundError:
+            pass
+
+    def select(self, repo: str, traffic_data: list[dict], include_changed: bool) -> list[dict]:
+        """
+        Select the rows of a repository's traffic data that haven't been written yet, and record
+        them as written
+
+        :param repo: The repository, in the form {owner}/{repo}
+        :param traffic_data: The traffic data for the repository, as returned by the helper
+        :param include_changed: Whether to also select days that have already been written but
+        whose values have changed since (e.g. a day that was incomplete when it was written). Only
+        outputs that update existing rows should set this, otherwise the days would be duplicated
+
+        :return: The rows to write
+        """
+        repo_state = self.__repos.get(repo, {"last_timestamp": None, "days": {}})
+        last_timestamp = repo_state["last_timestamp"]
+        selected = []
+        days = {}
+        for row in traffic_data:
+            timestamp = row["timestamp"]
+            values = {key: value for key, value in row.items() if key not in ("timestamp", "repo")}
+            # Timestamps are all in the same ISO 8601 format, so they can be compared as strings
+            is_new = last_timestamp is None or timestamp > last_timestamp
+            is_changed = timestamp in repo_state["days"] and repo_state["days"][timestamp] != values
+            if is_new or (include_changed and is_changed):
+                selected.append(row)
+            if is_new or include_changed:
+                days[timestamp] = values
+            elif timestamp in repo_state["days"]:
+                # Keep what was actually written, so a later change is still compared against it
+                days[timestamp] = repo_state["days"][timestamp]
+        timestamps = [last_timestamp] if last_timestamp else []
+        timestamps += [row["timestamp"] for row in selected]
+        # Only the days in the current window need to be kept, since older days won't come back
+        self.__repos[repo] = {"last_timestamp": max(timestamps, default=None), "days": days}
+        return selected
+
+    def save(self) -> None:
+        """
+        Save the state file, replacing it atomically so an interrupted save doesn't lose it
+        """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.__repos, f, indent=4)
+        os.replace(temp_path, self.path)
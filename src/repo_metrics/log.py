@@ -2,13 +2,16 @@ import logging
 import pkgutil
 from pathlib import Path
 
+# The length of the longest module name in the package (repo_metrics.github_download_stats.command),
+# so log messages from all modules line up. This is precomputed since discovering all the modules
+# at every start slows it down; tests/unit/test_log.py checks it's still correct
+MODULE_NAME_WIDTH = 42
+
 
 def configure_logging(verbosity):
     """Set up logging for the repo_metics module"""
 
-    import repo_metrics  # pylint: disable=C0415
-
-    format_string = get_logging_format_string(repo_metrics)
+    format_string = get_logging_format_string(MODULE_NAME_WIDTH)
 
     # Set logging level:
     log_level = logging.INFO
@@ -19,13 +22,10 @@ def configure_logging(verbosity):
     logging.basicConfig(level=log_level, format=format_string)
 
 
-def get_logging_format_string(package):
-    """Get format string for all loggers
-    Discovers all modules to determine the space needed to
-    nicely format log messages from all modules.
+def get_logging_format_string(max_module_name_length):
+    """Get format string for all loggers, with space for module
+    names up to max_module_name_length long
     """
-    module_names = get_dot_separated_submodule_names(package)
-    max_module_name_length = max(len(name) for name in module_names)
     format_string = f"%(asctime)s %(name)-{max_module_name_length}s %(levelname)-8s %(message)s"
     return format_string
 
@@ -1,2 +1,5 @@
+from .concurrency import FetchEngine
 from .dockerhub import DockerHubMetricsHelper
 from .github import GitHubMetricsHelper
+from .github_graphql import GitHubGraphQLMetricsHelper
+from .session import create_session
@@ -0,0 +1,184 @@
+"""
+Defines an on-disk cache of API responses, used for making conditional requests so unchanged data
+doesn't need to be transferred again (and, for GitHub, doesn't count against the rate limit)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+# Headers from the original response that need to be restored when the cached body is reused
+CACHED_HEADERS = ["ETag", "Last-Modified", "Link", "Content-Type"]
+
+
+class ResponseCache:
+    """
+    A cache of response bodies and their validators (ETag and Last-Modified), stored as one file per
+    response in a directory, and evicted least recently used first once the total size of the files
+    goes over a limit
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Constructor for the ResponseCache class
+
+        :param path: The directory to store the cache in. It is created if it doesn't exist
+        :param max_size: The maximum total size of the cache files, in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        # Map of key to file size, ordered from least to most recently used
+        self.__entries: OrderedDict[str, int] = OrderedDict()
+        self.__total_size = 0
+
+        os.makedirs(path, exist_ok=True)
+        # Load the existing entries, using the modification time of each file as its last use
+        existing_entries = []
+        for entry in os.scandir(path):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                existing_entries.append((stat.st_mtime, entry.name[: -len(".json")], stat.st_size))
+        for _, key, size in sorted(existing_entries):
+            self.__entries[key] = size
+            self.__total_size += size
+
+    @staticmethod
+    def make_key(url: str, params: dict | None = None, identity: str | None = None) -> str:
+        """
+        Make the cache key for a request
+
+        :param url: The URL of the request
+        :param params: The query parameters of the request
+        :param identity: Who the request was made as, so responses are only reused for the same
+        identity. This should stay the same between runs, so it's the Authorization header for a
+        personal access token, but not for a token that's replaced every hour. Only a hash of it is
+        stored
+
+        :return: The cache key
+        """
+        identity_hash = hashlib.sha256(identity.encode()).hexdigest() if identity else ""
+        request = json.dumps([url, sorted((params or {}).items()), identity_hash])
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """
+        Get the cached response for a key
+
+        :param key: The cache key
+
+        :return: The cached response, as a dictionary with "headers" and "body" keys, or None if
+        there isn't one
+        """
+        with self.__lock:
+            if key not in self.__entries:
+                return None
+            self.__entries.move_to_end(key)
+        try:
+            with open(self.__get_file_path(key), "r") as f:
+                entry = json.load(f)
+            # Record the use so the order survives between runs
+            os.utime(self.__get_file_path(key))
+            return entry
+        except (OSError, ValueError):
+            # The file was removed or is corrupt (e.g. from another process sharing the cache)
+            self.__remove(key)
+            return None
+
+    def put(self, key: str, response: requests.Response) -> None:
+        """
+        Cache a response, evicting the least recently used responses if the cache is too big
+
+        :param key: The cache key
+        :param response: The response to cache
+        """
+        entry = {
+            "headers": {header: response.headers[header] for header in CACHED_HEADERS if header in response.headers},
+            "body": response.text,
+        }
+        file_path = self.__get_file_path(key)
+        # Write to a temporary file first so a reader never sees a partially written entry
+        temp_file_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_file_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_file_path, file_path)
+        size = os.path.getsize(file_path)
+
+        with self.__lock:
+            self.__total_size += size - self.__entries.pop(key, 0)
+            self.__entries[key] = size
+            evicted = []
+            while self.__total_size > self.max_size and len(self.__entries) > 1:
+                evicted_key, evicted_size = self.__entries.popitem(last=False)
+                self.__total_size -= evicted_size
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            try:
+                os.remove(self.__get_file_path(evicted_key))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def get_validators(entry: dict) -> dict:
+        """
+        Get the headers for making a conditional request for a cached response
+
+        :param entry: The cached response
+
+        :return: The If-None-Match and/or If-Modified-Since headers
+        """
+        headers = {}
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    @staticmethod
+    def is_cacheable(response: requests.Response) -> bool:
+        """
+        Check whether a response can be cached, i.e. it was successful and has a validator to make
+        conditional requests with
+
+        :param response: The response
+
+        :return: True if the response can be cached
+        """
+        return response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers)
+
+    @staticmethod
+    def restore(entry: dict, response: requests.Response) -> requests.Response:
+        """
+        Turn a 304 Not Modified response into the cached response it refers to
+
+        :param entry: The cached response
+        :param response: The 304 response
+
+        :return: The response, with the cached status, headers and body
+        """
+        response.status_code = 200
+        response.headers.update(entry["headers"])
+        response._content = entry["body"].encode()  # pylint: disable=W0212
+        response.encoding = "utf-8"
+        return response
+
+    def __remove(self, key: str) -> None:
+        """
+        Forget about an entry
+        """
+        with self.__lock:
+            self.__total_size -= self.__entries.pop(key, 0)
+
+    def __get_file_path(self, key: str) -> str:
+        """
+        Get the path of the file for an entry
+        """
+        return os.path.join(self.path, f"{key}.json")
@@ -0,0 +1,115 @@
+"""
+Defines an engine for running API requests concurrently with a bounded number of requests in flight
+"""
+
+import collections
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class FetchEngine:
+    """
+    Runs functions concurrently on a pool of worker threads, while limiting the number of HTTP
+    requests in flight at once across everything that shares the engine
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Constructor for the FetchEngine class
+
+        :param max_workers: The maximum number of requests in flight at once. A value of 1 runs
+        everything sequentially on the calling thread
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.__semaphore = threading.BoundedSemaphore(max_workers)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Context manager that holds one of the engine's in-flight slots. Every HTTP request made
+        through the engine should be wrapped in this
+        """
+        with self.__semaphore:
+            yield
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T], return_exceptions: bool = False) -> List[R]:
+        """
+        Call fn on each of the items concurrently
+
+        :param fn: The function to call
+        :param items: The items to call it on
+        :param return_exceptions: If True, an exception raised for an item is returned in place of
+        its result instead of being raised
+
+        :return: The results, in the same order as the items
+
+        :raises Exception: The first exception raised by fn (in item order), if return_exceptions
+        is False
+        """
+        items = list(items)
+        if self.max_workers == 1 or len(items) <= 1:
+            return [self.__call(fn, item, return_exceptions) for item in items]
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)))
+        try:
+            futures = [executor.submit(self.__call, fn, item, return_exceptions) for item in items]
+            return [future.result() for future in futures]
+        finally:
+            # If something failed, don't bother starting the items that haven't been picked up yet
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def imap(self, fn: Callable[[T], R], items: Iterable[T], window: int | None = None) -> Iterator[R]:
+        """
+        Call fn on each of the items concurrently, yielding the results in order as they're ready.
+        Only a window of items is in progress (or finished but not yet yielded) at once, so the
+        results don't all have to be held in memory, and the items are only taken as they're needed
+
+        :param fn: The function to call
+        :param items: The items to call it on
+        :param window: The maximum number of items in progress at once (the engine's max_workers
+        by default)
+
+        :return: An iterator of the results, in the same order as the items
+
+        :raises Exception: The exception raised by fn for an item, when its result is reached
+        """
+        items = iter(items)
+        window = window if window else self.max_workers
+        if self.max_workers == 1 or window == 1:
+            yield from map(fn, items)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, window))
+        try:
+            futures = collections.deque(executor.submit(fn, item) for item in itertools.islice(items, window))
+            while futures:
+                result = futures.popleft().result()
+                # Keep the window full while the result is being used
+                for item in itertools.islice(items, 1):
+                    futures.append(executor.submit(fn, item))
+                yield result
+        finally:
+            # If something failed or the results stopped being used, don't start any more items
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def __call(fn: Callable[[T], R], item: T, return_exceptions: bool) -> R | Exception:
+        """
+        Call fn on item, returning any exception raised if return_exceptions is True
+        """
+        try:
+            return fn(item)
+        except Exception as e:
+            if return_exceptions:
+                return e
+            raise
@@ -1,9 +1,43 @@
+import itertools
+import math
+from typing import Iterator
+
 import requests
 
+from ..settings import Settings
+from .concurrency import FetchEngine
+from .exceptions import DockerHubException
+from .request_policy import RequestPolicies
+from .session import create_session
+
+# The most repositories DockerHub returns in one page
+MAX_PAGE_SIZE = 100
+
 
 class DockerHubMetricsHelper:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        engine: FetchEngine | None = None,
+        session: requests.Session | None = None,
+        request_policies: RequestPolicies | None = None,
+    ):
+        """
+        Constructor for the DockerHubMetricsHelper class
+
+        :param engine: The engine to use for running requests concurrently. Sharing one engine
+        between helpers shares its limit on requests in flight
+        :param session: The session to make requests with. Sharing one session between helpers
+        shares its pool of connections
+        :param request_policies: The timeouts, retries and hedging to use for each endpoint. If not
+        set, they're loaded from the file set in the environment (if any)
+        """
+        settings = Settings()
+        self.api_url: str = settings.get_dockerhub_api_url()
+        self.engine: FetchEngine = engine if engine else FetchEngine()
+        self.session: requests.Session = session if session else create_session(self.engine.max_workers)
+        if not request_policies:
+            request_policies = RequestPolicies.load_from_json_file(settings.get_request_policy_path())
+        self.request_policies: RequestPolicies = request_policies
 
     def get_repo_info(self, owner: str, repo: str) -> dict:
         """
@@ -13,7 +47,100 @@ class DockerHubMetricsHelper:
         :param repo: The name of the repository
 
         :return: A dictionary containing the repository info
+
+        :raises DockerHubException: If the request fails
+        """
+        url = f"{self.api_url}/v2/repositories/{owner}/{repo}"
+        return self.__get(url, f"Failed to get info for {owner}/{repo}")
+
+    def get_repo_info_batch(self, repos: list[tuple[str, str]]) -> list[dict | Exception]:
+        """
+        Get info for each of the specified dockerhub repositories, concurrently
+
+        :param repos: The (owner, repo) tuples of the repositories
+
+        :return: The info for each repository (as returned by get_repo_info), or the exception
+        raised getting it, in the same order as repos
+        """
+        return self.engine.map(
+            lambda owner_and_repo: self.get_repo_info(*owner_and_repo), repos, return_exceptions=True
+        )
+
+    def get_namespace_repos(self, namespace: str) -> list[dict]:
+        """
+        Get info for every repository in the specified dockerhub namespace, MAX_PAGE_SIZE
+        repositories per request. The info for each repository has the same metrics fields (e.g.
+        pull_count and star_count) as get_repo_info returns
+
+        :param namespace: The namespace (user or organization)
+
+        :return: The info for each repository, in the order DockerHub lists them
+
+        :raises DockerHubException: If any requests fail
+        """
+        url = f"{self.api_url}/v2/repositories/{namespace}/"
+
+        def get_page(page: int) -> dict:
+            params = {"page": page, "page_size": MAX_PAGE_SIZE}
+            return self.__get(url, f"Failed to get repositories for {namespace}", params=params)
+
+        # The first page has the total count, so the rest can be fetched at once
+        first_page = get_page(1)
+        last_page = max(math.ceil(first_page["count"] / MAX_PAGE_SIZE), 1)
+        pages = [first_page] + self.engine.map(get_page, range(2, last_page + 1))
+
+        return [repository for page in pages for repository in page["results"]]
+
+    def get_tags(self, owner: str, repo: str) -> Iterator[dict]:
+        """
+        Get info for every tag of the specified dockerhub repository (e.g. tag_last_pulled,
+        tag_last_pushed and full_size), MAX_PAGE_SIZE tags per request. The first page is fetched
+        straight away, so a missing repository fails here. The rest are fetched concurrently as the
+        tags are iterated over, with only a few pages held at once, so repositories with thousands
+        of tags don't need all of them in memory
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+
+        :return: An iterator of the info for each tag, in the order DockerHub lists them
+
+        :raises DockerHubException: If any requests fail (for pages after the first, when the
+        iterator reaches them)
+        """
+        url = f"{self.api_url}/v2/repositories/{owner}/{repo}/tags"
+
+        def get_page(page: int) -> dict:
+            params = {"page": page, "page_size": MAX_PAGE_SIZE}
+            return self.__get(url, f"Failed to get tags for {owner}/{repo}", params=params)
+
+        first_page = get_page(1)
+        last_page = max(math.ceil(first_page["count"] / MAX_PAGE_SIZE), 1)
+        pages = itertools.chain([first_page], self.engine.imap(get_page, range(2, last_page + 1)))
+
+        return (tag for page in pages for tag in page["results"])
+
+    def __get(self, url: str, error_message: str, **kwargs) -> dict:
+        """
+        Make a GET request with the policy for its endpoint, waiting for a free slot in the engine
+        first and retrying with backoff if it fails transiently
+
+        :param url: The URL to request
+        :param error_message: The message for the exception raised if the request fails
+        :param kwargs: Any other arguments to pass to the session's get
+
+        :return: The response body
+
+        :raises DockerHubException: If the request doesn't succeed
+        :raises requests.RequestException: If there's no response, e.g. because it times out
         """
-        url = f"https://hub.docker.com/v2/repositories/{owner}/{repo}"
-        response = requests.get(url)
+        policy = self.request_policies.get("GET", url)
+
+        def send(url: str, **kwargs) -> requests.Response:
+            # A hedged request waits for a slot too, so it counts against the engine's limit
+            with self.engine.slot():
+                return self.session.get(url, **kwargs)
+
+        response = policy.run(lambda: policy.send(send, url, **kwargs), "GET", url)
+        if response.status_code != 200:
+            raise DockerHubException(f"{error_message}. Response: {response.text}")
         return response.json()
@@ -0,0 +1,13 @@
+class GitHubException(Exception):
+    pass
+
+
+class GitHubUnauthorizedException(GitHubException):
+    """
+    Raised when GitHub rejects the credentials a request was made with, e.g. because the token has
+    been revoked
+    """
+
+
+class DockerHubException(Exception):
+    pass
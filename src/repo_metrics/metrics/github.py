@@ -1,18 +1,30 @@
 import datetime
 import logging
-import time
+import threading
+from collections import OrderedDict
+from typing import Callable, TypeVar
+from urllib.parse import parse_qs, urlparse
 
-import jwt
 import requests
 
 from ..settings import Settings
+from .cache import DEFAULT_MAX_SIZE, ResponseCache
+from .concurrency import FetchEngine
+from .exceptions import GitHubException, GitHubUnauthorizedException
+from .github_app import GitHubAppTokenManager
+from .rate_limit import RateLimiter
+from .request_policy import RequestPolicies
+from .session import create_session
 
+LOGGER = logging.getLogger(__name__)
 
-class GitHubException(Exception):
-    pass
-
+T = TypeVar("T")
 
-LOGGER = logging.getLogger(__name__)
+# How many times to retry a request that was rate limited before giving up on it
+MAX_RATE_LIMIT_RETRIES = 5
+# How many repositories to keep the release download counts of, so a batch of repositories doesn't
+# keep every repository's releases in memory until the end of the run
+MAX_RELEASE_SCANS = 128
 
 
 class GitHubMetricsHelper:
@@ -20,36 +32,108 @@ class GitHubMetricsHelper:
     A helper class for getting metrics from the GitHub API
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        engine: FetchEngine | None = None,
+        session: requests.Session | None = None,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        token_manager: GitHubAppTokenManager | None = None,
+        request_policies: RequestPolicies | None = None,
+    ):
+        """
+        Constructor for the GitHubMetricsHelper class
+
+        :param engine: The engine to use for running requests concurrently. Sharing one engine
+        between helpers shares its limit on requests in flight
+        :param session: The session to make requests with. Sharing one session between helpers
+        shares its pool of connections
+        :param cache: The cache to use for making conditional requests. If not set, a cache is
+        created if a cache directory is set in the environment
+        :param rate_limiter: The rate limiter to schedule requests with. Sharing one rate limiter
+        between helpers shares its view of the rate limit budget
+        :param token_manager: The manager for the GitHub App credentials used to get traffic data.
+        If not set, one is created that caches the credentials in the file set in the environment
+        (if any)
+        :param request_policies: The timeouts, retries and hedging to use for each endpoint. If not
+        set, they're loaded from the file set in the environment (if any)
+        """
+        settings = Settings()
+        self.api_url: str = settings.get_github_api_url()
         # Get the GitHub API token from the environment variable (if there is one)
-        token = Settings().get_github_token()
+        token = settings.get_github_token()
         self.token: str | None = token
-
-    def get_repo_info(self, owner: str, repo: str) -> dict:
+        if not cache and settings.get_cache_dir():
+            cache = ResponseCache(settings.get_cache_dir(), settings.get_cache_max_size() or DEFAULT_MAX_SIZE)
+        self.cache: ResponseCache | None = cache
+        self.engine: FetchEngine = engine if engine else FetchEngine()
+        self.session: requests.Session = session if session else create_session(self.engine.max_workers)
+        self.rate_limiter: RateLimiter = rate_limiter if rate_limiter else RateLimiter(self.engine.max_workers)
+        if not token_manager:
+            token_manager = GitHubAppTokenManager(settings, settings.get_github_app_token_cache_path())
+        self.token_manager: GitHubAppTokenManager = token_manager
+        if not request_policies:
+            request_policies = RequestPolicies.load_from_json_file(settings.get_request_policy_path())
+        self.request_policies: RequestPolicies = request_policies
+        # The download counts for the releases of the most recently scanned repositories, keyed by
+        # (owner, repo), least recently used first
+        self.__release_scans: OrderedDict[tuple[str, str], list[tuple[str, int]]] = OrderedDict()
+        self.__release_scan_locks: dict[tuple[str, str], threading.Lock] = {}
+        self.__release_scans_lock = threading.Lock()
+
+    def get_repo_info(self, owner: str, repo: str, fields: list[str] | None = None) -> dict:
         """
         Get info for the specified git repository
 
         :param owner: The owner of the repository
         :param repo: The name of the repository
+        :param fields: The fields that will be used from the info, or None for all of them. Requests
+        that can't contribute to any of the fields (e.g. walking the releases for download_count)
+        are skipped
 
         :return: A dictionary containing the repository info
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}"
+        url = f"{self.api_url}/repos/{owner}/{repo}"
         if self.token:
             headers = {"Authorization": f"Bearer {self.token}"}
         else:
             headers = {}
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise GitHubException(f"Failed to get info for {owner}/{repo}")
-        data = response.json()
 
-        # Get the download count for the repository
-        download_count = self.__get_download_count(owner, repo)
+        def get_info() -> dict:
+            response = self.__get(url, headers=headers)
+            if response.status_code != 200:
+                raise GitHubException(f"Failed to get info for {owner}/{repo}")
+            return response.json()
+
+        # The download count means walking every page of releases, so only get it if it's needed
+        if fields and "download_count" not in fields:
+            return get_info()
+
+        # Get the repo info and the download count for the repository at the same time
+        data, download_count = self.engine.map(
+            lambda fetch: fetch(), [get_info, lambda: self.__get_download_count(owner, repo)]
+        )
         data["download_count"] = download_count
 
         return data
 
+    def get_repo_info_batch(
+        self, repos: list[tuple[str, str]], fields: list[str] | None = None
+    ) -> list[dict | Exception]:
+        """
+        Get info for each of the specified git repositories, concurrently
+
+        :param repos: The (owner, repo) tuples of the repositories
+        :param fields: The fields that will be used from the info, or None for all of them (see
+        get_repo_info)
+
+        :return: The info for each repository (as returned by get_repo_info), or the exception
+        raised getting it, in the same order as repos
+        """
+        return self.engine.map(
+            lambda owner_and_repo: self.get_repo_info(*owner_and_repo, fields=fields), repos, return_exceptions=True
+        )
+
     def get_release_download_counts(self, owner: str, repo: str) -> dict:
         """
         Get download counts for all releases in the specified git repository
@@ -59,76 +143,119 @@ class GitHubMetricsHelper:
 
         :return: A dictionary containing the download counts for each release
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}/releases"
-        if self.token:
-            headers = {"Authorization": f"Bearer {self.token}"}
-        else:
-            headers = {}
+        return {tag_name: download_count for tag_name, download_count in self.__get_release_scan(owner, repo)}
 
-        release_download_counts = {}
+    def __get_download_count(self, owner: str, repo: str) -> int:
+        """
+        Get the download count for the specified git repository
 
-        # Paginate through the releases to get the download counts
-        page = 1
-        while True:
-            # Set the per_page parameter to 100 to get the maximum number of releases per page
-            params = {"page": page, "per_page": 100}
-            response = requests.get(url, headers=headers, params=params)
-            if response.status_code != 200:
-                raise GitHubException(f"Failed to get info for {owner}/{repo}")
-            releases = response.json()
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
 
-            # If there are no more releases, break out of the loop
-            if not releases:
-                break
+        :return: The download count
+        """
+        return sum(download_count for _, download_count in self.__get_release_scan(owner, repo))
 
-            for release in releases:
-                release_name = release["tag_name"]
-                download_count = 0
-                for asset in release["assets"]:
-                    download_count += asset["download_count"]
-                release_download_counts[release_name] = download_count
+    def __get_release_scan(self, owner: str, repo: str) -> list[tuple[str, int]]:
+        """
+        Get the download count for each release in the specified git repository, walking the
+        releases only the first time it is called for a repository. Both the total and the
+        per-release download counts are derived from this, so the releases are only fetched once
+        per repository per run (as long as the repository is one of the last MAX_RELEASE_SCANS
+        scanned)
 
-            page += 1
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
 
-        return release_download_counts
+        :return: A list of (tag name, download count) tuples, one for each release
 
-    def __get_download_count(self, owner: str, repo: str) -> int:
+        :raises GitHubException: If any requests fail
         """
-        Get the download count for the specified git repository
+        key = (owner, repo)
+        # Use a lock per repository so concurrent callers for the same repository wait for a
+        # single walk instead of each starting their own
+        with self.__release_scans_lock:
+            scan_lock = self.__release_scan_locks.setdefault(key, threading.Lock())
+        with scan_lock:
+            with self.__release_scans_lock:
+                scan = self.__release_scans.get(key)
+                if scan is not None:
+                    self.__release_scans.move_to_end(key)
+                    return scan
+            try:
+                scan = self.__scan_releases(owner, repo)
+            except Exception:
+                with self.__release_scans_lock:
+                    self.__release_scan_locks.pop(key, None)
+                raise
+            with self.__release_scans_lock:
+                self.__release_scans[key] = scan
+                while len(self.__release_scans) > MAX_RELEASE_SCANS:
+                    evicted_key, _ = self.__release_scans.popitem(last=False)
+                    self.__release_scan_locks.pop(evicted_key, None)
+            return scan
+
+    def __scan_releases(self, owner: str, repo: str) -> list[tuple[str, int]]:
+        """
+        Walk all the releases in the specified git repository, adding up the download counts of
+        each release's assets
 
         :param owner: The owner of the repository
         :param repo: The name of the repository
 
-        :return: The download count
+        :return: A list of (tag name, download count) tuples, one for each release
+
+        :raises GitHubException: If any requests fail
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+        url = f"{self.api_url}/repos/{owner}/{repo}/releases"
         if self.token:
             headers = {"Authorization": f"Bearer {self.token}"}
         else:
             headers = {}
 
-        # Paginate through the releases to get the download count
-        page = 1
-        download_count = 0
-        while True:
+        def get_page(page: int) -> requests.Response:
             # Set the per_page parameter to 100 to get the maximum number of releases per page
             params = {"page": page, "per_page": 100}
-            response = requests.get(url, headers=headers, params=params)
+            response = self.__get(url, headers=headers, params=params)
             if response.status_code != 200:
                 raise GitHubException(f"Failed to get info for {owner}/{repo}")
-            releases = response.json()
+            return response
 
-            # If there are no more releases, break out of the loop
-            if not releases:
-                break
-
-            for release in releases:
+        def count_downloads(response: requests.Response) -> list[tuple[str, int]]:
+            # Only keep the counts, not the full release data, so the scans don't take up much
+            # memory when they're kept for a large batch of repos
+            release_download_counts = []
+            for release in response.json():
+                download_count = 0
                 for asset in release["assets"]:
                     download_count += asset["download_count"]
+                release_download_counts.append((release["tag_name"], download_count))
+            return release_download_counts
 
-            page += 1
+        # The first page tells us how many pages there are, so the rest can be fetched at once
+        first_page = get_page(1)
+        last_page = self.__get_last_page(first_page)
+        pages = [count_downloads(first_page)] + self.engine.map(
+            lambda page: count_downloads(get_page(page)), range(2, last_page + 1)
+        )
 
-        return download_count
+        return [release for page in pages for release in page]
+
+    @staticmethod
+    def __get_last_page(response: requests.Response) -> int:
+        """
+        Get the number of the last page of a paginated list from the Link header of a response
+
+        :param response: The response for the first page of the list
+
+        :return: The number of the last page (1 if there is only one page)
+        """
+        # GitHub leaves out the Link header (or the "last" link in it) if there's only one page
+        last_link = response.links.get("last")
+        if not last_link:
+            return 1
+        query = parse_qs(urlparse(last_link["url"]).query)
+        return int(query["page"][0])
 
     def get_repo_traffic(
         self, owner: str, repo: str, only_yesterday: bool = False, exclude_today: bool = True
@@ -145,16 +272,185 @@ class GitHubMetricsHelper:
         :raises GitHubException: If any requests fail or if the data returned by the requests is
         not as expected
         """
-        # Generate a JWT for the GitHub App that we'll make the requests as
-        jwt = self.__create_github_app_jwt()
-        # Get the installation id for the app installation on the repository
-        installation_id = self.__get_installation_id(owner, repo, jwt)
-        # Get an app installation access token which we'll use to make the requests
-        token = self.__get_installation_access_token(installation_id, jwt)
-        # Get the clones for the past two weeks
-        clones = self.__get_traffic_clones(owner, repo, token)
-        # Get the views for the past two weeks
-        views = self.__get_traffic_views(owner, repo, token)
+        traffic_data = self.__with_installation_token(
+            owner, repo, lambda token: self.__get_traffic(owner, repo, token, exclude_today)
+        )
+        # Filter out all the data except for yesterday if only_yesterday is True
+        if only_yesterday:
+            yesterday_formatted = self.__get_yesterday_timestamp()
+            # Check if the traffic data contains data for yesterday
+            if yesterday_formatted not in traffic_data:
+                raise GitHubException("Traffic data for yesterday not found")
+            # Filter out all the data except for yesterday
+            traffic_data = {yesterday_formatted: traffic_data[yesterday_formatted]}
+
+        # Format the traffic data so it's a list of objects
+        traffic_data = [{"timestamp": timestamp, **data} for timestamp, data in traffic_data.items()]
+
+        return traffic_data
+
+    def get_org_traffic(
+        self, owner: str, only_yesterday: bool = False, exclude_today: bool = True
+    ) -> tuple[list[dict], dict[str, Exception]]:
+        """
+        Get the traffic data for every repository the GitHub App installation for the specified
+        owner has access to, fetching the repositories concurrently under a single installation
+        access token
+
+        :param owner: The user or organization the app is installed on
+        :param only_yesterday: Whether to only get the traffic data for yesterday. Repositories with
+        no traffic yesterday are left out instead of failing
+        :param exclude_today: Whether to leave out today's (incomplete) traffic data
+
+        :return: The traffic data for all the repositories, as a list of objects with the repository
+        (in the form {owner}/{repo}) under "repo", sorted by timestamp and then repository, and a
+        dictionary of the exceptions raised for any repositories that failed, keyed by repository
+        name
+
+        :raises GitHubException: If the installation or its repositories can't be retrieved
+        """
+        token, repos = self.__with_installation_token(
+            owner, None, lambda token: (token, self.get_installation_repos(owner, token))
+        )
+        results = self.engine.map(
+            lambda repo: self.__get_traffic(owner, repo, token, exclude_today), repos, return_exceptions=True
+        )
+
+        yesterday_formatted = self.__get_yesterday_timestamp()
+        traffic_data = []
+        failures = {}
+        for repo, result in zip(repos, results):
+            if isinstance(result, Exception):
+                failures[repo] = result
+                continue
+            for timestamp, data in result.items():
+                if not only_yesterday or timestamp == yesterday_formatted:
+                    traffic_data.append({"timestamp": timestamp, "repo": f"{owner}/{repo}", **data})
+        traffic_data.sort(key=lambda row: (row["timestamp"], row["repo"]))
+
+        return traffic_data, failures
+
+    def get_installation_repos(self, owner: str, token: str | None = None) -> list[str]:
+        """
+        Get the names of the repositories the GitHub App installation for the specified owner has
+        access to
+
+        :param owner: The user or organization the app is installed on
+        :param token: The installation access token, if it has already been retrieved
+
+        :return: The names of the repositories
+
+        :raises GitHubException: If any requests fail
+        """
+        if not token:
+            return self.__with_installation_token(owner, None, lambda token: self.get_installation_repos(owner, token))
+        url = f"{self.api_url}/installation/repositories"
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def get_page(page: int) -> requests.Response:
+            params = {"page": page, "per_page": 100}
+            response = self.__get(
+                url, cache_identity=self.__get_installation_identity(owner), headers=headers, params=params
+            )
+            self.__check_authorized(response, f"Failed to get installation repositories for {owner}")
+            if response.status_code != 200:
+                raise GitHubException(f"Failed to get installation repositories for {owner}. Response: {response.text}")
+            return response
+
+        def get_names(response: requests.Response) -> list[str]:
+            return [repository["name"] for repository in response.json()["repositories"]]
+
+        # The first page tells us how many pages there are, so the rest can be fetched at once
+        first_page = get_page(1)
+        last_page = self.__get_last_page(first_page)
+        pages = [get_names(first_page)] + self.engine.map(
+            lambda page: get_names(get_page(page)), range(2, last_page + 1)
+        )
+
+        return [name for page in pages for name in page]
+
+    def __get_installation_token(self, owner: str, repo: str | None = None) -> str:
+        """
+        Get an app installation access token for the app installation for the specified owner.
+        The token manager reuses the one for the owner's installation if it has already been
+        created
+
+        :param owner: The owner of the repositories
+        :param repo: A repository the app is installed on, used to look up the installation. If not
+        set, the installation is looked up by owner
+
+        :return: The installation access token
+
+        :raises GitHubException: If any requests fail
+        """
+        return self.token_manager.get_installation_token(
+            owner,
+            lambda jwt: self.__get_installation_id(owner, repo, jwt),
+            self.__create_installation_access_token,
+        )
+
+    def __with_installation_token(self, owner: str, repo: str | None, fetch: Callable[[str], T]) -> T:
+        """
+        Fetch something with an app installation access token for the specified owner. If GitHub
+        rejects the token (e.g. because it was revoked, or the app was reinstalled), it's forgotten
+        and the fetch is tried once more with a new one
+
+        :param owner: The owner of the repositories
+        :param repo: A repository the app is installed on, used to look up the installation. If not
+        set, the installation is looked up by owner
+        :param fetch: Function that fetches the data, given the token
+
+        :return: The result of the fetch
+
+        :raises GitHubException: If any requests fail
+        """
+        token = self.__get_installation_token(owner, repo)
+        try:
+            return fetch(token)
+        except GitHubUnauthorizedException:
+            LOGGER.warning("Installation access token for %s was rejected, getting a new one", owner)
+            self.token_manager.invalidate(owner, token)
+            return fetch(self.__get_installation_token(owner, repo))
+
+    def __get_installation_identity(self, owner: str) -> str:
+        """
+        Get who requests made with an app installation access token for the specified owner are made
+        as, for caching their responses. The tokens are replaced every hour, but the app and owner
+        stay the same
+        """
+        return f"GitHub App {self.token_manager.client_id} installation for {owner}"
+
+    @staticmethod
+    def __check_authorized(response: requests.Response, error_message: str) -> None:
+        """
+        Check GitHub didn't reject the credentials a request was made with
+
+        :param response: The response to the request
+        :param error_message: The message for the exception raised if it did
+
+        :raises GitHubUnauthorizedException: If the response is a 401
+        """
+        if response.status_code == 401:
+            raise GitHubUnauthorizedException(f"{error_message}. Response: {response.text}")
+
+    def __get_traffic(self, owner: str, repo: str, token: str, exclude_today: bool) -> dict[str, dict]:
+        """
+        Get the traffic data for the specified git repository, fetching the clones and views at
+        the same time
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+        :param token: The installation access token
+        :param exclude_today: Whether to leave out today's (incomplete) traffic data
+
+        :return: A dictionary of the clones and views for each day, keyed by timestamp
+
+        :raises GitHubException: If any requests fail
+        """
+        # Get the clones and views for the past two weeks at the same time
+        clones, views = self.engine.map(
+            lambda fetch: fetch(owner, repo, token), [self.__get_traffic_clones, self.__get_traffic_views]
+        )
         # Combine the clones and views data into a dictionary keyed by timestamp
         traffic_data = {}
         for clone in clones["clones"]:
@@ -176,87 +472,69 @@ class GitHubMetricsHelper:
             # Check if the traffic data contains data for today
             if today_formatted in traffic_data:
                 del traffic_data[today_formatted]
-        # Filter out all the data except for yesterday if only_yesterday is True
-        if only_yesterday:
-            # Get a timestamp for yesterday at midnight so we can check for it in the traffic data
-            today = datetime.datetime.now(datetime.timezone.utc)
-            midnight = datetime.datetime.combine(today, datetime.time.min)
-            yesterday = midnight - datetime.timedelta(days=1)
-            yesterday_formatted = yesterday.strftime("%Y-%m-%dT%H:%M:%SZ")
-            # Check if the traffic data contains data for yesterday
-            if yesterday_formatted not in traffic_data:
-                raise GitHubException("Traffic data for yesterday not found")
-            # Filter out all the data except for yesterday
-            traffic_data = {yesterday_formatted: traffic_data[yesterday_formatted]}
-
-        # Format the traffic data so it's a list of objects
-        traffic_data = [{"timestamp": timestamp, **data} for timestamp, data in traffic_data.items()]
 
         return traffic_data
 
-    def __create_github_app_jwt(self):
+    @staticmethod
+    def __get_yesterday_timestamp() -> str:
         """
-        Creates a JWT for interacting with the GitHub API as a GitHub App
+        Get the timestamp GitHub uses in traffic data for yesterday, i.e. yesterday at midnight UTC
         """
-        client_id = Settings().get_github_app_client_id()
-        private_key = Settings().get_github_app_private_key()
-
-        if not client_id or not private_key:
-            raise GitHubException("GitHub App client ID or private key not found")
-
-        payload = {
-            # Issued at time
-            "iat": int(time.time()),
-            # JWT expiration time (10 minutes maximum)
-            "exp": int(time.time()) + 600,
-            # GitHub App's client ID
-            "iss": client_id,
-        }
+        today = datetime.datetime.now(datetime.timezone.utc)
+        midnight = datetime.datetime.combine(today, datetime.time.min)
+        yesterday = midnight - datetime.timedelta(days=1)
+        return yesterday.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-        return jwt.encode(payload, private_key, algorithm="RS256")
-
-    def __get_installation_id(self, owner, repo, jwt):
+    def __get_installation_id(self, owner: str, repo: str | None, jwt: str) -> int:
         """
-        Get the installation ID for the app installation on the specified repo
+        Get the installation ID for the app installation on the specified repo, or for the
+        specified owner
 
         :param owner: The owner of the repository
-        :param repo: The name of the repository
+        :param repo: The name of the repository, or None to look up the installation by owner
         :param jwt: The JWT for the GitHub App
 
         :return: The installation ID
 
         :raises GitHubException: If the request fails
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}/installation"
+        if repo:
+            name = f"{owner}/{repo}"
+            url = f"{self.api_url}/repos/{owner}/{repo}/installation"
+        else:
+            # Organizations are users as far as this endpoint is concerned
+            name = owner
+            url = f"{self.api_url}/users/{owner}/installation"
         headers = {"Authorization": f"Bearer {jwt}"}
-        response = requests.get(url, headers=headers)
+        # The JWT is replaced every few minutes, so a cached response could never be matched again
+        response = self.__get(url, use_cache=False, headers=headers)
         if response.status_code != 200:
-            raise GitHubException(f"Failed to get installation ID for {owner}/{repo}. Response: {response.text}")
+            raise GitHubException(f"Failed to get installation ID for {name}. Response: {response.text}")
         data = response.json()
 
         return data["id"]
 
-    def __get_installation_access_token(self, installation_id, jwt):
+    def __create_installation_access_token(self, installation_id: int, jwt: str) -> dict:
         """
-        Get an installation access token for the specified app installation
+        Create an installation access token for the specified app installation
 
         :param installation_id: The ID of the app installation
         :param jwt: The JWT for the GitHub App
 
-        :return: The installation access token
+        :return: A dictionary containing the installation access token and its expiry time
 
         :raises GitHubException: If the request fails
         """
-        url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
+        url = f"{self.api_url}/app/installations/{installation_id}/access_tokens"
         headers = {"Authorization": f"Bearer {jwt}"}
-        response = requests.post(url, headers=headers)
+        response = self.__post(url, headers=headers)
         if response.status_code != 201:
             raise GitHubException(
                 f"Failed to get installation access token for {installation_id}. Response: {response.text}"
             )
         data = response.json()
 
-        return data["token"]
+        return data
 
     def __get_traffic_clones(self, owner: str, repo: str, token: str) -> dict:
         """
@@ -270,9 +548,10 @@ class GitHubMetricsHelper:
 
         :raises GitHubException: If the request fails
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}/traffic/clones"
+        url = f"{self.api_url}/repos/{owner}/{repo}/traffic/clones"
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers)
+        response = self.__get(url, cache_identity=self.__get_installation_identity(owner), headers=headers)
+        self.__check_authorized(response, f"Failed to get traffic clones for {owner}/{repo}")
         if response.status_code != 200:
             raise GitHubException(f"Failed to get traffic clones for {owner}/{repo}. Response: {response.text}")
         data = response.json()
@@ -291,11 +570,99 @@ class GitHubMetricsHelper:
 
         :raises GitHubException: If the request fails
         """
-        url = f"https://api.github.com/repos/{owner}/{repo}/traffic/views"
+        url = f"{self.api_url}/repos/{owner}/{repo}/traffic/views"
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers)
+        response = self.__get(url, cache_identity=self.__get_installation_identity(owner), headers=headers)
+        self.__check_authorized(response, f"Failed to get traffic views for {owner}/{repo}")
         if response.status_code != 200:
             raise GitHubException(f"Failed to get traffic views for {owner}/{repo}. Response: {response.text}")
         data = response.json()
 
         return data
+
+    def __get(self, url: str, cache_identity: str | None = None, use_cache: bool = True, **kwargs) -> requests.Response:
+        """
+        Make a GET request, waiting for a free slot in the engine first. If there is a cache, the
+        request is made conditional on the cached response having changed, and the cached
+        response is returned if it hasn't
+
+        :param url: The URL to request
+        :param cache_identity: Who the request is made as, for the cache key. If not set, the
+        Authorization header is used, which only works for credentials that don't change between
+        runs (see ResponseCache.make_key)
+        :param use_cache: Whether to use the cache for the request. Requests made with credentials
+        that change on every run (like a JWT) can never be served from the cache
+        :param kwargs: Any other arguments to pass to the session's get
+
+        :return: The response
+        """
+        cache_key = None
+        cached = None
+        if self.cache and use_cache:
+            headers = kwargs.get("headers", {})
+            identity = cache_identity if cache_identity else headers.get("Authorization")
+            cache_key = ResponseCache.make_key(url, kwargs.get("params"), identity)
+            cached = self.cache.get(cache_key)
+            if cached:
+                kwargs["headers"] = {**headers, **ResponseCache.get_validators(cached)}
+
+        response = self._send(self.session.get, url, **kwargs)
+
+        if cached and response.status_code == 304:
+            LOGGER.debug("Using cached response for %s", url)
+            return ResponseCache.restore(cached, response)
+        if cache_key and ResponseCache.is_cacheable(response):
+            self.cache.put(cache_key, response)
+        return response
+
+    def __post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Make a POST request, waiting for a free slot in the engine first
+
+        :param url: The URL to request
+        :param kwargs: Any other arguments to pass to the session's post
+
+        :return: The response
+        """
+        return self._send(self.session.post, url, **kwargs)
+
+    def _send(self, method: Callable[..., requests.Response], url: str, **kwargs) -> requests.Response:
+        """
+        Make a request with the policy for its endpoint, waiting for rate limit budget and then for
+        a free slot in the engine first, retrying if the request is rate limited, and retrying with
+        backoff if it fails transiently. Subclasses that talk to other GitHub endpoints should make
+        their requests through this
+
+        :param method: The session method to make the request with
+        :param url: The URL to request
+        :param kwargs: Any other arguments to pass to the method
+
+        :return: The response (which is the last failed response if the retries run out)
+        """
+        policy = self.request_policies.get(method.__name__, url)
+        authorization = kwargs.get("headers", {}).get("Authorization")
+
+        def send(url: str, **kwargs) -> requests.Response:
+            # Waiting for rate limit budget happens before taking a slot in the engine, so a request
+            # waiting for the budget to reset doesn't hold up requests to other APIs. A hedged
+            # request goes through this too, so it counts against both
+            response = None
+            key = self.rate_limiter.acquire(url, authorization)
+            try:
+                with self.engine.slot():
+                    response = method(url, **kwargs)
+            finally:
+                self.rate_limiter.release(key, response)
+            return response
+
+        def attempt() -> requests.Response:
+            for rate_limit_retry in range(MAX_RATE_LIMIT_RETRIES + 1):
+                response = policy.send(send, url, **kwargs)
+                if not RateLimiter.is_rate_limited(response) or rate_limit_retry == MAX_RATE_LIMIT_RETRIES:
+                    break
+                # The rate limiter will hold the retry until the budget allows it
+                LOGGER.warning("Rate limited requesting %s, retrying", url)
+            return response
+
+        # Backing off happens outside the engine's slot so other requests can use it meanwhile
+        return policy.run(attempt, method.__name__, url)
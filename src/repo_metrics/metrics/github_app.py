@@ -0,0 +1,207 @@
+"""
+Defines a manager for the credentials needed to make requests as a GitHub App, which caches them so
+they can be reused across repositories (and, optionally, across runs)
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+import jwt
+
+from ..settings import Settings
+from .exceptions import GitHubException
+
+LOGGER = logging.getLogger(__name__)
+
+# How long a JWT is valid for (10 minutes is the maximum GitHub allows)
+JWT_LIFETIME = 600
+# How long before a JWT or installation token expires to stop using it, so it doesn't expire while a
+# request using it is in flight
+EXPIRY_MARGIN = 60
+
+
+class GitHubAppTokenManager:
+    """
+    Creates and caches the JWT for a GitHub App, the app's installation ID for each owner
+    (installations are per user or organization), and an installation access token for each
+    installation
+    """
+
+    def __init__(self, settings: Settings | None = None, cache_path: str | None = None):
+        """
+        Constructor for the GitHubAppTokenManager class
+
+        :param settings: The settings to get the GitHub App's client ID and private key from
+        :param cache_path: The path of a file to keep installation IDs and tokens in between runs.
+        If not set, they're only kept in memory
+        """
+        settings = settings if settings else Settings()
+        self.client_id: str | None = settings.get_github_app_client_id()
+        self.private_key: str | None = settings.get_github_app_private_key()
+        self.cache_path = cache_path
+        self.__lock = threading.RLock()
+        self.__jwt: str | None = None
+        self.__jwt_expires_at: float = 0
+        self.__installation_ids: dict[str, int] = {}
+        # Map of installation ID (as a string, so it survives being saved as json) to a dictionary
+        # with the token and its expiry time in seconds since the epoch
+        self.__installation_tokens: dict[str, dict] = {}
+        self.__load()
+
+    def get_jwt(self) -> str:
+        """
+        Get a JWT for interacting with the GitHub API as a GitHub App, creating a new one if the
+        cached one is about to expire
+
+        :return: The JWT
+
+        :raises GitHubException: If the GitHub App client ID or private key aren't set
+        """
+        with self.__lock:
+            if self.__jwt and self.__jwt_expires_at - EXPIRY_MARGIN > time.time():
+                return self.__jwt
+
+            if not self.client_id or not self.private_key:
+                raise GitHubException("GitHub App client ID or private key not found")
+
+            now = int(time.time())
+            payload = {
+                # Issued at time
+                "iat": now,
+                # JWT expiration time (10 minutes maximum)
+                "exp": now + JWT_LIFETIME,
+                # GitHub App's client ID
+                "iss": self.client_id,
+            }
+            self.__jwt = jwt.encode(payload, self.private_key, algorithm="RS256")
+            self.__jwt_expires_at = now + JWT_LIFETIME
+            return self.__jwt
+
+    def get_installation_id(self, owner: str, get_installation_id: Callable[[str], int]) -> int:
+        """
+        Get the ID of the app installation for an owner, looking it up if it isn't cached
+
+        :param owner: The owner of the repositories
+        :param get_installation_id: Function that looks up the installation ID, given a JWT
+
+        :return: The installation ID
+        """
+        with self.__lock:
+            if owner not in self.__installation_ids:
+                self.__installation_ids[owner] = get_installation_id(self.get_jwt())
+                self.__save()
+            return self.__installation_ids[owner]
+
+    def get_installation_token(
+        self,
+        owner: str,
+        get_installation_id: Callable[[str], int],
+        create_installation_token: Callable[[int, str], dict],
+    ) -> str:
+        """
+        Get an installation access token for the app installation for an owner, creating a new one
+        if the cached one is about to expire
+
+        :param owner: The owner of the repositories
+        :param get_installation_id: Function that looks up the installation ID, given a JWT
+        :param create_installation_token: Function that creates an installation access token given
+        the installation ID and a JWT, returning the response from GitHub (with "token" and
+        "expires_at" keys)
+
+        :return: The installation access token
+
+        :raises GitHubException: If the installation ID can't be looked up or the token can't be
+        created
+        """
+        with self.__lock:
+            id_was_cached = owner in self.__installation_ids
+            installation_id = self.get_installation_id(owner, get_installation_id)
+            cached = self.__installation_tokens.get(str(installation_id))
+            if cached and cached["expires_at"] - EXPIRY_MARGIN > time.time():
+                return cached["token"]
+
+            try:
+                return self.__create_installation_token(installation_id, create_installation_token)
+            except GitHubException:
+                if not id_was_cached:
+                    raise
+                # The app may have been reinstalled since the ID was cached, which changes the ID
+                LOGGER.warning("Failed to create a token for cached installation %s, looking it up again", owner)
+                self.invalidate(owner)
+                installation_id = self.get_installation_id(owner, get_installation_id)
+                return self.__create_installation_token(installation_id, create_installation_token)
+
+    def invalidate(self, owner: str, token: str | None = None) -> None:
+        """
+        Forget the cached installation ID for an owner and the installation access token for it, so
+        they're looked up and created again the next time they're needed
+
+        :param owner: The owner of the repositories
+        :param token: The token that was rejected. If set, nothing is forgotten unless it's still
+        the cached token, so a token that has already been replaced isn't forgotten again
+        """
+        with self.__lock:
+            installation_id = self.__installation_ids.get(owner)
+            if installation_id is None:
+                return
+            cached = self.__installation_tokens.get(str(installation_id))
+            if token and (not cached or cached["token"] != token):
+                return
+            del self.__installation_ids[owner]
+            self.__installation_tokens.pop(str(installation_id), None)
+            self.__save()
+
+    def __create_installation_token(
+        self, installation_id: int, create_installation_token: Callable[[int, str], dict]
+    ) -> str:
+        """
+        Create an installation access token for an installation and cache it
+        """
+        data = create_installation_token(installation_id, self.get_jwt())
+        expires_at = datetime.datetime.fromisoformat(data["expires_at"].replace("Z", "+00:00")).timestamp()
+        self.__installation_tokens[str(installation_id)] = {"token": data["token"], "expires_at": expires_at}
+        self.__save()
+        return data["token"]
+
+    def __load(self) -> None:
+        """
+        Load the cached installation IDs and tokens for this app from the cache file, if there is one
+        """
+        if not self.cache_path or not self.client_id:
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f).get(self.client_id, {})
+        except FileNotFoundError:
+            return
+        except ValueError:
+            LOGGER.warning("Ignoring invalid GitHub App token cache file %s", self.cache_path)
+            return
+        self.__installation_ids = cached.get("installation_ids", {})
+        self.__installation_tokens = cached.get("installation_tokens", {})
+
+    def __save(self) -> None:
+        """
+        Save the cached installation IDs and tokens for this app to the cache file, if there is one
+        """
+        if not self.cache_path or not self.client_id:
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            cached = {}
+        cached[self.client_id] = {
+            "installation_ids": self.__installation_ids,
+            "installation_tokens": self.__installation_tokens,
+        }
+        # The tokens are secrets, so only the current user should be able to read the file
+        temp_path = f"{self.cache_path}.tmp"
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(cached, f)
+        os.replace(temp_path, self.cache_path)
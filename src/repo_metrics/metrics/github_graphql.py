@@ -0,0 +1,262 @@
+"""
+Defines a helper for getting metrics from the GitHub GraphQL API, which can get the metrics for many
+repositories in a single request
+"""
+
+import logging
+
+from .github import GitHubException, GitHubMetricsHelper
+
+LOGGER = logging.getLogger(__name__)
+
+# The number of repositories to get in each query. Each repository can pull in 100 releases with 100
+# assets each, so this keeps queries well inside GitHub's limit on the number of nodes in a query
+BATCH_SIZE = 20
+
+# Releases are ordered the same way as the REST API orders them
+RELEASES_FIELDS = """
+    pageInfo { hasNextPage endCursor }
+    nodes {
+        id
+        tagName
+        releaseAssets(first: 100) { pageInfo { hasNextPage endCursor } nodes { downloadCount } }
+    }
+"""
+RELEASES_ARGUMENTS = "first: 100, orderBy: {field: CREATED_AT, direction: DESC}"
+
+# The selections needed for each of the fields get_repo_info can return, and how to get the value of
+# the field from the result. The download count is handled separately, since its releases might need
+# more queries to get them all
+OPEN_ISSUES_SELECTION = "issues(states: OPEN) { totalCount } pullRequests(states: OPEN) { totalCount }"
+REPO_FIELDS = {
+    "name": ("name", lambda data: data["name"]),
+    "full_name": ("nameWithOwner", lambda data: data["nameWithOwner"]),
+    "forks": ("forkCount", lambda data: data["forkCount"]),
+    "forks_count": ("forkCount", lambda data: data["forkCount"]),
+    # The REST API counts open pull requests as open issues
+    "open_issues": (
+        OPEN_ISSUES_SELECTION,
+        lambda data: data["issues"]["totalCount"] + data["pullRequests"]["totalCount"],
+    ),
+    "open_issues_count": (
+        OPEN_ISSUES_SELECTION,
+        lambda data: data["issues"]["totalCount"] + data["pullRequests"]["totalCount"],
+    ),
+    # The REST API's watchers are stargazers, and its subscribers are GraphQL's watchers
+    "watchers": ("stargazerCount", lambda data: data["stargazerCount"]),
+    "watchers_count": ("stargazerCount", lambda data: data["stargazerCount"]),
+    "stargazers_count": ("stargazerCount", lambda data: data["stargazerCount"]),
+    "subscribers_count": ("watchers { totalCount }", lambda data: data["watchers"]["totalCount"]),
+}
+DOWNLOAD_COUNT_SELECTION = f"releases({RELEASES_ARGUMENTS}) {{ {RELEASES_FIELDS} }}"
+
+RELEASES_QUERY = f"""
+query($owner: String!, $name: String!, $cursor: String) {{
+    repository(owner: $owner, name: $name) {{
+        releases({RELEASES_ARGUMENTS}, after: $cursor) {{ {RELEASES_FIELDS} }}
+    }}
+}}
+"""
+
+RELEASE_ASSETS_QUERY = """
+query($id: ID!, $cursor: String) {
+    node(id: $id) {
+        ... on Release {
+            releaseAssets(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } nodes { downloadCount } }
+        }
+    }
+}
+"""
+
+
+class GitHubGraphQLMetricsHelper(GitHubMetricsHelper):
+    """
+    A helper class for getting metrics from the GitHub GraphQL API. Repository info is returned
+    with the same keys as the REST API uses, but only for the metrics fields (see REPO_FIELDS and
+    download_count), and the GraphQL API always needs a GitHub token
+    """
+
+    def get_repo_info(self, owner: str, repo: str, fields: list[str] | None = None) -> dict:
+        """
+        Get info for the specified git repository
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+        :param fields: The fields to get, or None for all of them. Only the parts of the query
+        needed for these fields are included
+
+        :return: A dictionary containing the repository info
+
+        :raises GitHubException: If any requests fail
+        """
+        repo_info = self.get_repo_info_batch([(owner, repo)], fields)[0]
+        if isinstance(repo_info, Exception):
+            raise repo_info
+        return repo_info
+
+    def get_repo_info_batch(
+        self, repos: list[tuple[str, str]], fields: list[str] | None = None
+    ) -> list[dict | Exception]:
+        """
+        Get info for each of the specified git repositories, getting BATCH_SIZE repositories in
+        each query
+
+        :param repos: The (owner, repo) tuples of the repositories
+        :param fields: The fields to get, or None for all of them (see get_repo_info)
+
+        :return: The info for each repository (as returned by get_repo_info), or the exception
+        raised getting it, in the same order as repos
+        """
+        batches = [repos[i : i + BATCH_SIZE] for i in range(0, len(repos), BATCH_SIZE)]
+        batch_results = self.engine.map(
+            lambda batch: self.__query_repos(batch, fields), batches, return_exceptions=True
+        )
+        results = []
+        for batch, batch_result in zip(batches, batch_results):
+            # If the whole query failed, it failed for every repository in it
+            if isinstance(batch_result, Exception):
+                results.extend([batch_result] * len(batch))
+            else:
+                results.extend(batch_result)
+        return results
+
+    def get_release_download_counts(self, owner: str, repo: str) -> dict:
+        """
+        Get download counts for all releases in the specified git repository
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+
+        :return: A dictionary containing the download counts for each release
+
+        :raises GitHubException: If any requests fail
+        """
+        return dict(self.__count_release_downloads(owner, repo, None))
+
+    def __query_repos(self, repos: list[tuple[str, str]], fields: list[str] | None) -> list[dict | Exception]:
+        """
+        Get info for the specified git repositories in a single query (plus more queries for any
+        repositories with more than 100 releases)
+
+        :param repos: The (owner, repo) tuples of the repositories
+        :param fields: The fields to get, or None for all of them
+
+        :return: The info for each repository, or a GitHubException if it couldn't be found
+
+        :raises GitHubException: If the query fails
+        """
+        repo_fields = [field for field in REPO_FIELDS if not fields or field in fields]
+        include_download_count = not fields or "download_count" in fields
+        # Select each thing once, even if more than one field needs it. There always has to be a
+        # selection, so fall back on the name if none of the fields are available
+        selections = list(dict.fromkeys(REPO_FIELDS[field][0] for field in repo_fields)) or ["nameWithOwner"]
+        if include_download_count:
+            selections.append(DOWNLOAD_COUNT_SELECTION)
+        selection = " ".join(selections)
+
+        # Each repository gets an alias in the query, and takes its owner and name from variables
+        variable_definitions = []
+        repo_queries = []
+        variables = {}
+        for i, (owner, repo) in enumerate(repos):
+            variable_definitions.append(f"$owner{i}: String!, $name{i}: String!")
+            repo_queries.append(f"repo{i}: repository(owner: $owner{i}, name: $name{i}) {{ {selection} }}")
+            variables[f"owner{i}"] = owner
+            variables[f"name{i}"] = repo
+        query = f"query({', '.join(variable_definitions)}) {{ {' '.join(repo_queries)} }}"
+
+        body = self.__query(query, variables)
+
+        results = []
+        for i, (owner, repo) in enumerate(repos):
+            repo_data = body["data"].get(f"repo{i}")
+            if not repo_data:
+                messages = [error["message"] for error in body.get("errors", []) if error.get("path") == [f"repo{i}"]]
+                results.append(GitHubException(f"Failed to get info for {owner}/{repo}: {'; '.join(messages)}"))
+                continue
+            repo_info = {field: REPO_FIELDS[field][1](repo_data) for field in repo_fields}
+            if include_download_count:
+                try:
+                    download_counts = self.__count_release_downloads(owner, repo, repo_data["releases"])
+                except GitHubException as e:
+                    results.append(e)
+                    continue
+                repo_info["download_count"] = sum(download_count for _, download_count in download_counts)
+            results.append(repo_info)
+        return results
+
+    def __count_release_downloads(self, owner: str, repo: str, releases: dict | None) -> list[tuple[str, int]]:
+        """
+        Add up the download counts of each release's assets, getting any further pages of releases
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+        :param releases: The first page of releases, if it has already been fetched
+
+        :return: A list of (tag name, download count) tuples, one for each release
+
+        :raises GitHubException: If any requests fail
+        """
+        if releases is None:
+            releases = self.__query_releases(owner, repo, None)
+
+        release_download_counts = []
+        while True:
+            for release in releases["nodes"]:
+                assets = release["releaseAssets"]
+                download_count = sum(asset["downloadCount"] for asset in assets["nodes"])
+                # Releases with more than 100 assets need their assets paginated separately
+                while assets["pageInfo"]["hasNextPage"]:
+                    body = self.__query(
+                        RELEASE_ASSETS_QUERY, {"id": release["id"], "cursor": assets["pageInfo"]["endCursor"]}
+                    )
+                    assets = body["data"]["node"]["releaseAssets"]
+                    download_count += sum(asset["downloadCount"] for asset in assets["nodes"])
+                release_download_counts.append((release["tagName"], download_count))
+
+            if not releases["pageInfo"]["hasNextPage"]:
+                break
+            releases = self.__query_releases(owner, repo, releases["pageInfo"]["endCursor"])
+
+        return release_download_counts
+
+    def __query_releases(self, owner: str, repo: str, cursor: str | None) -> dict:
+        """
+        Get a page of releases for the specified git repository
+
+        :param owner: The owner of the repository
+        :param repo: The name of the repository
+        :param cursor: The cursor to get the page after, or None for the first page
+
+        :return: The releases connection
+
+        :raises GitHubException: If the request fails or the repository can't be found
+        """
+        body = self.__query(RELEASES_QUERY, {"owner": owner, "name": repo, "cursor": cursor})
+        if not body["data"].get("repository"):
+            raise GitHubException(f"Failed to get info for {owner}/{repo}")
+        return body["data"]["repository"]["releases"]
+
+    def __query(self, query: str, variables: dict) -> dict:
+        """
+        Run a GraphQL query
+
+        :param query: The query
+        :param variables: The values of the query's variables
+
+        :return: The response body, with the "data" and any "errors" from the query
+
+        :raises GitHubException: If there's no token, or the query fails entirely
+        """
+        if not self.token:
+            raise GitHubException("The GitHub GraphQL API requires a GitHub token")
+        headers = {"Authorization": f"Bearer {self.token}"}
+        response = self._send(
+            self.session.post, f"{self.api_url}/graphql", headers=headers, json={"query": query, "variables": variables}
+        )
+        if response.status_code != 200:
+            raise GitHubException(f"GraphQL query failed. Response: {response.text}")
+        body = response.json()
+        if not body.get("data"):
+            raise GitHubException(f"GraphQL query failed. Errors: {body.get('errors')}")
+        return body
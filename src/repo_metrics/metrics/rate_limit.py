@@ -0,0 +1,216 @@
+"""
+Defines a scheduler that keeps requests to the GitHub API within its rate limits
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+# When less than this fraction of the budget is left, the number of requests in flight is reduced
+# in proportion to what's left
+THROTTLE_FRACTION = 0.1
+# How long to wait after hitting a secondary rate limit that doesn't say how long to wait for, as
+# recommended by GitHub
+SECONDARY_RATE_LIMIT_WAIT = 60
+
+
+class _RateLimitBucket:
+    """
+    The state of one rate limit budget (GitHub has separate budgets per identity and resource)
+    """
+
+    def __init__(self):
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        # The time the budget resets, in seconds since the epoch
+        self.reset: float | None = None
+        # The time until which no requests should be made, after being told to back off
+        self.blocked_until: float = 0
+        self.in_flight: int = 0
+        self.used: int = 0
+        self.not_modified: int = 0
+
+
+class RateLimiter:
+    """
+    Schedules requests to the GitHub API based on the X-RateLimit headers of the responses, so a
+    large batch slows down as the budget drains and waits for it to reset instead of failing
+    """
+
+    def __init__(self, max_in_flight: int):
+        """
+        Constructor for the RateLimiter class
+
+        :param max_in_flight: The maximum number of requests in flight while there's plenty of
+        budget left
+        """
+        self.max_in_flight = max_in_flight
+        self.__condition = threading.Condition()
+        self.__buckets: dict[tuple[str, str], _RateLimitBucket] = {}
+
+    def acquire(self, url: str, authorization: str | None) -> tuple[str, str]:
+        """
+        Wait until there's budget to make a request
+
+        :param url: The URL of the request
+        :param authorization: The Authorization header of the request, since each identity has its
+        own budget
+
+        :return: The key of the budget the request counts against, to pass to release
+        """
+        key = (self.__get_identity(authorization), self.__get_resource(url))
+        with self.__condition:
+            bucket = self.__buckets.setdefault(key, _RateLimitBucket())
+            while True:
+                now = time.time()
+                # Once the reset time has passed, the budget is unknown again until the next response
+                if bucket.reset is not None and now >= bucket.reset:
+                    bucket.remaining = None
+                    bucket.reset = None
+                wait = self.__get_wait(bucket, now)
+                if wait == 0:
+                    break
+                if wait is not None and bucket.in_flight == 0:
+                    LOGGER.warning("GitHub API rate limit reached, waiting %d seconds", math.ceil(wait))
+                self.__condition.wait(wait)
+            bucket.in_flight += 1
+        return key
+
+    def release(self, key: tuple[str, str], response: requests.Response | None) -> None:
+        """
+        Record the result of a request, updating the budget from the response
+
+        :param key: The key returned by acquire
+        :param response: The response, or None if the request failed without one
+        """
+        with self.__condition:
+            bucket = self.__buckets[key]
+            bucket.in_flight -= 1
+            if response is not None:
+                self.__update(bucket, response)
+            self.__condition.notify_all()
+
+    @staticmethod
+    def is_rate_limited(response: requests.Response) -> bool:
+        """
+        Check whether a request failed because of a rate limit, and so should be retried
+
+        :param response: The response
+
+        :return: True if the request was rate limited
+        """
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+            or "rate limit" in response.text.lower()
+        )
+
+    def get_usage(self) -> dict:
+        """
+        Get how much of the rate limit budget has been used
+
+        :return: A dictionary with the number of requests that counted against the budget, the
+        number of requests served as not modified (which don't count), and the remaining budget for
+        each resource
+        """
+        with self.__condition:
+            usage = {"used": 0, "not_modified": 0, "remaining": {}}
+            for (_, resource), bucket in self.__buckets.items():
+                usage["used"] += bucket.used
+                usage["not_modified"] += bucket.not_modified
+                if bucket.remaining is not None:
+                    usage["remaining"][resource] = min(bucket.remaining, usage["remaining"].get(resource, math.inf))
+            return usage
+
+    def log_usage(self) -> None:
+        """
+        Log how much of the rate limit budget has been used
+        """
+        usage = self.get_usage()
+        LOGGER.info(
+            "GitHub API rate limit budget used: %d requests (%d more served from cache), remaining: %s",
+            usage["used"],
+            usage["not_modified"],
+            usage["remaining"] or "unknown",
+        )
+
+    def __get_wait(self, bucket: _RateLimitBucket, now: float) -> float | None:
+        """
+        Get how long to wait before a request can be made against a budget
+
+        :return: 0 if the request can be made now, the number of seconds to wait, or None to wait
+        for a request in flight to finish
+        """
+        if bucket.blocked_until > now:
+            return bucket.blocked_until - now
+        if bucket.remaining is None:
+            return 0 if bucket.in_flight < self.max_in_flight else None
+        if bucket.remaining - bucket.in_flight <= 0:
+            # Out of budget, so wait for the reset (or for the requests in flight to tell us more)
+            if bucket.in_flight > 0:
+                return None
+            if bucket.reset is None:
+                # Without a reset time, treat the budget as resetting after the secondary rate limit
+                # wait, so a request can then find out whether it has
+                bucket.reset = now + SECONDARY_RATE_LIMIT_WAIT
+            return max(bucket.reset - now, 0) + 1
+        # Throttle the requests in flight as the budget drains
+        allowed = self.max_in_flight
+        low_water = (bucket.limit or 0) * THROTTLE_FRACTION
+        if bucket.remaining < low_water:
+            allowed = max(1, int(self.max_in_flight * bucket.remaining / low_water))
+        return 0 if bucket.in_flight < allowed else None
+
+    def __update(self, bucket: _RateLimitBucket, response: requests.Response) -> None:
+        """
+        Update a budget from the headers of a response
+        """
+        headers = response.headers
+        if "X-RateLimit-Remaining" in headers:
+            bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            bucket.limit = int(headers.get("X-RateLimit-Limit", bucket.limit or 0))
+            if "X-RateLimit-Reset" in headers:
+                bucket.reset = float(headers["X-RateLimit-Reset"])
+            # Not modified responses to authorized requests don't count against the rate limit
+            if response.status_code == 304:
+                bucket.not_modified += 1
+            else:
+                bucket.used += 1
+        if self.is_rate_limited(response):
+            if "Retry-After" in headers:
+                wait = int(headers["Retry-After"])
+            elif headers.get("X-RateLimit-Remaining") == "0" and bucket.reset is not None:
+                wait = max(bucket.reset - time.time(), 0) + 1
+            else:
+                wait = SECONDARY_RATE_LIMIT_WAIT
+            bucket.blocked_until = max(bucket.blocked_until, time.time() + wait)
+
+    @staticmethod
+    def __get_identity(authorization: str | None) -> str:
+        """
+        Get a key for the identity of a request, without keeping the token itself around
+        """
+        return hashlib.sha256(authorization.encode()).hexdigest() if authorization else ""
+
+    @staticmethod
+    def __get_resource(url: str) -> str:
+        """
+        Get the name of the rate limit resource a request counts against
+        """
+        path = urlparse(url).path
+        if path == "/graphql":
+            return "graphql"
+        if path.startswith("/search/"):
+            return "search"
+        return "core"
@@ -0,0 +1,268 @@
+"""
+Defines the policies for making requests: how long to wait for a response, how to retry requests
+that fail transiently, and when to send a duplicate (hedged) request for one that's slow. Policies
+can be set per endpoint
+"""
+
+import fnmatch
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields, replace
+from typing import Callable
+from urllib.parse import urlparse
+
+import requests
+
+from .session import RETRY_STATUSES
+
+LOGGER = logging.getLogger(__name__)
+
+# Path segments that are followed by names or IDs, and what to replace those with in the name of an
+# endpoint, so requests for different repositories are treated the same way
+PATH_PARAMETERS = {
+    "repos": ["{owner}", "{repo}"],
+    "users": ["{owner}"],
+    "orgs": ["{owner}"],
+    "installations": ["{id}"],
+    "repositories": ["{namespace}", "{repo}"],
+    "tags": ["{tag}"],
+}
+# The most hedged requests to have waiting on a response at once, across every policy
+MAX_HEDGE_WORKERS = 32
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """
+    How to make a request
+    """
+
+    # How long to wait to connect, and then for each read of the response, in seconds
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    # How many times to retry a request that fails with a connection error, a timeout or one of the
+    # RETRY_STATUSES
+    retries: int = 3
+    # The methods whose requests are retried. A failed POST may still have taken effect, so it's
+    # only retried for endpoints that are known to be safe to repeat (e.g. GraphQL queries)
+    retry_methods: tuple[str, ...] = ("GET", "HEAD")
+    # Retries wait a random time between 0 and backoff_base * 2 ** (retry number), up to
+    # backoff_max, so requests that failed together don't all retry together
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    # If set, a duplicate request is sent if there's no response after this many seconds, and the
+    # first response to arrive is used. Only use this for requests that are safe to repeat
+    hedge_after: float | None = None
+
+    def get_backoff(self, retry: int) -> float:
+        """
+        Get how long to wait before a retry, with full jitter
+
+        :param retry: The number of the retry, starting from 0
+
+        :return: The time to wait, in seconds
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**retry))
+
+    def run(self, attempt: Callable[[], requests.Response], method: str, url: str) -> requests.Response:
+        """
+        Make a request, retrying it if it fails transiently and its method is one of retry_methods
+
+        :param attempt: Function that makes one attempt at the request (e.g. with send)
+        :param method: The method of the request
+        :param url: The URL of the request, for logging
+
+        :return: The response (which is the last failed response if the retries run out)
+
+        :raises requests.RequestException: If the last attempt fails without a response
+        """
+        retries = self.retries if method.upper() in self.retry_methods else 0
+        retry = 0
+        while True:
+            try:
+                response = attempt()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if retry == retries:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES or retry == retries:
+                    return response
+                reason = f"status {response.status_code}"
+            backoff = self.get_backoff(retry)
+            LOGGER.warning("Request to %s failed (%s), retrying in %.1f seconds", url, reason, backoff)
+            time.sleep(backoff)
+            retry += 1
+
+    def send(self, method: Callable[..., requests.Response], url: str, **kwargs) -> requests.Response:
+        """
+        Make one attempt at a request, with the policy's timeouts, hedging it if the policy says to.
+        The hedge is made with the same method, so a method that waits for a free slot or for rate
+        limit budget before making the request counts the hedge against those too
+
+        :param method: The function to make the request with (e.g. a session method)
+        :param url: The URL to request
+        :param kwargs: Any other arguments to pass to the method
+
+        :return: The response
+
+        :raises requests.RequestException: If the request (and its hedge) fail without a response
+        """
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        if self.hedge_after is None:
+            return method(url, **kwargs)
+
+        executor = _get_hedge_executor()
+        futures = [executor.submit(method, url, **kwargs)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            LOGGER.debug("No response from %s after %.1f seconds, hedging", url, self.hedge_after)
+            futures.append(executor.submit(method, url, **kwargs))
+        return _first_result(futures)
+
+
+class RequestPolicies:
+    """
+    The request policies for each endpoint. An endpoint is named by its method, host and path with
+    the names and IDs in it replaced by placeholders (see get_endpoint), e.g.
+    "GET api.github.com/repos/{owner}/{repo}/releases", and the policies are matched against that
+    name with shell-style wildcards, e.g. "GET */releases"
+    """
+
+    def __init__(self, default: RequestPolicy | None = None, endpoints: dict[str, RequestPolicy] | None = None):
+        """
+        Constructor for the RequestPolicies class
+
+        :param default: The policy for endpoints that don't match any of the patterns
+        :param endpoints: Map of endpoint pattern to the policy for the endpoints that match it. The
+        first pattern that matches is used
+        """
+        self.default = default if default else RequestPolicy()
+        self.endpoints = endpoints if endpoints else {}
+
+    @classmethod
+    def load_from_json_file(cls, path: str | None) -> "RequestPolicies":
+        """
+        Load the request policies from a json file like:
+
+            {
+                "default": {"connect_timeout": 5, "read_timeout": 30, "retries": 3},
+                "endpoints": {"GET */releases": {"hedge_after": 2}, "POST */graphql": {"retry_methods": ["POST"]}}
+            }
+
+        Each endpoint's policy starts from the default one, and any of the RequestPolicy fields can
+        be set
+
+        :param path: The path to the file, or None for the default policies
+
+        :return: The request policies
+
+        :raises ValueError: If the file sets fields that don't exist
+        """
+        if not path:
+            return cls()
+        with open(path, "r") as f:
+            config = json.load(f)
+        default = _make_policy(RequestPolicy(), config.get("default", {}))
+        endpoints = {
+            pattern: _make_policy(default, endpoint_config)
+            for pattern, endpoint_config in config.get("endpoints", {}).items()
+        }
+        return cls(default, endpoints)
+
+    def get(self, method: str, url: str) -> RequestPolicy:
+        """
+        Get the policy for a request
+
+        :param method: The method of the request
+        :param url: The URL of the request
+
+        :return: The policy
+        """
+        endpoint = get_endpoint(method, url)
+        for pattern, policy in self.endpoints.items():
+            if fnmatch.fnmatchcase(endpoint, pattern):
+                return policy
+        return self.default
+
+
+def get_endpoint(method: str, url: str) -> str:
+    """
+    Get the name of the endpoint a request is for: its method, host and path, with the names and
+    IDs in the path replaced by placeholders (see PATH_PARAMETERS)
+
+    :param method: The method of the request
+    :param url: The URL of the request
+
+    :return: The name of the endpoint, e.g. "GET api.github.com/repos/{owner}/{repo}/releases"
+    """
+    parsed = urlparse(url)
+    segments = parsed.path.split("/")
+    i = 0
+    while i < len(segments):
+        parameters = PATH_PARAMETERS.get(segments[i], [])
+        for j, parameter in enumerate(parameters, start=i + 1):
+            if j < len(segments) and segments[j]:
+                segments[j] = parameter
+        i += len(parameters) + 1
+    return f"{method.upper()} {parsed.netloc}{'/'.join(segments)}"
+
+
+def _make_policy(base: RequestPolicy, config: dict) -> RequestPolicy:
+    """
+    Make a policy from the fields set in a config, taking the rest from a base policy
+    """
+    unknown = set(config) - {field.name for field in fields(RequestPolicy)}
+    if unknown:
+        raise ValueError(f"Unknown request policy fields: {', '.join(sorted(unknown))}")
+    if "retry_methods" in config:
+        # Kept as a tuple so policies stay immutable
+        config = {**config, "retry_methods": tuple(method.upper() for method in config["retry_methods"])}
+    return replace(base, **config)
+
+
+_hedge_executor: ThreadPoolExecutor | None = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """
+    Get the executor that hedged requests are made on, creating it the first time it's needed
+    """
+    global _hedge_executor  # pylint: disable=W0603
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=MAX_HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _hedge_executor
+
+
+def _first_result(futures: list[Future]) -> requests.Response:
+    """
+    Get the first response from a request and its hedge. If one fails without a response, the
+    other is waited for. The slower request is cancelled if it hasn't started yet, and otherwise
+    left to finish in the background, closing its response so its connection goes back to the pool
+    """
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(_close_response)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _close_response(future: Future) -> None:
+    """
+    Close the response of a finished request that's no longer needed, if it got one
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
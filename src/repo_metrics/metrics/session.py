@@ -0,0 +1,40 @@
+"""
+Defines a function for creating the pooled HTTP session shared by the metrics helpers
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 8
+# Retries are left to the request policies (see request_policy.py), which back off with jitter
+DEFAULT_RETRIES = 0
+# Statuses that are worth retrying because they are usually transient
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES) -> requests.Session:
+    """
+    Create a session that keeps connections alive and reuses them across requests, so a run only
+    opens a handful of connections per host instead of one per request
+
+    :param pool_size: The maximum number of connections to keep open to each host. There's no
+    point in this being larger than the number of requests in flight at once
+    :param retries: The number of times to retry a GET request that fails with a connection error
+    or one of the RETRY_STATUSES
+
+    :return: The session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+        # Return the last response instead of raising so the helpers can report the failure
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,4 +1,7 @@
 from .config import OutputConfig
 from .csv_output import CsvOutput
 from .json_output import JsonOutput
+from .jsonl_output import JsonLinesOutput, read_json_lines
 from .output_type import Output, OutputType
+from .parquet_output import ParquetOutput
+from .sqlite_output import SqliteOutput
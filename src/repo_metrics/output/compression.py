@@ -0,0 +1,63 @@
+"""
+Defines functions for opening output files that are transparently compressed based on their
+extension: .gz for gzip and .zst for zstd (which needs the optional zstandard package)
+"""
+
+import gzip
+import io
+from typing import IO
+
+GZIP = "gzip"
+ZSTD = "zstd"
+EXTENSIONS = {".gz": GZIP, ".zst": ZSTD}
+
+
+def get_compression(path: str) -> str | None:
+    """
+    Get the compression to use for a path, based on its extension
+
+    :param path: The path
+
+    :return: GZIP, ZSTD, or None if the path isn't compressed
+    """
+    for extension, compression in EXTENSIONS.items():
+        if str(path).endswith(extension):
+            return compression
+    return None
+
+
+def open_file(path: str, mode: str = "r", newline: str | None = None, compression: str | None = None) -> IO:
+    """
+    Open a file, compressing what's written to it and decompressing what's read from it if its
+    path has a compressed extension. Appending adds a new gzip member or zstd frame to the end of
+    the file, so it doesn't need to read the existing data, and reading reads across all of them
+
+    :param path: The path to the file
+    :param mode: "r", "w" or "a", plus "b" for binary mode
+    :param newline: How to handle newlines in text mode, as for open
+    :param compression: The compression to use, if it shouldn't be based on the path (e.g. for a
+    temporary file that will replace a compressed one)
+
+    :return: The file object
+
+    :raises ImportError: If the file is zstd compressed and zstandard isn't installed
+    """
+    compression = compression if compression is not None else get_compression(path)
+    binary = "b" in mode
+    if compression == GZIP:
+        if binary:
+            return gzip.open(path, mode)
+        return gzip.open(path, mode.replace("t", "") + "t", newline=newline)
+    if compression == ZSTD:
+        try:
+            import zstandard  # pylint: disable=C0415
+        except ImportError as e:
+            raise ImportError(
+                "zstd compression requires zstandard. Install it with: pip install repo_metrics[zstd]"
+            ) from e
+        if "r" in mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "ab" if "a" in mode else "wb"), closefd=True)
+        return stream if binary else io.TextIOWrapper(stream, newline=newline)
+    return open(path, mode, newline=newline) if not binary else open(path, mode)
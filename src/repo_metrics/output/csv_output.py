@@ -1,8 +1,10 @@
 import csv
 import os
+from typing import TextIO
 
+from .compression import get_compression, open_file
 from .output_type import Output
-from .preprocess import flatten
+from .preprocess import flatten, flatten_batch
 
 
 class CsvOutput(Output):
@@ -12,10 +14,18 @@ class CsvOutput(Output):
         Constructor for the CsvOutput class
 
         :param path: The path to the file to write
-        :param mode: Mode for writing to the file
+        :param append: Whether to append to the file instead of overwriting it
         """
         self.path = path
         self.append = append
+        self.__file: TextIO | None = None
+        self.__writer = None
+        # The columns of the rows being streamed, in the order their values are written, and the
+        # columns in the header of the file
+        self.__fieldnames: list[str] | None = None
+        self.__header: list[str] | None = None
+        # Whether the rows being streamed are collected and written on close instead
+        self.__buffered = False
 
     def write(self, data: list[dict]) -> None:
         """
@@ -24,57 +34,121 @@ class CsvOutput(Output):
         :param data: The data to print
         """
         # Flatten the data
-        flattened_data = []
-        for d in data:
-            flattened_data.append(flatten(d))
-        data = flattened_data
+        table = flatten_batch(data)
 
-        fieldnames_set = set()
+        # Only the header of an existing file is needed to tell whether the new rows fit in it
+        existing_fieldnames = self.__read_header() if self.append else None
 
-        # Rewrite the file if the header is different
-        rewrite = False
+        fieldnames_set = set(existing_fieldnames or [])
+        fieldnames_set.update(table.fieldnames)
+
+        # If the new rows fit the existing header, append them directly (keeping the existing
+        # column order) so appending doesn't depend on the size of the file
+        if existing_fieldnames is not None and fieldnames_set == set(existing_fieldnames):
+            with open_file(self.path, "a", newline="") as f:
+                csv.writer(f).writerows(table.rows(existing_fieldnames, missing=""))
+            return
 
-        # Read existing fieldnames if appending
-        if self.append:
-            try:
-                with open(self.path, "r") as f:
-                    # Check if the header is different
-                    reader = csv.DictReader(f)
-                    existing_fieldnames = reader.fieldnames
-                    if existing_fieldnames is not None:
-                        if set(existing_fieldnames) != fieldnames_set:
-                            rewrite = True
-                    # Add existing fieldnames to the set
-                    fieldnames_set.update(existing_fieldnames)
-            except FileNotFoundError:
-                pass
-
-        # Add new fieldnames to the set
-        for d in data:
-            fieldnames_set.update(d.keys())
         fieldnames_list = sorted(fieldnames_set)
 
-        # If we have to rewrite the file, read from the existing file and write to a temporary file
-        if rewrite:
-            with open(self.path, "r") as f:
-                with open(self.path + ".tmp", "w", newline="") as f_tmp:
+        # If there are new columns, the file has to be rewritten with the new header, so read from
+        # the existing file and write to a temporary file
+        if existing_fieldnames is not None:
+            with open_file(self.path, "r", newline="") as f:
+                with open_file(self.path + ".tmp", "w", newline="", compression=get_compression(self.path)) as f_tmp:
                     reader = csv.DictReader(f)
                     writer = csv.DictWriter(f_tmp, fieldnames=fieldnames_list, restval="", extrasaction="ignore")
                     writer.writeheader()
                     # Write the existing rows to the temporary file
                     for row in reader:
-                        # row.update((k, "") for k in fieldnames_list if k not in row)
                         writer.writerow(row)
                     # Write the new data to the temporary file
-                    for d in data:
-                        writer.writerow(d)
+                    csv.writer(f_tmp).writerows(table.rows(fieldnames_list, missing=""))
             # Replace the existing file with the temporary file
             os.replace(self.path + ".tmp", self.path)
-        # Otherwise, just write the data to the file
+        # Otherwise, there's nothing to keep, so just write the data to the file
         else:
-            with open(self.path, "a" if self.append else "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames_list)
-                if not self.append:
-                    writer.writeheader()
-                for d in data:
-                    writer.writerow(d)
+            with open_file(self.path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(fieldnames_list)
+                writer.writerows(table.rows(fieldnames_list, missing=""))
+
+    def open(self) -> None:
+        """
+        Start writing rows one at a time. Each row is written to the file as it comes; if rows
+        bring new columns, the header is rewritten once when the output is closed. That needs a
+        regular file, so rows for anything else (e.g. /dev/stdout or a pipe) are collected and
+        written with the full header on close
+        """
+        self.__buffered = os.path.exists(self.path) and not os.path.isfile(self.path)
+        if self.__buffered:
+            super().open()
+            return
+        existing_fieldnames = self.__read_header() if self.append else None
+        self.__file = open_file(self.path, "a" if existing_fieldnames is not None else "w", newline="")
+        self.__writer = csv.writer(self.__file)
+        self.__header = existing_fieldnames
+        self.__fieldnames = list(existing_fieldnames) if existing_fieldnames is not None else None
+
+    def write_row(self, row: dict) -> None:
+        """
+        Write a single row, flushing it to the file
+
+        :param row: The row to write
+        """
+        if self.__buffered:
+            super().write_row(row)
+            return
+        flattened = flatten(row)
+        if self.__fieldnames is None:
+            # The first row of a new file decides the header
+            self.__fieldnames = sorted(flattened)
+            self.__header = list(self.__fieldnames)
+            self.__writer.writerow(self.__header)
+        # New columns go after the existing ones, so the rows already written stay lined up
+        known_fieldnames = set(self.__fieldnames)
+        self.__fieldnames.extend(key for key in flattened if key not in known_fieldnames)
+        self.__writer.writerow([flattened.get(fieldname, "") for fieldname in self.__fieldnames])
+        self.__file.flush()
+
+    def close(self) -> None:
+        """
+        Finish writing rows one at a time, rewriting the file with a sorted header of all the columns
+        if new columns appeared after the header was written
+        """
+        if self.__buffered:
+            super().close()
+            return
+        self.__file.close()
+        self.__file = None
+        self.__writer = None
+        if self.__fieldnames is None or self.__fieldnames == self.__header:
+            return
+
+        fieldnames_list = sorted(self.__fieldnames)
+        indexes = {fieldname: i for i, fieldname in enumerate(self.__fieldnames)}
+        positions = [indexes[fieldname] for fieldname in fieldnames_list]
+        with open_file(self.path, "r", newline="") as f:
+            with open_file(self.path + ".tmp", "w", newline="", compression=get_compression(self.path)) as f_tmp:
+                reader = csv.reader(f)
+                writer = csv.writer(f_tmp)
+                # Skip the old header
+                next(reader)
+                writer.writerow(fieldnames_list)
+                for row in reader:
+                    # Rows written before a column appeared are shorter
+                    row += [""] * (len(self.__fieldnames) - len(row))
+                    writer.writerow([row[position] for position in positions])
+        os.replace(self.path + ".tmp", self.path)
+
+    def __read_header(self) -> list[str] | None:
+        """
+        Read the header of the existing file, without reading the rest of it
+
+        :return: The fieldnames in the header, or None if the file doesn't exist or is empty
+        """
+        try:
+            with open_file(self.path, "r", newline="") as f:
+                return next(csv.reader(f), None)
+        except FileNotFoundError:
+            return None
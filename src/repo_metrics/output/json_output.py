@@ -1,28 +1,156 @@
 import json
+import os
+from typing import BinaryIO, Iterable
 
+from .compression import get_compression, open_file
 from .output_type import Output
 
+# The indentation of the rows in the output file
+INDENT = 4
+# How much of the end of an existing file to read at a time, when looking for the end of its array
+TAIL_BLOCK_SIZE = 4096
+
 
 class JsonOutput(Output):
 
     def __init__(self, path, append=False):
         self.path = path
         self.append = append
+        self.__file: BinaryIO | None = None
+        self.__first_row = True
+        # The temporary file being written in place of a compressed file being appended to
+        self.__temp_path: str | None = None
 
-    def write(self, data: list[dict]) -> None:
+    def write(self, data: Iterable[dict]) -> None:
         """
         Prints the specified data in Json format
 
         :param data: The data to print
         """
-        # If we are appending, read the existing data
-        if self.append:
-            try:
-                with open(self.path, "r") as f:
-                    existing_data = json.load(f)
-            except FileNotFoundError:
-                existing_data = []
-            data = existing_data + data
-        # Write the data to the file
-        with open(self.path, "w") as f:
-            json.dump(data, f, indent=4)
+        with self:
+            for row in data:
+                self.write_row(row)
+
+    def open(self) -> None:
+        """
+        Start writing rows one at a time. The file is kept a valid JSON array (once closed) with the
+        same formatting as json.dump with an indent of 4. When appending, the rows are added to the
+        end of the existing array without reading the rest of the file (unless the file is
+        compressed, since the closing bracket can't be removed from compressed data, in which case
+        the existing array is copied to a new file a block at a time)
+
+        :raises ValueError: If appending to a file that doesn't end with a JSON array
+        """
+        self.__first_row = True
+        if self.append and os.path.exists(self.path):
+            if get_compression(self.path):
+                self.__copy_array()
+            else:
+                self.__file = open(self.path, "r+b")
+                self.__reopen_array()
+            return
+        self.__file = open_file(self.path, "wb")
+        self.__file.write(b"[")
+
+    def write_row(self, row: dict) -> None:
+        """
+        Write a single row to the end of the array, flushing it to the file
+
+        :param row: The row to write
+        """
+        separator = "\n" if self.__first_row else ",\n"
+        text = " " * INDENT + json.dumps(row, indent=INDENT).replace("\n", "\n" + " " * INDENT)
+        self.__file.write((separator + text).encode())
+        self.__file.flush()
+        self.__first_row = False
+
+    def close(self) -> None:
+        """
+        Close the array and the file
+        """
+        self.__file.write(b"]" if self.__first_row else b"\n]")
+        self.__file.close()
+        self.__file = None
+        if self.__temp_path:
+            os.replace(self.__temp_path, self.path)
+            self.__temp_path = None
+
+    def __copy_array(self) -> None:
+        """
+        Copy the array in the existing compressed file to a temporary file, without its closing
+        bracket (and the whitespace before it), so rows can be added after the existing ones. The
+        temporary file replaces the existing one when the output is closed
+        """
+        self.__temp_path = self.path + ".tmp"
+        self.__file = open_file(self.__temp_path, "wb", compression=get_compression(self.path))
+        try:
+            # Hold back the end of the data, since that's where the closing bracket is
+            tail = b""
+            with open_file(self.path, "rb") as f:
+                for block in iter(lambda: f.read(TAIL_BLOCK_SIZE), b""):
+                    tail += block
+                    if len(tail) > 2 * TAIL_BLOCK_SIZE:
+                        self.__file.write(tail[:-TAIL_BLOCK_SIZE])
+                        tail = tail[-TAIL_BLOCK_SIZE:]
+            tail = tail.rstrip()
+            if not tail:
+                # The file is empty, so start a new array
+                self.__file.write(b"[")
+                return
+            tail = tail[:-1].rstrip() if tail.endswith(b"]") else b""
+            if not tail:
+                raise ValueError(f"Cannot append to {self.path}: it doesn't end with a JSON array")
+            # If the array is empty, the next row is the first one
+            self.__first_row = tail.endswith(b"[")
+            self.__file.write(tail)
+        except Exception:
+            self.__file.close()
+            self.__file = None
+            os.remove(self.__temp_path)
+            self.__temp_path = None
+            raise
+
+    def __reopen_array(self) -> None:
+        """
+        Remove the closing bracket (and the whitespace before it) from the array at the end of the
+        existing file, so rows can be added after the existing ones
+        """
+        end = self.__find_last_non_whitespace(self.__file.seek(0, 2))
+        if end is None:
+            # The file is empty, so start a new array
+            self.__file.truncate(0)
+            self.__file.write(b"[")
+            return
+        if self.__read_byte(end) != b"]":
+            raise ValueError(f"Cannot append to {self.path}: it doesn't end with a JSON array")
+        last = self.__find_last_non_whitespace(end)
+        if last is None:
+            raise ValueError(f"Cannot append to {self.path}: it doesn't end with a JSON array")
+        # If the array is empty, the next row is the first one
+        self.__first_row = self.__read_byte(last) == b"["
+        self.__file.truncate(last + 1)
+        self.__file.seek(last + 1)
+
+    def __find_last_non_whitespace(self, end: int) -> int | None:
+        """
+        Find the position of the last non-whitespace byte in the file before end, reading backwards
+        from end a block at a time
+
+        :return: The position, or None if there is only whitespace before end
+        """
+        while end > 0:
+            start = max(0, end - TAIL_BLOCK_SIZE)
+            self.__file.seek(start)
+            block = self.__file.read(end - start)
+            stripped = block.rstrip()
+            if stripped:
+                return start + len(stripped) - 1
+            end = start
+        return None
+
+    def __read_byte(self, position: int) -> bytes:
+        """
+        Read the byte at a position in the file
+        """
+        self.__file.seek(position)
+        return self.__file.read(1)
@@ -0,0 +1,71 @@
+import json
+from typing import Iterable, Iterator, TextIO
+
+from .compression import open_file
+from .output_type import Output
+
+
+class JsonLinesOutput(Output):
+    """
+    Writes data in JSON Lines format (one JSON object per line). Unlike JsonOutput, appending
+    doesn't need to read the existing file, so it costs the same no matter how long the history is
+    """
+
+    def __init__(self, path, append=False):
+        """
+        Constructor for the JsonLinesOutput class
+
+        :param path: The path to the file to write
+        :param append: Whether to append to the file instead of overwriting it
+        """
+        self.path = path
+        self.append = append
+        self.__file: TextIO | None = None
+
+    def write(self, data: Iterable[dict]) -> None:
+        """
+        Prints the specified data in JSON Lines format
+
+        :param data: The data to print
+        """
+        lines = "".join(json.dumps(d) + "\n" for d in data)
+        # Write all the lines at once, so appending is a single write to the end of the file
+        with open_file(self.path, "a" if self.append else "w") as f:
+            f.write(lines)
+
+    def open(self) -> None:
+        """
+        Start writing rows one at a time
+        """
+        self.__file = open_file(self.path, "a" if self.append else "w")
+
+    def write_row(self, row: dict) -> None:
+        """
+        Write a single row, flushing it to the file
+
+        :param row: The row to write
+        """
+        self.__file.write(json.dumps(row) + "\n")
+        self.__file.flush()
+
+    def close(self) -> None:
+        """
+        Finish writing rows one at a time
+        """
+        self.__file.close()
+        self.__file = None
+
+
+def read_json_lines(path) -> Iterator[dict]:
+    """
+    Read the objects from a JSON Lines file one at a time, so the whole file never has to be held in
+    memory
+
+    :param path: The path to the file to read
+
+    :return: An iterator over the objects in the file, skipping any blank lines
+    """
+    with open_file(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
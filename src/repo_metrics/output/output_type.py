@@ -9,13 +9,49 @@ class OutputType(str, Enum):
 
     JSON = ("json",)
     CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+    SQLITE = "sqlite"
 
 
 class Output(ABC):
     """
     Abstract base class for output types
+
+    Data can be written all at once with write, or a row at a time by using the output as a context
+    manager (or calling open, write_row and close). Outputs that can write rows as they come
+    override the streaming methods; by default the rows are collected and passed to write on close
     """
 
     @abstractmethod
-    def write(self, data: dict) -> None:
+    def write(self, data: list[dict]) -> None:
         pass
+
+    def open(self) -> None:
+        """
+        Start writing rows one at a time
+        """
+        self._rows: list[dict] = []
+
+    def write_row(self, row: dict) -> None:
+        """
+        Write a single row. Must be called between open and close
+
+        :param row: The row to write
+        """
+        self._rows.append(row)
+
+    def close(self) -> None:
+        """
+        Finish writing rows one at a time
+        """
+        rows, self._rows = self._rows, []
+        self.write(rows)
+
+    def __enter__(self) -> "Output":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Close even if something went wrong, so the rows written so far are kept
+        self.close()
@@ -0,0 +1,124 @@
+import datetime
+import os
+import uuid
+
+from .compression import get_compression
+from .output_type import Output
+from .preprocess import flatten_batch
+
+
+class ParquetOutput(Output):
+    """
+    Writes data as a Parquet file, with a typed column for each key of the flattened data (named the
+    same as the CSV columns). Needs pyarrow, which is an optional dependency (install
+    repo_metrics[parquet])
+
+    When appending, the path is a directory of Parquet files partitioned by the day they were
+    written (e.g. {path}/date=2024-01-31/part-{id}.parquet), so each append adds a new file instead
+    of rewriting the existing ones. The directory can be read as a single dataset with
+    pyarrow.dataset or pandas.read_parquet
+
+    Parquet files are compressed internally, with snappy by default, or gzip or zstd if the path
+    ends in .gz or .zst (the files are still plain Parquet files)
+
+    Each column keeps the type it has in the files already in the directory, and a column that's
+    null in every row is written as a string column (or with its type from the existing files), so
+    the files in a directory all have the same schema
+    """
+
+    def __init__(self, path, append=False):
+        """
+        Constructor for the ParquetOutput class
+
+        :param path: The path to the file to write, or the directory to append to
+        :param append: Whether to append to the directory at path instead of overwriting the file
+
+        :raises ImportError: If pyarrow isn't installed
+        """
+        try:
+            import pyarrow  # noqa: F401  # pylint: disable=C0415,W0611
+        except ImportError as e:
+            raise ImportError(
+                "Parquet output requires pyarrow. Install it with: pip install repo_metrics[parquet]"
+            ) from e
+        self.path = path
+        self.append = append
+
+    def write(self, data: list[dict]) -> None:
+        """
+        Writes the specified data in Parquet format
+
+        :param data: The data to write
+
+        :raises ValueError: If appending and the path is an existing file rather than a directory
+        """
+        import pyarrow as pa  # pylint: disable=C0415
+        import pyarrow.parquet as pq  # pylint: disable=C0415
+
+        table = pa.Table.from_pydict(flatten_batch(data).columns())
+        compression = get_compression(self.path) or "snappy"
+
+        if not self.append:
+            pq.write_table(_with_stable_types(table, {}), self.path, compression=compression)
+            return
+
+        if os.path.isfile(self.path):
+            raise ValueError(f"Cannot append to {self.path}: appending to Parquet output needs a directory")
+        table = _with_stable_types(table, _get_existing_types(self.path))
+        today = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+        partition = os.path.join(self.path, f"date={today}")
+        os.makedirs(partition, exist_ok=True)
+        pq.write_table(table, os.path.join(partition, f"part-{uuid.uuid4().hex}.parquet"), compression=compression)
+
+
+def _get_existing_types(path: str) -> dict:
+    """
+    Get the type of each column in the Parquet files already in a directory, from the first file
+    that has values for it
+
+    :param path: The directory
+
+    :return: Map of column name to type
+    """
+    import pyarrow as pa  # pylint: disable=C0415
+    import pyarrow.parquet as pq  # pylint: disable=C0415
+
+    types = {}
+    for directory, _, filenames in sorted(os.walk(path)):
+        for filename in sorted(filenames):
+            if not filename.endswith(".parquet"):
+                continue
+            for field in pq.read_schema(os.path.join(directory, filename)):
+                if not pa.types.is_null(field.type):
+                    types.setdefault(field.name, field.type)
+    return types
+
+
+def _with_stable_types(table, existing_types: dict):
+    """
+    Give each column of a table the type it has in the existing files, if it can be cast to it, and
+    a column that's null in every row a string type if the existing files don't have it. A column
+    typed as null can't be read together with files where it has values
+
+    :param table: The table
+    :param existing_types: Map of column name to its type in the existing files
+
+    :return: The table with the types changed
+    """
+    import pyarrow as pa  # pylint: disable=C0415
+
+    for i, field in enumerate(table.schema):
+        column_type = existing_types.get(field.name)
+        if column_type is None:
+            if not pa.types.is_null(field.type):
+                continue
+            column_type = pa.string()
+        if column_type == field.type:
+            continue
+        try:
+            column = table.column(i).cast(column_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Leave values that don't fit the existing type as they are rather than lose them
+            continue
+        table = table.set_column(i, field.name, column)
+    return table
@@ -3,7 +3,7 @@ Defines functions for filtering and merging metrics data so it is ready to be ha
 output classes
 """
 
-from typing import List
+from typing import Any, Dict, List
 
 
 def filter(data: dict, fields: List[str] | None) -> dict:
@@ -54,3 +54,133 @@ def flatten(data: dict, prefix: str = "") -> dict:
         else:
             flattened_data[prefix + key] = value
     return flattened_data
+
+
+class FlatTable:
+    """
+    A batch of flattened records sharing one schema: the flattened key names (in the order they
+    first appear, as flatten would produce them) and, for each record, its values by column index
+    """
+
+    def __init__(self, fieldnames: List[str], records: List[Dict[int, Any]]):
+        """
+        Constructor for the FlatTable class
+
+        :param fieldnames: The flattened key names
+        :param records: The values of each record, keyed by the index of their field in fieldnames.
+        Fields a record doesn't have are left out
+        """
+        self.fieldnames = fieldnames
+        self.__records = records
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def rows(self, fieldnames: List[str] | None = None, missing: Any = None) -> List[tuple]:
+        """
+        Get the records as tuples of values
+
+        :param fieldnames: The fields to include, in order, or None for all of them. Fields that
+        aren't in the table are treated as missing from every record
+        :param missing: The value to use for fields a record doesn't have
+
+        :return: A tuple for each record
+        """
+        indexes = self.__get_indexes(fieldnames)
+        return [tuple(record.get(i, missing) for i in indexes) for record in self.__records]
+
+    def columns(self, missing: Any = None) -> Dict[str, list]:
+        """
+        Get the values of each field as a column
+
+        :param missing: The value to use for fields a record doesn't have
+
+        :return: A dictionary mapping each field name to a list of its values, one per record
+        """
+        return {
+            fieldname: [record.get(i, missing) for record in self.__records]
+            for i, fieldname in enumerate(self.fieldnames)
+        }
+
+    def records(self) -> List[dict]:
+        """
+        Get the records as flattened dictionaries, as flatten would return them
+
+        :return: A dictionary for each record, with only the fields it has
+        """
+        return [{self.fieldnames[i]: value for i, value in record.items()} for record in self.__records]
+
+    def __get_indexes(self, fieldnames: List[str] | None) -> List[int]:
+        """
+        Get the column indexes of the fields, with -1 (which no record has) for unknown fields
+        """
+        if fieldnames is None:
+            return list(range(len(self.fieldnames)))
+        positions = {fieldname: i for i, fieldname in enumerate(self.fieldnames)}
+        return [positions.get(fieldname, -1) for fieldname in fieldnames]
+
+
+def flatten_batch(data: List[dict]) -> FlatTable:
+    """
+    Flatten a batch of data dictionaries in one pass, the same way as flatten. The flattened name of
+    each nested key is worked out once for the whole batch instead of once per record, and the
+    values end up in a table that the output classes can read as rows or columns
+
+    :param data: The data dictionaries
+
+    :return: The flattened data
+    """
+    fieldnames: List[str] = []
+    positions: Dict[str, int] = {}
+    schema = _SchemaNode("", fieldnames, positions)
+    records = []
+    for d in data:
+        record: Dict[int, Any] = {}
+        schema.flatten_into(d, record)
+        records.append(record)
+    return FlatTable(fieldnames, records)
+
+
+class _SchemaNode:
+    """
+    The flattened fields under one nested dictionary of a batch, remembering the index of each key's
+    field (and the node for each key holding a dictionary) so the names are only built once
+    """
+
+    __slots__ = ("prefix", "fieldnames", "positions", "leaves", "children")
+
+    def __init__(self, prefix: str, fieldnames: List[str], positions: Dict[str, int]):
+        self.prefix = prefix
+        # The fields of the whole batch, shared by every node
+        self.fieldnames = fieldnames
+        self.positions = positions
+        self.leaves: Dict[str, int] = {}
+        self.children: Dict[str, "_SchemaNode"] = {}
+
+    def flatten_into(self, data: dict, record: Dict[int, Any]) -> None:
+        """
+        Add the values in a dictionary (at this node's level) to a record, keyed by field index
+        """
+        leaves = self.leaves
+        for key, value in data.items():
+            if isinstance(value, dict):
+                child = self.children.get(key)
+                if child is None:
+                    child = self.children[key] = _SchemaNode(f"{self.prefix}{key}.", self.fieldnames, self.positions)
+                child.flatten_into(value, record)
+                continue
+            index = leaves.get(key)
+            if index is None:
+                index = leaves[key] = self.__add_field(self.prefix + key)
+            record[index] = value
+
+    def __add_field(self, fieldname: str) -> int:
+        """
+        Get the index of a field, adding it if it's new. Different keys can flatten to the same
+        name (e.g. "a.b" and "a" -> "b"), in which case they share the field
+        """
+        index = self.positions.get(fieldname)
+        if index is None:
+            index = self.positions[fieldname] = len(self.fieldnames)
+            self.fieldnames.append(fieldname)
+        return index
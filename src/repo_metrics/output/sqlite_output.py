@@ -0,0 +1,203 @@
+import json
+import sqlite3
+
+from .output_type import Output
+from .preprocess import flatten_batch
+
+# The number of rows to write in each transaction
+BATCH_SIZE = 1000
+
+
+class SqliteOutput(Output):
+    """
+    Writes data to a table in a SQLite database, with a column for each key of the flattened data
+    (named the same as the CSV columns). Rows are upserted on the table's key columns, so writing the
+    same rows again (e.g. when a job reruns) updates them instead of adding duplicates, and the
+    unique index on the key makes looking up a repository's history an indexed query
+
+    Rows written one at a time are upserted BATCH_SIZE at a time, so only one batch is held in
+    memory at once
+    """
+
+    def __init__(self, path, table: str, key_columns: list[str]):
+        """
+        Constructor for the SqliteOutput class
+
+        :param path: The path to the database file. It is created if it doesn't exist
+        :param table: The name of the table to write to. It is created if it doesn't exist, and
+        columns are added to it as new keys appear in the data
+        :param key_columns: The columns that identify a row (e.g. repo and timestamp)
+        """
+        self.path = path
+        self.table = table
+        self.key_columns = key_columns
+        self.__connection: sqlite3.Connection | None = None
+        self.__columns: set[str] = set()
+        self.__batch: list[dict] = []
+
+    def write(self, data: list[dict]) -> None:
+        """
+        Upserts the specified data into the table
+
+        :param data: The data to write
+        """
+        rows = self.__to_rows(data)
+        connection, columns = self.__connect()
+        try:
+            with connection:
+                self.__add_columns(connection, columns, rows)
+            for i in range(0, len(rows), BATCH_SIZE):
+                # Each batch is written in a single transaction
+                with connection:
+                    self.__upsert(connection, rows[i : i + BATCH_SIZE])
+        finally:
+            connection.close()
+
+    def open(self) -> None:
+        """
+        Start writing rows one at a time, creating the table if it doesn't exist
+        """
+        self.__connection, self.__columns = self.__connect()
+        self.__batch = []
+
+    def write_row(self, row: dict) -> None:
+        """
+        Write a single row, upserting the rows written so far once there are BATCH_SIZE of them
+
+        :param row: The row to write
+        """
+        self.__batch.append(row)
+        if len(self.__batch) >= BATCH_SIZE:
+            self.__flush()
+
+    def close(self) -> None:
+        """
+        Finish writing rows one at a time, upserting the rows that haven't been yet
+        """
+        try:
+            self.__flush()
+        finally:
+            self.__connection.close()
+            self.__connection = None
+
+    def __flush(self) -> None:
+        """
+        Upsert the batch of rows written one at a time, in a single transaction with any columns it
+        adds to the table
+        """
+        if not self.__batch:
+            return
+        rows = self.__to_rows(self.__batch)
+        self.__batch = []
+        with self.__connection:
+            self.__add_columns(self.__connection, self.__columns, rows)
+            self.__upsert(self.__connection, rows)
+
+    def __connect(self) -> tuple[sqlite3.Connection, set[str]]:
+        """
+        Connect to the database and create the table if it doesn't exist
+
+        :return: The connection, and the names of the table's columns
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            # WAL mode lets readers query the database while a write is in progress
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                columns = self.__create_table(connection)
+        except Exception:
+            connection.close()
+            raise
+        return connection, columns
+
+    def __to_rows(self, data: list[dict]) -> list[dict]:
+        """
+        Flatten the data into rows of values SQLite can store
+        """
+        rows = []
+        for record in flatten_batch(data).records():
+            row = {key: self.__to_sql_value(value) for key, value in record.items()}
+            # SQLite treats NULLs as distinct in a unique index, so use empty strings for missing
+            # key values to let rows without them be upserted too
+            for column in self.key_columns:
+                if row.get(column) is None:
+                    row[column] = ""
+            rows.append(row)
+        return rows
+
+    def __create_table(self, connection: sqlite3.Connection) -> set[str]:
+        """
+        Create the table and its unique index on the key columns if they don't exist
+
+        :return: The names of the table's columns
+        """
+        key_definitions = ", ".join(f"{_quote(column)} TEXT NOT NULL" for column in self.key_columns)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {_quote(self.table)} ({key_definitions})")
+        key_list = ", ".join(_quote(column) for column in self.key_columns)
+        connection.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(self.table + '_key')} ON {_quote(self.table)} ({key_list})"
+        )
+        return {row[1] for row in connection.execute(f"PRAGMA table_info({_quote(self.table)})")}
+
+    def __add_columns(self, connection: sqlite3.Connection, existing_columns: set[str], rows: list[dict]) -> None:
+        """
+        Add a column to the table for each key in the rows that it doesn't have yet, typed by the
+        first value of the key, and add them to existing_columns
+        """
+        new_columns = {}
+        for row in rows:
+            for column, value in row.items():
+                if column not in existing_columns and new_columns.get(column) is None:
+                    new_columns[column] = value
+        for column, value in new_columns.items():
+            connection.execute(f"ALTER TABLE {_quote(self.table)} ADD COLUMN {_quote(column)} {_get_sql_type(value)}")
+        existing_columns.update(new_columns)
+
+    def __upsert(self, connection: sqlite3.Connection, rows: list[dict]) -> None:
+        """
+        Insert the rows, updating the existing row instead if one has the same key. Only the
+        columns a row has values for are updated
+        """
+        # Rows with the same columns can share a statement
+        rows_by_columns: dict[tuple[str, ...], list[dict]] = {}
+        for row in rows:
+            rows_by_columns.setdefault(tuple(row), []).append(row)
+        key_list = ", ".join(_quote(column) for column in self.key_columns)
+        for columns, column_rows in rows_by_columns.items():
+            updates = [
+                f"{_quote(column)} = excluded.{_quote(column)}" for column in columns if column not in self.key_columns
+            ]
+            statement = (
+                f"INSERT INTO {_quote(self.table)} ({', '.join(_quote(column) for column in columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT ({key_list}) DO {'UPDATE SET ' + ', '.join(updates) if updates else 'NOTHING'}"
+            )
+            connection.executemany(statement, [tuple(row[column] for column in columns) for row in column_rows])
+
+    @staticmethod
+    def __to_sql_value(value):
+        """
+        Convert a value to one SQLite can store, encoding lists as JSON
+        """
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return json.dumps(value)
+
+
+def _quote(identifier: str) -> str:
+    """
+    Quote an identifier (e.g. a column name like "unique clones" or "github.stargazers_count") for
+    use in a SQL statement
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _get_sql_type(value) -> str:
+    """
+    Get the SQLite column type for a value
+    """
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
@@ -0,0 +1,202 @@
+"""
+Defines a profiler that records every HTTP request made through a session and the time spent
+writing output, and summarizes them at the end of a run
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Iterable
+
+import requests
+
+from .metrics.request_policy import get_endpoint
+from .output import Output
+
+LOGGER = logging.getLogger(__name__)
+
+# Request headers that mean a cached response was being revalidated
+CONDITIONAL_HEADERS = ["If-None-Match", "If-Modified-Since"]
+
+
+class Profiler:
+    """
+    Records the endpoint, status, size, latency and cache result of every request made through the
+    sessions it's attached to, and the time spent in the outputs it wraps
+    """
+
+    def __init__(self):
+        """
+        Constructor for the Profiler class
+        """
+        self.__lock = threading.Lock()
+        self.__start = time.perf_counter()
+        # Map of endpoint name to the requests made to it, as (status, bytes, latency, cache) tuples
+        # where cache is "hit", "miss" or None if the request didn't use the cache
+        self.__requests: dict[str, list[tuple[int, int, float, str | None]]] = defaultdict(list)
+        self.__output_calls = 0
+        self.__output_time = 0.0
+
+    def attach(self, session: requests.Session) -> None:
+        """
+        Record every request made through a session
+
+        :param session: The session
+        """
+        if self.__record_response not in session.hooks["response"]:
+            session.hooks["response"].append(self.__record_response)
+
+    def wrap_output(self, output: Output) -> "ProfiledOutput":
+        """
+        Record the time spent writing to an output
+
+        :param output: The output
+
+        :return: An output that writes to the given one, timing each call
+        """
+        return ProfiledOutput(output, self)
+
+    def record_output(self, seconds: float) -> None:
+        """
+        Record a call to an output
+
+        :param seconds: How long the call took
+        """
+        with self.__lock:
+            self.__output_calls += 1
+            self.__output_time += seconds
+
+    def get_summary(self) -> dict:
+        """
+        Summarize the requests and output time recorded so far
+
+        :return: A dictionary with the wall time of the run, the request counts, bytes and cache
+        results in total and for each endpoint (with the p50 and p95 latency), and the time spent
+        in the output
+        """
+        with self.__lock:
+            endpoints = {}
+            for endpoint, requests_made in sorted(self.__requests.items()):
+                latencies = sorted(latency for _, _, latency, _ in requests_made)
+                caches = Counter(cache for _, _, _, cache in requests_made)
+                endpoints[endpoint] = {
+                    "count": len(requests_made),
+                    "statuses": dict(sorted(Counter(str(status) for status, _, _, _ in requests_made).items())),
+                    "bytes": sum(size for _, size, _, _ in requests_made),
+                    "latency_p50": _percentile(latencies, 0.5),
+                    "latency_p95": _percentile(latencies, 0.95),
+                    "cache_hits": caches["hit"],
+                    "cache_misses": caches["miss"],
+                }
+            return {
+                "wall_time": time.perf_counter() - self.__start,
+                "requests": {
+                    "count": sum(endpoint["count"] for endpoint in endpoints.values()),
+                    "bytes": sum(endpoint["bytes"] for endpoint in endpoints.values()),
+                    "cache_hits": sum(endpoint["cache_hits"] for endpoint in endpoints.values()),
+                    "cache_misses": sum(endpoint["cache_misses"] for endpoint in endpoints.values()),
+                },
+                "endpoints": endpoints,
+                "output": {"calls": self.__output_calls, "time": self.__output_time},
+            }
+
+    def report(self, path: str | None = None) -> None:
+        """
+        Log a summary of the requests and output time, and optionally write it as json
+
+        :param path: The path of a file to write the summary to as json, if any
+        """
+        summary = self.get_summary()
+        requests_summary = summary["requests"]
+        LOGGER.info(
+            "Profile: %.2fs, %d requests, %d bytes, %d cache hits, %d cache misses, %.2fs in output (%d calls)",
+            summary["wall_time"],
+            requests_summary["count"],
+            requests_summary["bytes"],
+            requests_summary["cache_hits"],
+            requests_summary["cache_misses"],
+            summary["output"]["time"],
+            summary["output"]["calls"],
+        )
+        for endpoint, endpoint_summary in summary["endpoints"].items():
+            LOGGER.info(
+                "Profile: %s: %d requests, %d bytes, p50 %.0fms, p95 %.0fms, statuses %s",
+                endpoint,
+                endpoint_summary["count"],
+                endpoint_summary["bytes"],
+                endpoint_summary["latency_p50"] * 1000,
+                endpoint_summary["latency_p95"] * 1000,
+                endpoint_summary["statuses"],
+            )
+        if path:
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=4)
+
+    def __record_response(self, response: requests.Response, *args, **kwargs) -> None:
+        """
+        Record a response, as a requests response hook
+        """
+        request = response.request
+        # Reading the body of a streamed response here would load it all at once
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        cache = None
+        if any(header in request.headers for header in CONDITIONAL_HEADERS):
+            cache = "hit" if response.status_code == 304 else "miss"
+        record = (response.status_code, size, response.elapsed.total_seconds(), cache)
+        with self.__lock:
+            self.__requests[get_endpoint(request.method, request.url)].append(record)
+
+
+class ProfiledOutput(Output):
+    """
+    An output that writes to another output, recording how long each call takes in a profiler
+    """
+
+    def __init__(self, output: Output, profiler: Profiler):
+        """
+        Constructor for the ProfiledOutput class
+
+        :param output: The output to write to
+        :param profiler: The profiler to record the time in
+        """
+        self.output = output
+        self.profiler = profiler
+
+    def write(self, data: Iterable[dict]) -> None:
+        self.__timed(self.output.write, data)
+
+    def open(self) -> None:
+        self.__timed(self.output.open)
+
+    def write_row(self, row: dict) -> None:
+        self.__timed(self.output.write_row, row)
+
+    def close(self) -> None:
+        self.__timed(self.output.close)
+
+    def __timed(self, method, *args) -> None:
+        start = time.perf_counter()
+        try:
+            method(*args)
+        finally:
+            self.profiler.record_output(time.perf_counter() - start)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """
+    Get a percentile of a sorted list of values, using the nearest rank
+
+    :param values: The values, sorted
+    :param fraction: The percentile, as a fraction
+
+    :return: The percentile, or 0 if there are no values
+    """
+    if not values:
+        return 0.0
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
@@ -4,6 +4,9 @@ Defines and sets the settings that may need to be retrieved from the environment
 
 import os
 
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+DEFAULT_DOCKERHUB_API_URL = "https://hub.docker.com"
+
 
 class Settings:
     """
@@ -14,6 +17,9 @@ class Settings:
         """
         Initialize the settings
         """
+        # The API base URLs can be changed to point at GitHub Enterprise or a local stand-in
+        self.github_api_url: str = os.getenv("GITHUB_API_URL", DEFAULT_GITHUB_API_URL).rstrip("/")
+        self.dockerhub_api_url: str = os.getenv("DOCKERHUB_API_URL", DEFAULT_DOCKERHUB_API_URL).rstrip("/")
         # Get the GitHub config info from the environment variable
         self.github_token: str | None = os.getenv("GITHUB_TOKEN")
         self.github_app_client_id: str | None = os.getenv("GITHUB_APP_CLIENT_ID")
@@ -23,6 +29,30 @@ class Settings:
         if private_key_path:
             with open(private_key_path, "r") as f:
                 self.github_app_private_key = f.read()
+        # GitHub App installation tokens are only cached between runs if a file for them is set
+        self.github_app_token_cache_path: str | None = os.getenv("GITHUB_APP_TOKEN_CACHE_PATH")
+        # A json file with the timeouts, retries and hedging to use for each endpoint
+        self.request_policy_path: str | None = os.getenv("REPO_METRICS_REQUEST_POLICY")
+        # Response caching is only turned on if a directory for the cache is set
+        self.cache_dir: str | None = os.getenv("REPO_METRICS_CACHE_DIR")
+        cache_max_size = os.getenv("REPO_METRICS_CACHE_MAX_SIZE")
+        self.cache_max_size: int | None = int(cache_max_size) if cache_max_size else None
+
+    def get_github_api_url(self) -> str:
+        """
+        Get the base URL of the GitHub API
+
+        :return: The base URL, without a trailing slash
+        """
+        return self.github_api_url
+
+    def get_dockerhub_api_url(self) -> str:
+        """
+        Get the base URL of the DockerHub API
+
+        :return: The base URL, without a trailing slash
+        """
+        return self.dockerhub_api_url
 
     def get_github_token(self) -> str:
         """
@@ -49,3 +79,37 @@ class Settings:
         :return: The path to the private key file
         """
         return self.github_app_private_key
+
+    def get_github_app_token_cache_path(self) -> str | None:
+        """
+        Get the path of the file to cache GitHub App installation IDs and access tokens in between
+        runs
+
+        :return: The path to the cache file, or None if they shouldn't be cached between runs
+        """
+        return self.github_app_token_cache_path
+
+    def get_request_policy_path(self) -> str | None:
+        """
+        Get the path of the json file with the request policies (timeouts, retries and hedging) for
+        each endpoint
+
+        :return: The path to the file, or None to use the default policies
+        """
+        return self.request_policy_path
+
+    def get_cache_dir(self) -> str | None:
+        """
+        Get the directory to cache API responses in, for making conditional requests
+
+        :return: The cache directory, or None if responses shouldn't be cached
+        """
+        return self.cache_dir
+
+    def get_cache_max_size(self) -> int | None:
+        """
+        Get the maximum size of the response cache, in bytes
+
+        :return: The maximum size, or None to use the default
+        """
+        return self.cache_max_size
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from benchmarks.fake_api import FakeApi, FakeApiConfig
+from repo_metrics.dockerhub_tag_stats import command as dockerhub_tag_stats
+from repo_metrics.get import command as get
+from repo_metrics.github_download_stats import command as github_download_stats
+from repo_metrics.output import read_json_lines
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    with FakeApi(FakeApiConfig(releases=150, assets=2)) as api:
+        monkeypatch.setenv("GITHUB_API_URL", api.url)
+        monkeypatch.setenv("DOCKERHUB_API_URL", api.url)
+        monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+        monkeypatch.delenv("REPO_METRICS_CACHE_DIR", raising=False)
+        yield api
+
+
+def test_get_repo_list(fake_api, tmpdir):
+    repo_list = tmpdir.join("repos.txt")
+    repo_list.write("test_owner/repo0,test_owner/repo0\ntest_owner/repo1\n")
+    output = str(tmpdir.join("output.jsonl"))
+
+    result = CliRunner().invoke(get.main, ["-r", str(repo_list), "-of", "jsonl", "-o", output])
+
+    assert result.exit_code == 0, result.output
+    rows = list(read_json_lines(output))
+    assert [row["github_repo"] for row in rows] == ["test_owner/repo0", "test_owner/repo1"]
+    # Each of the 150 releases has assets with download counts i and i + 1
+    assert rows[0]["github_download_count"] == sum(2 * i + 1 for i in range(150))
+    assert rows[0]["dockerhub_pull_count"] == 100000
+    # Two pages of releases for each GitHub repo
+    assert fake_api.requests == {"repo": 2, "releases": 4, "dockerhub_repo": 1}
+
+
+def test_github_download_stats(fake_api, tmpdir):
+    output = str(tmpdir.join("output.json"))
+
+    result = CliRunner().invoke(github_download_stats.main, ["-gh", "test_owner/repo0", "-o", output])
+
+    assert result.exit_code == 0, result.output
+    with open(output, "r") as f:
+        assert json.load(f)[0]["v149"] == 2 * 149 + 1
+    assert fake_api.requests == {"releases": 2}
+
+
+def test_get_dockerhub_namespace(fake_api, tmpdir):
+    fake_api.config.namespace_repos = 250
+    output = str(tmpdir.join("output.jsonl"))
+
+    result = CliRunner().invoke(get.main, ["-dhn", "test_owner", "-of", "jsonl", "-o", output])
+
+    assert result.exit_code == 0, result.output
+    rows = list(read_json_lines(output))
+    assert [row["dockerhub_repo"] for row in rows] == [f"test_owner/repo{i}" for i in range(250)]
+    assert rows[0]["dockerhub_pull_count"] == 100000
+    # One request per page of 100 repositories
+    assert fake_api.requests == {"dockerhub_namespace_repos": 3}
+
+
+def test_dockerhub_tag_stats(fake_api, tmpdir):
+    fake_api.config.tags = 250
+    output = str(tmpdir.join("output.jsonl"))
+
+    result = CliRunner().invoke(dockerhub_tag_stats.main, ["-dh", "test_owner/repo0", "-of", "jsonl", "-o", output])
+
+    assert result.exit_code == 0, result.output
+    rows = list(read_json_lines(output))
+    assert [row["tag"] for row in rows] == [f"v{i}" for i in range(250)]
+    assert rows[0]["full_size"] == 100000000
+    assert fake_api.requests == {"dockerhub_tags": 3}
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from repo_metrics.__main__ import LAZY_SUBCOMMANDS, main_entry
+
+# Modules that starting the CLI shouldn't import, since only some of the sub-commands need them
+HEAVY_MODULES = ["requests", "jwt", "dotenv", "repo_metrics.metrics", "repo_metrics.output"]
+
+
+def test_version_does_not_import_subcommands():
+    # Run in a new interpreter, since the tests have already imported everything
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from repo_metrics.__main__ import main_entry\n"
+        "CliRunner().invoke(main_entry, ['version'], catch_exceptions=False)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+
+def test_help_lists_lazy_subcommands():
+    result = CliRunner().invoke(main_entry, ["--help"])
+
+    assert result.exit_code == 0
+    for name in list(LAZY_SUBCOMMANDS) + ["version"]:
+        assert name in result.output
+
+
+def test_lazy_subcommand_runs():
+    result = CliRunner().invoke(main_entry, ["get", "--help"])
+
+    assert result.exit_code == 0
+    assert "--github-repo" in result.output
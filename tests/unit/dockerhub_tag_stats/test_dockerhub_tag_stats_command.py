@@ -0,0 +1,98 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+from click.testing import CliRunner
+from mockito import unstub, when
+
+from repo_metrics.dockerhub_tag_stats.command import main
+from repo_metrics.metrics.dockerhub import DockerHubException, DockerHubMetricsHelper
+
+TAGS = [
+    {
+        "name": "latest",
+        "tag_last_pulled": "2023-10-02T00:00:00Z",
+        "tag_last_pushed": "2023-10-01T00:00:00Z",
+        "last_updated": "2023-10-01T00:00:00Z",
+        "full_size": 1000,
+        "digest": "sha256:abc",
+        "images": [{"architecture": "amd64"}],
+    },
+    {"name": "1.0", "tag_last_pulled": None, "tag_last_pushed": "2023-09-01T00:00:00Z", "full_size": 900},
+]
+
+
+@pytest.fixture
+def runner():
+    return CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def unstub_mocks():
+    yield
+    unstub()
+
+
+def test_dockerhub_tag_stats_json(runner, tmp_path):
+    when(DockerHubMetricsHelper).get_tags("test_owner", "test_repo").thenReturn(iter(TAGS))
+    output_path = str(tmp_path / "output.json")
+
+    result = runner.invoke(main, ["--dockerhub-repo", "test_owner/test_repo", "--output", output_path])
+
+    assert result.exit_code == 0
+    with open(output_path, "r") as f:
+        assert json.load(f) == [
+            {
+                "tag": "latest",
+                "tag_last_pulled": "2023-10-02T00:00:00Z",
+                "tag_last_pushed": "2023-10-01T00:00:00Z",
+                "last_updated": "2023-10-01T00:00:00Z",
+                "full_size": 1000,
+                "digest": "sha256:abc",
+            },
+            {
+                "tag": "1.0",
+                "tag_last_pulled": None,
+                "tag_last_pushed": "2023-09-01T00:00:00Z",
+                "last_updated": None,
+                "full_size": 900,
+                "digest": None,
+            },
+        ]
+
+
+def test_dockerhub_tag_stats_csv_with_timestamp(runner, tmp_path):
+    when(DockerHubMetricsHelper).get_tags("test_owner", "test_repo").thenReturn(iter(TAGS))
+    output_path = str(tmp_path / "output.csv")
+
+    result = runner.invoke(main, ["-dh", "test_owner/test_repo", "-o", output_path, "-of", "csv", "-t"])
+
+    assert result.exit_code == 0
+    with open(output_path, "r") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["tag"] for row in rows] == ["latest", "1.0"]
+    assert rows[0]["date_and_time"] == rows[1]["date_and_time"] != ""
+
+
+def test_dockerhub_tag_stats_sqlite(runner, tmp_path):
+    when(DockerHubMetricsHelper).get_tags("test_owner", "test_repo").thenReturn(iter(TAGS))
+    output_path = str(tmp_path / "output.db")
+
+    result = runner.invoke(main, ["-dh", "test_owner/test_repo", "-o", output_path, "-of", "sqlite"])
+
+    assert result.exit_code == 0
+    with sqlite3.connect(output_path) as connection:
+        rows = connection.execute("SELECT repo, tag, full_size FROM dockerhub_tag_stats ORDER BY tag").fetchall()
+    assert rows == [("test_owner/test_repo", "1.0", 900), ("test_owner/test_repo", "latest", 1000)]
+
+
+def test_dockerhub_tag_stats_missing_repo_leaves_output(runner, tmp_path):
+    when(DockerHubMetricsHelper).get_tags("test_owner", "test_repo").thenRaise(DockerHubException("Not found"))
+    output_path = tmp_path / "output.json"
+    output_path.write_text("[]")
+
+    result = runner.invoke(main, ["-dh", "test_owner/test_repo", "-o", str(output_path)])
+
+    assert result.exit_code != 0
+    assert output_path.read_text() == "[]"
@@ -10,6 +10,8 @@ from mockito import unstub, when
 from repo_metrics.get.command import main
 from repo_metrics.metrics.dockerhub import DockerHubMetricsHelper
 from repo_metrics.metrics.github import GitHubMetricsHelper
+from repo_metrics.metrics.github_graphql import GitHubGraphQLMetricsHelper
+from repo_metrics.output import OutputConfig
 
 
 @pytest.fixture
@@ -258,3 +260,144 @@ def test_append_to_json_with_different_fields(runner):
             assert json_array[1]["dockerhub_star_count"] == 10
             assert json_array[1]["dockerhub_pull_count"] == 1000
             assert "extra_field" not in json_array[1]
+
+
+def test_repo_list_json(runner):
+    when(GitHubMetricsHelper).get_repo_info("test_owner", "test_repo", ...).thenReturn({"forks": 10, "watchers": 100})
+    when(GitHubMetricsHelper).get_repo_info("test_owner", "other_repo", ...).thenReturn({"forks": 20, "watchers": 200})
+    when(DockerHubMetricsHelper).get_repo_info("test_owner", "test_repo_docker").thenReturn(
+        {"star_count": 10, "pull_count": 1000}
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.json")
+
+        result = runner.invoke(
+            main,
+            ["--repo-list", "-", "--output", tempfile_path, "--output-format", "json", "--include-timestamp"],
+            input="# comment\ntest_owner/test_repo,test_owner/test_repo_docker\n\ntest_owner/other_repo\n",
+        )
+
+        assert result.exit_code == 0
+
+        with open(tempfile_path, "r") as f:
+            json_array = json.load(f)
+            assert len(json_array) == 2
+            assert json_array[0]["github_repo"] == "test_owner/test_repo"
+            assert json_array[0]["github_forks"] == 10
+            assert json_array[0]["dockerhub_repo"] == "test_owner/test_repo_docker"
+            assert json_array[0]["dockerhub_pull_count"] == 1000
+            assert json_array[1]["github_repo"] == "test_owner/other_repo"
+            assert json_array[1]["github_forks"] == 20
+            assert "dockerhub_repo" not in json_array[1]
+            # Every row in the batch shares the same timestamp
+            assert json_array[0]["date_and_time"] == json_array[1]["date_and_time"]
+
+
+def test_repo_list_failure_writes_other_repos(runner):
+    when(GitHubMetricsHelper).get_repo_info("test_owner", "test_repo", ...).thenReturn({"forks": 10})
+    when(GitHubMetricsHelper).get_repo_info("test_owner", "missing_repo", ...).thenRaise(Exception("Not found"))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.json")
+
+        result = runner.invoke(
+            main,
+            ["--repo-list", "-", "--output", tempfile_path],
+            input="test_owner/missing_repo\ntest_owner/test_repo\n",
+        )
+
+        assert result.exit_code != 0
+
+        with open(tempfile_path, "r") as f:
+            json_array = json.load(f)
+            assert len(json_array) == 1
+            assert json_array[0]["github_repo"] == "test_owner/test_repo"
+
+
+def test_repo_list_with_github_repo_fails(runner):
+    result = runner.invoke(
+        main, ["--repo-list", "-", "--github-repo", "test_owner/test_repo"], input="test_owner/test_repo\n"
+    )
+
+    assert result.exit_code != 0
+
+
+def test_repo_list_graphql_backend(runner):
+    when(GitHubGraphQLMetricsHelper).get_repo_info_batch(
+        [("test_owner", "test_repo"), ("test_owner", "other_repo")], OutputConfig.just_metrics_config["github_fields"]
+    ).thenReturn([{"forks": 10, "full_name": "test_owner/test_repo"}, {"forks": 20}])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.json")
+
+        result = runner.invoke(
+            main,
+            ["--repo-list", "-", "--backend", "graphql", "--output", tempfile_path],
+            input="test_owner/test_repo\ntest_owner/other_repo\n",
+        )
+
+        assert result.exit_code == 0
+
+        with open(tempfile_path, "r") as f:
+            json_array = json.load(f)
+            assert json_array == [
+                {"github_repo": "test_owner/test_repo", "github_forks": 10},
+                {"github_repo": "test_owner/other_repo", "github_forks": 20},
+            ]
+
+
+def test_repo_list_streams_rows_in_chunks(runner, monkeypatch):
+    monkeypatch.setattr("repo_metrics.get.command.STREAM_CHUNK_SIZE", 1)
+    when(GitHubMetricsHelper).get_repo_info("test_owner", "test_repo", ...).thenReturn({"forks": 10})
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.csv")
+
+        def check_first_row_written(owner, repo, fields):
+            # By the time the second chunk is fetched, the first chunk's row is already in the file
+            with open(tempfile_path, "r") as f:
+                assert [row["github_repo"] for row in csv.DictReader(f)] == ["test_owner/test_repo"]
+            return {"forks": 20}
+
+        when(GitHubMetricsHelper).get_repo_info("test_owner", "other_repo", ...).thenAnswer(check_first_row_written)
+
+        result = runner.invoke(
+            main,
+            ["--repo-list", "-", "--output", tempfile_path, "--output-format", "csv"],
+            input="test_owner/test_repo\ntest_owner/other_repo\n",
+        )
+
+        assert result.exit_code == 0
+        with open(tempfile_path, "r") as f:
+            rows = list(csv.DictReader(f))
+            assert [row["github_forks"] for row in rows] == ["10", "20"]
+
+
+def test_dockerhub_namespace(runner):
+    when(DockerHubMetricsHelper).get_namespace_repos("test_owner").thenReturn(
+        [
+            {"name": "test_repo", "namespace": "test_owner", "star_count": 10, "pull_count": 1000, "is_private": False},
+            {
+                "name": "other_repo",
+                "namespace": "test_owner",
+                "star_count": 20,
+                "pull_count": 2000,
+                "is_private": False,
+            },
+        ]
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.json")
+
+        result = runner.invoke(main, ["--dockerhub-namespace", "test_owner", "--output", tempfile_path])
+
+        assert result.exit_code == 0
+
+        with open(tempfile_path, "r") as f:
+            assert json.load(f) == [
+                {"dockerhub_repo": "test_owner/test_repo", "dockerhub_star_count": 10, "dockerhub_pull_count": 1000},
+                {"dockerhub_repo": "test_owner/other_repo", "dockerhub_star_count": 20, "dockerhub_pull_count": 2000},
+            ]
+
+
+def test_dockerhub_namespace_with_repo_list_fails(runner):
+    result = runner.invoke(main, ["--dockerhub-namespace", "test_owner", "--repo-list", "-"], input="test_owner/repo\n")
+
+    assert result.exit_code != 0
@@ -1,6 +1,7 @@
 import csv
 import json
 import os
+import sqlite3
 import tempfile
 
 import pytest
@@ -8,7 +9,7 @@ from click.testing import CliRunner
 from mockito import unstub, when
 
 from repo_metrics.github_traffic_stats.command import main
-from repo_metrics.metrics.github import GitHubMetricsHelper
+from repo_metrics.metrics.github import GitHubException, GitHubMetricsHelper
 
 
 @pytest.fixture
@@ -203,3 +204,139 @@ def test_append_to_json_with_different_fields(runner):
             assert json_array[2]["views"] == 25
             assert json_array[2]["unique views"] == 12
             assert "extra_field" not in json_array[2]
+
+
+def test_github_traffic_stats_org(runner):
+    when(GitHubMetricsHelper).get_org_traffic("test_owner", False, True).thenReturn(
+        (
+            [
+                {"timestamp": "2023-10-01T00:00:00Z", "repo": "repo_a", "clones": 10, "views": 20},
+                {"timestamp": "2023-10-01T00:00:00Z", "repo": "repo_b", "clones": 15, "views": 25},
+            ],
+            {},
+        )
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.csv")
+
+        result = runner.invoke(main, ["--org", "test_owner", "--output", tempfile_path, "--output-format", "csv"])
+
+        assert result.exit_code == 0
+
+        with open(tempfile_path, "r") as f:
+            rows = list(csv.DictReader(f))
+            assert [row["repo"] for row in rows] == ["repo_a", "repo_b"]
+            assert rows[1]["clones"] == "15"
+
+
+def test_github_traffic_stats_org_failure(runner):
+    when(GitHubMetricsHelper).get_org_traffic("test_owner", False, True).thenReturn(
+        (
+            [{"timestamp": "2023-10-01T00:00:00Z", "repo": "repo_a", "clones": 10, "views": 20}],
+            {"repo_b": GitHubException("Failed to get traffic clones for test_owner/repo_b")},
+        )
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.json")
+
+        result = runner.invoke(main, ["--org", "test_owner", "--output", tempfile_path])
+
+        # The traffic for the rest of the org is still written
+        assert result.exit_code == 1
+        with open(tempfile_path, "r") as f:
+            assert [row["repo"] for row in json.load(f)] == ["repo_a"]
+
+
+def test_github_traffic_stats_requires_one_source(runner):
+    result = runner.invoke(main, ["--github-repo", "test_owner/test_repo", "--org", "test_owner"])
+    assert result.exit_code == 2
+
+    result = runner.invoke(main, [])
+    assert result.exit_code == 2
+
+
+def test_github_traffic_stats_sqlite(runner):
+    when(GitHubMetricsHelper).get_repo_traffic(...).thenReturn(
+        [
+            {"timestamp": "2023-10-01T00:00:00Z", "clones": 10, "unique clones": 5, "views": 20, "unique views": 10},
+        ]
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.db")
+
+        # Running twice doesn't duplicate the rows
+        for _ in range(2):
+            result = runner.invoke(
+                main, ["--github-repo", "test_owner/test_repo", "--output", tempfile_path, "--output-format", "sqlite"]
+            )
+            assert result.exit_code == 0
+
+        connection = sqlite3.connect(tempfile_path)
+        rows = connection.execute("SELECT repo, timestamp, clones FROM github_traffic_stats").fetchall()
+        connection.close()
+        assert rows == [("test_owner/test_repo", "2023-10-01T00:00:00Z", 10)]
+
+
+def test_github_traffic_stats_state_file(runner):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tempfile_path = os.path.join(temp_dir, "output.csv")
+        state_path = os.path.join(temp_dir, "state.json")
+        arguments = ["-gh", "test_owner/test_repo", "-o", tempfile_path, "-of", "csv", "-a", "-s", state_path]
+
+        when(GitHubMetricsHelper).get_repo_traffic("test_owner", "test_repo", False, True).thenReturn(
+            [
+                {"timestamp": "2023-10-01T00:00:00Z", "clones": 10, "views": 20},
+                {"timestamp": "2023-10-02T00:00:00Z", "clones": 15, "views": 25},
+            ]
+        )
+        assert runner.invoke(main, arguments).exit_code == 0
+
+        # The next run's window overlaps with the first
+        when(GitHubMetricsHelper).get_repo_traffic("test_owner", "test_repo", False, True).thenReturn(
+            [
+                {"timestamp": "2023-10-02T00:00:00Z", "clones": 15, "views": 25},
+                {"timestamp": "2023-10-03T00:00:00Z", "clones": 5, "views": 6},
+            ]
+        )
+        assert runner.invoke(main, arguments).exit_code == 0
+
+        with open(tempfile_path, "r") as f:
+            rows = list(csv.DictReader(f))
+            assert [row["timestamp"] for row in rows] == [
+                "2023-10-01T00:00:00Z",
+                "2023-10-02T00:00:00Z",
+                "2023-10-03T00:00:00Z",
+            ]
+
+
+def test_github_traffic_stats_state_file_with_only_yesterday(runner):
+    result = runner.invoke(main, ["-gh", "test_owner/test_repo", "-a", "-oy", "-s", "state.json"])
+    assert result.exit_code == 2
+    assert "--only-yesterday" in result.output
+
+
+def test_github_traffic_stats_state_file_without_append(runner, tmp_path):
+    output_path = str(tmp_path / "output.csv")
+    state_path = str(tmp_path / "state.json")
+
+    result = runner.invoke(main, ["-gh", "test_owner/test_repo", "-o", output_path, "-of", "csv", "-s", state_path])
+
+    assert result.exit_code == 2
+    assert "--append" in result.output
+    assert not os.path.exists(state_path)
+
+
+def test_github_traffic_stats_profile_output(runner, tmp_path):
+    when(GitHubMetricsHelper).get_repo_traffic(...).thenReturn([{"timestamp": "2023-10-01T00:00:00Z", "clones": 10}])
+    output_path = str(tmp_path / "output.json")
+    profile_path = str(tmp_path / "profile.json")
+
+    result = runner.invoke(
+        main, ["--github-repo", "test_owner/test_repo", "--output", output_path, "--profile-output", profile_path]
+    )
+
+    assert result.exit_code == 0
+    with open(profile_path, "r") as f:
+        profile = json.load(f)
+    assert profile["output"]["calls"] == 1
+    assert profile["requests"]["count"] == 0
@@ -0,0 +1,53 @@
+from repo_metrics.github_traffic_stats.state import TrafficState
+
+
+def day(timestamp: str, clones: int) -> dict:
+    return {"timestamp": timestamp, "clones": clones, "unique clones": 1}
+
+
+def test_select_first_run(tmpdir):
+    state = TrafficState(str(tmpdir.join("state.json")))
+    traffic_data = [day("2023-10-01T00:00:00Z", 10), day("2023-10-02T00:00:00Z", 15)]
+
+    assert state.select("owner/repo", traffic_data, include_changed=False) == traffic_data
+
+
+def test_select_only_new_days_after_save(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    state = TrafficState(path)
+    state.select("owner/repo", [day("2023-10-01T00:00:00Z", 10), day("2023-10-02T00:00:00Z", 15)], False)
+    state.save()
+
+    # A later run (after one was skipped) gets an overlapping window with a changed day in it
+    state = TrafficState(path)
+    selected = state.select(
+        "owner/repo",
+        [day("2023-10-02T00:00:00Z", 16), day("2023-10-03T00:00:00Z", 20), day("2023-10-04T00:00:00Z", 25)],
+        include_changed=False,
+    )
+
+    assert selected == [day("2023-10-03T00:00:00Z", 20), day("2023-10-04T00:00:00Z", 25)]
+    # Other repos are tracked separately
+    assert state.select("owner/other_repo", [day("2023-10-01T00:00:00Z", 1)], False) == [day("2023-10-01T00:00:00Z", 1)]
+
+
+def test_select_changed_days(tmpdir):
+    state = TrafficState(str(tmpdir.join("state.json")))
+    state.select("owner/repo", [day("2023-10-01T00:00:00Z", 10), day("2023-10-02T00:00:00Z", 3)], True)
+
+    # The second day was incomplete the first time around
+    selected = state.select(
+        "owner/repo", [day("2023-10-01T00:00:00Z", 10), day("2023-10-02T00:00:00Z", 15)], include_changed=True
+    )
+
+    assert selected == [day("2023-10-02T00:00:00Z", 15)]
+    assert state.select("owner/repo", [day("2023-10-02T00:00:00Z", 15)], include_changed=True) == []
+
+
+def test_unsaved_state_is_not_kept(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    TrafficState(path).select("owner/repo", [day("2023-10-01T00:00:00Z", 10)], False)
+
+    assert TrafficState(path).select("owner/repo", [day("2023-10-01T00:00:00Z", 10)], False) == [
+        day("2023-10-01T00:00:00Z", 10)
+    ]
@@ -0,0 +1,72 @@
+import os
+
+import requests
+
+from repo_metrics.metrics.cache import ResponseCache
+
+
+def make_response(body: str, etag: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["ETag"] = etag
+    response.headers["Link"] = '<https://api.github.com/test?page=2>; rel="last"'
+    response._content = body.encode()
+    response.encoding = "utf-8"
+    return response
+
+
+def test_put_and_get(tmpdir):
+    cache = ResponseCache(str(tmpdir))
+    key = ResponseCache.make_key("https://api.github.com/test", {"page": 1}, "Bearer test_token")
+
+    cache.put(key, make_response('{"name": "test"}', '"abc"'))
+    entry = cache.get(key)
+
+    assert entry["body"] == '{"name": "test"}'
+    assert ResponseCache.get_validators(entry) == {"If-None-Match": '"abc"'}
+
+
+def test_entries_persist_between_instances(tmpdir):
+    key = ResponseCache.make_key("https://api.github.com/test")
+    ResponseCache(str(tmpdir)).put(key, make_response('{"name": "test"}', '"abc"'))
+
+    entry = ResponseCache(str(tmpdir)).get(key)
+
+    assert entry["body"] == '{"name": "test"}'
+
+
+def test_key_depends_on_identity():
+    url = "https://api.github.com/test"
+
+    assert ResponseCache.make_key(url, None, "Bearer token_1") != ResponseCache.make_key(url, None, "Bearer token_2")
+    assert ResponseCache.make_key(url, {"page": 1}) != ResponseCache.make_key(url, {"page": 2})
+    assert ResponseCache.make_key(url, {"page": 1, "per_page": 100}) == ResponseCache.make_key(
+        url, {"per_page": 100, "page": 1}
+    )
+
+
+def test_evicts_least_recently_used(tmpdir):
+    body = "x" * 1000
+    cache = ResponseCache(str(tmpdir), max_size=2500)
+    cache.put("first", make_response(body, '"1"'))
+    cache.put("second", make_response(body, '"2"'))
+    # Use the first entry so the second one is the least recently used
+    cache.get("first")
+    cache.put("third", make_response(body, '"3"'))
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+    assert not os.path.exists(os.path.join(str(tmpdir), "second.json"))
+
+
+def test_restore():
+    entry = {"headers": {"ETag": '"abc"', "Link": '<https://test?page=2>; rel="last"'}, "body": '{"name": "test"}'}
+    response = requests.Response()
+    response.status_code = 304
+
+    response = ResponseCache.restore(entry, response)
+
+    assert response.status_code == 200
+    assert response.json() == {"name": "test"}
+    assert response.links["last"]["url"] == "https://test?page=2"
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from repo_metrics.metrics.concurrency import FetchEngine
+
+
+def test_map_preserves_order():
+    engine = FetchEngine(4)
+
+    # Sleep for less time on later items so they finish first
+    def fn(i):
+        time.sleep((10 - i) / 1000)
+        return i * 2
+
+    assert engine.map(fn, range(10)) == [i * 2 for i in range(10)]
+
+
+def test_map_sequential():
+    engine = FetchEngine(1)
+    threads = set()
+
+    def fn(i):
+        threads.add(threading.get_ident())
+        return i
+
+    assert engine.map(fn, range(5)) == [0, 1, 2, 3, 4]
+    assert threads == {threading.get_ident()}
+
+
+def test_map_raises_exception():
+    engine = FetchEngine(4)
+
+    def fn(i):
+        if i == 2:
+            raise ValueError("bad item")
+        return i
+
+    with pytest.raises(ValueError):
+        engine.map(fn, range(5))
+
+
+def test_map_return_exceptions():
+    engine = FetchEngine(4)
+
+    def fn(i):
+        if i == 2:
+            raise ValueError("bad item")
+        return i
+
+    results = engine.map(fn, range(5), return_exceptions=True)
+
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], ValueError)
+    assert results[3:] == [3, 4]
+
+
+def test_slot_limits_requests_in_flight():
+    engine = FetchEngine(3)
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def fn(i):
+        nonlocal in_flight, max_in_flight
+        with engine.slot():
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+        return i
+
+    # Nest the maps like the helpers do, so there are more threads than slots
+    results = engine.map(lambda i: engine.map(fn, range(i * 4, i * 4 + 4)), range(4))
+
+    assert results == [list(range(i * 4, i * 4 + 4)) for i in range(4)]
+    assert max_in_flight <= 3
+
+
+def test_invalid_max_workers():
+    with pytest.raises(ValueError):
+        FetchEngine(0)
+
+
+def test_imap_preserves_order():
+    engine = FetchEngine(4)
+
+    def fn(i):
+        time.sleep((10 - i) / 1000)
+        return i * 2
+
+    assert list(engine.imap(fn, range(10))) == [i * 2 for i in range(10)]
+
+
+def test_imap_bounds_items_in_progress():
+    engine = FetchEngine(8)
+    taken = []
+
+    def items():
+        for i in range(100):
+            taken.append(i)
+            yield i
+
+    results = engine.imap(lambda i: i, items(), window=3)
+
+    assert next(results) == 0
+    # The first window, plus one more taken to refill it
+    assert len(taken) == 4
+    results.close()
+
+
+def test_imap_raises_exception():
+    engine = FetchEngine(4)
+
+    def fn(i):
+        if i == 2:
+            raise ValueError("bad item")
+        return i
+
+    results = engine.imap(fn, range(5))
+
+    assert [next(results), next(results)] == [0, 1]
+    with pytest.raises(ValueError):
+        next(results)
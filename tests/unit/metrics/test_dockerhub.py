@@ -0,0 +1,93 @@
+import pytest
+
+from repo_metrics.metrics.dockerhub import DockerHubException, DockerHubMetricsHelper
+from repo_metrics.metrics.request_policy import RequestPolicies, RequestPolicy
+
+REPOSITORIES_URL = "https://hub.docker.com/v2/repositories"
+
+
+@pytest.fixture
+def dockerhub_helper():
+    return DockerHubMetricsHelper()
+
+
+def make_repos(start, end):
+    return [
+        {"name": f"repo{i}", "namespace": "test_owner", "pull_count": i, "star_count": 1} for i in range(start, end)
+    ]
+
+
+def test_get_repo_info(dockerhub_helper, requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/test_repo", json={"name": "test_repo", "pull_count": 1000})
+
+    assert dockerhub_helper.get_repo_info("test_owner", "test_repo") == {"name": "test_repo", "pull_count": 1000}
+    assert requests_mock.last_request.timeout is not None
+
+
+def test_get_repo_info_failure(dockerhub_helper, requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/test_repo", status_code=404, json={"message": "not found"})
+
+    with pytest.raises(DockerHubException):
+        dockerhub_helper.get_repo_info("test_owner", "test_repo")
+
+
+def test_get_repo_info_batch_keeps_failures(requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/repo0", json={"name": "repo0"})
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/repo1", status_code=500)
+    dockerhub_helper = DockerHubMetricsHelper(request_policies=RequestPolicies(RequestPolicy(retries=0)))
+
+    results = dockerhub_helper.get_repo_info_batch([("test_owner", "repo0"), ("test_owner", "repo1")])
+
+    assert results[0] == {"name": "repo0"}
+    assert isinstance(results[1], DockerHubException)
+
+
+def test_get_namespace_repos(dockerhub_helper, requests_mock):
+    url = f"{REPOSITORIES_URL}/test_owner/"
+    for page, (start, end) in enumerate([(0, 100), (100, 200), (200, 250)], start=1):
+        requests_mock.get(
+            f"{url}?page={page}&page_size=100", complete_qs=True, json={"count": 250, "results": make_repos(start, end)}
+        )
+
+    repos = dockerhub_helper.get_namespace_repos("test_owner")
+
+    assert [repo["name"] for repo in repos] == [f"repo{i}" for i in range(250)]
+    assert requests_mock.call_count == 3
+
+
+def test_get_namespace_repos_empty(dockerhub_helper, requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/", json={"count": 0, "results": []})
+
+    assert dockerhub_helper.get_namespace_repos("test_owner") == []
+    assert requests_mock.call_count == 1
+
+
+def test_get_namespace_repos_failure(dockerhub_helper, requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/", status_code=404, json={"message": "not found"})
+
+    with pytest.raises(DockerHubException):
+        dockerhub_helper.get_namespace_repos("test_owner")
+
+
+def test_get_tags(dockerhub_helper, requests_mock):
+    url = f"{REPOSITORIES_URL}/test_owner/test_repo/tags"
+    for page, (start, end) in enumerate([(0, 100), (100, 150)], start=1):
+        requests_mock.get(
+            f"{url}?page={page}&page_size=100",
+            complete_qs=True,
+            json={"count": 150, "results": [{"name": f"v{i}", "tag_last_pulled": None} for i in range(start, end)]},
+        )
+
+    tags = dockerhub_helper.get_tags("test_owner", "test_repo")
+
+    # Only the first page is fetched until the tags are iterated over
+    assert requests_mock.call_count == 1
+    assert [tag["name"] for tag in tags] == [f"v{i}" for i in range(150)]
+    assert requests_mock.call_count == 2
+
+
+def test_get_tags_missing_repo(dockerhub_helper, requests_mock):
+    requests_mock.get(f"{REPOSITORIES_URL}/test_owner/test_repo/tags", status_code=404, json={"message": "not found"})
+
+    with pytest.raises(DockerHubException):
+        dockerhub_helper.get_tags("test_owner", "test_repo")
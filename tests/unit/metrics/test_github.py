@@ -1,17 +1,34 @@
+import concurrent.futures
+import contextlib
 import datetime
+import io
+import json
+import threading
 
 import mockito
 import pytest
 import requests
 
+from repo_metrics.metrics import github
+from repo_metrics.metrics.cache import ResponseCache
+from repo_metrics.metrics.concurrency import FetchEngine
+from repo_metrics.metrics.dockerhub import DockerHubMetricsHelper
 from repo_metrics.metrics.github import GitHubException, GitHubMetricsHelper
+from repo_metrics.metrics.request_policy import RequestPolicies, RequestPolicy
 from repo_metrics.settings import Settings
 
+TIMEOUT = (RequestPolicy.connect_timeout, RequestPolicy.read_timeout)
+
 
 @pytest.fixture
-def github_helper():
+def session():
+    return requests.Session()
+
+
+@pytest.fixture
+def github_helper(session):
     mockito.when(Settings).get_github_token().thenReturn("test_token")
-    return GitHubMetricsHelper()
+    return GitHubMetricsHelper(session=session)
 
 
 @pytest.fixture(autouse=True)
@@ -20,21 +37,29 @@ def unstub():
     mockito.unstub()
 
 
-def test_get_repo_info_success(github_helper):
+def test_get_repo_info_success(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     url = f"https://api.github.com/repos/{owner}/{repo}"
     releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(url, headers=headers).thenReturn(
-        mockito.mock({"status_code": 200, "json": lambda: {"name": repo, "full_name": f"{owner}/{repo}"}})
-    )
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 1, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 200, "json": lambda: [{"assets": [{"download_count": 10}]}]})
+    mockito.when(session).get(url, headers=headers, timeout=TIMEOUT).thenReturn(
+        mockito.mock(
+            {"status_code": 200, "headers": {}, "json": lambda: {"name": repo, "full_name": f"{owner}/{repo}"}}
+        )
     )
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 2, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 200, "json": lambda: []})
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(
+        mockito.mock(
+            {
+                "status_code": 200,
+                "headers": {},
+                "links": {},
+                "json": lambda: [{"tag_name": "v1.0", "assets": [{"download_count": 10}]}],
+            }
+        )
     )
 
     repo_info = github_helper.get_repo_info(owner, repo)
@@ -44,62 +69,72 @@ def test_get_repo_info_success(github_helper):
     assert repo_info["download_count"] == 10
 
 
-def test_get_repo_info_failure(github_helper):
+def test_get_repo_info_failure(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     url = f"https://api.github.com/repos/{owner}/{repo}"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(url, headers=headers).thenReturn(mockito.mock({"status_code": 404}))
+    mockito.when(session).get(url, headers=headers, timeout=TIMEOUT).thenReturn(
+        mockito.mock({"status_code": 404, "headers": {}})
+    )
 
     with pytest.raises(GitHubException):
         github_helper.get_repo_info(owner, repo)
 
 
-def test_get_download_count_success(github_helper):
+def test_get_download_count_success(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 1, "per_page": 100}).thenReturn(
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(
         mockito.mock(
-            {"status_code": 200, "json": lambda: [{"assets": [{"download_count": 10}, {"download_count": 11}]}]}
+            {
+                "status_code": 200,
+                "headers": {},
+                "links": {},
+                "json": lambda: [{"tag_name": "v1.0", "assets": [{"download_count": 10}, {"download_count": 11}]}],
+            }
         )
     )
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 2, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 200, "json": lambda: []})
-    )
 
     download_count = github_helper._GitHubMetricsHelper__get_download_count(owner, repo)
 
     assert download_count == 21
 
 
-def test_get_download_count_failure(github_helper):
+def test_get_download_count_failure(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 1, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 404})
-    )
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(mockito.mock({"status_code": 404, "headers": {}}))
 
     with pytest.raises(GitHubException):
         github_helper._GitHubMetricsHelper__get_download_count(owner, repo)
 
 
-def test_get_release_download_counts_success(github_helper):
+def test_get_release_download_counts_success(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 1, "per_page": 100}).thenReturn(
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
+                "links": {},
                 "json": lambda: [
                     {"tag_name": "v1.0", "assets": [{"download_count": 10}, {"download_count": 20}]},
                     {"tag_name": "v1.1", "assets": [{"download_count": 5}]},
@@ -107,56 +142,114 @@ def test_get_release_download_counts_success(github_helper):
             }
         )
     )
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 2, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 200, "json": lambda: []})
-    )
 
     release_download_counts = github_helper.get_release_download_counts(owner, repo)
 
     assert release_download_counts == {"v1.0": 30, "v1.1": 5}
 
 
-def test_get_release_download_counts_failure(github_helper):
+def test_get_release_download_counts_multiple_pages(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
     releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     headers = {"Authorization": "Bearer test_token"}
 
-    mockito.when(requests).get(releases_url, headers=headers, params={"page": 1, "per_page": 100}).thenReturn(
-        mockito.mock({"status_code": 404})
+    for page in range(1, 4):
+        mockito.when(session).get(
+            releases_url, headers=headers, params={"page": page, "per_page": 100}, timeout=TIMEOUT
+        ).thenReturn(
+            mockito.mock(
+                {
+                    "status_code": 200,
+                    "headers": {},
+                    "links": {"last": {"url": f"{releases_url}?per_page=100&page=3", "rel": "last"}},
+                    "json": lambda page=page: [{"tag_name": f"v{page}", "assets": [{"download_count": page}]}],
+                }
+            )
+        )
+
+    release_download_counts = github_helper.get_release_download_counts(owner, repo)
+
+    assert list(release_download_counts.items()) == [("v1", 1), ("v2", 2), ("v3", 3)]
+    # The page count comes from the Link header, so there's no request for an empty page 4
+    mockito.verify(session, times=0).get(
+        releases_url, headers=headers, params={"page": 4, "per_page": 100}, timeout=TIMEOUT
+    )
+
+
+def test_get_repo_info_and_release_download_counts_fetch_releases_once(github_helper, session):
+    owner = "test_owner"
+    repo = "test_repo"
+    url = f"https://api.github.com/repos/{owner}/{repo}"
+    releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+    headers = {"Authorization": "Bearer test_token"}
+
+    mockito.when(session).get(url, headers=headers, timeout=TIMEOUT).thenReturn(
+        mockito.mock({"status_code": 200, "headers": {}, "json": lambda: {"name": repo}})
+    )
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(
+        mockito.mock(
+            {
+                "status_code": 200,
+                "headers": {},
+                "links": {},
+                "json": lambda: [
+                    {"tag_name": "v1.0", "assets": [{"download_count": 10}, {"download_count": 20}]},
+                    {"tag_name": "v1.1", "assets": [{"download_count": 5}]},
+                ],
+            }
+        )
+    )
+
+    repo_info = github_helper.get_repo_info(owner, repo)
+    release_download_counts = github_helper.get_release_download_counts(owner, repo)
+
+    assert repo_info["download_count"] == 35
+    assert release_download_counts == {"v1.0": 30, "v1.1": 5}
+    mockito.verify(session, times=1).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
     )
 
+
+def test_get_release_download_counts_failure(github_helper, session):
+    owner = "test_owner"
+    repo = "test_repo"
+    releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+    headers = {"Authorization": "Bearer test_token"}
+
+    mockito.when(session).get(
+        releases_url, headers=headers, params={"page": 1, "per_page": 100}, timeout=TIMEOUT
+    ).thenReturn(mockito.mock({"status_code": 404, "headers": {}}))
+
     with pytest.raises(GitHubException):
         github_helper.get_release_download_counts(owner, repo)
 
 
-def test_get_repo_traffic_success(github_helper):
+def test_get_repo_traffic_success(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
-    jwt = "test_jwt"
-    installation_id = 12345
     token = "test_token"
     clones_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/clones"
     views_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/views"
     headers = {"Authorization": f"Bearer {token}"}
 
-    mockito.when(github_helper)._GitHubMetricsHelper__create_github_app_jwt().thenReturn(jwt)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_id(owner, repo, jwt).thenReturn(installation_id)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_access_token(installation_id, jwt).thenReturn(
-        token
-    )
-    mockito.when(requests).get(clones_url, headers=headers).thenReturn(
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn(token)
+    mockito.when(session).get(clones_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"clones": [{"timestamp": "2023-10-01T00:00:00Z", "count": 10, "uniques": 5}]},
             }
         )
     )
-    mockito.when(requests).get(views_url, headers=headers).thenReturn(
+    mockito.when(session).get(views_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"views": [{"timestamp": "2023-10-01T00:00:00Z", "count": 20, "uniques": 10}]},
             }
         )
@@ -172,39 +265,35 @@ def test_get_repo_traffic_success(github_helper):
     assert traffic_data[0]["unique views"] == 10
 
 
-def test_get_repo_traffic_only_yesterday_success(github_helper):
+def test_get_repo_traffic_only_yesterday_success(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
-    jwt = "test_jwt"
-    installation_id = 12345
     token = "test_token"
     clones_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/clones"
     views_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/views"
     headers = {"Authorization": f"Bearer {token}"}
 
-    mockito.when(github_helper)._GitHubMetricsHelper__create_github_app_jwt().thenReturn(jwt)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_id(owner, repo, jwt).thenReturn(installation_id)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_access_token(installation_id, jwt).thenReturn(
-        token
-    )
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn(token)
 
     # Get yesterday's date
     today = datetime.datetime.now(datetime.timezone.utc)
     midnight = datetime.datetime.combine(today, datetime.time.min)
     yesterday = midnight - datetime.timedelta(days=1)
     yesterday_formatted = yesterday.strftime("%Y-%m-%dT%H:%M:%SZ")
-    mockito.when(requests).get(clones_url, headers=headers).thenReturn(
+    mockito.when(session).get(clones_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"clones": [{"timestamp": yesterday_formatted, "count": 10, "uniques": 5}]},
             }
         )
     )
-    mockito.when(requests).get(views_url, headers=headers).thenReturn(
+    mockito.when(session).get(views_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"views": [{"timestamp": yesterday_formatted, "count": 20, "uniques": 10}]},
             }
         )
@@ -220,33 +309,29 @@ def test_get_repo_traffic_only_yesterday_success(github_helper):
     assert traffic_data[0]["unique views"] == 10
 
 
-def test_get_repo_traffic_only_yesterday_failure(github_helper):
+def test_get_repo_traffic_only_yesterday_failure(github_helper, session):
     owner = "test_owner"
     repo = "test_repo"
-    jwt = "test_jwt"
-    installation_id = 12345
     token = "test_token"
     clones_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/clones"
     views_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/views"
     headers = {"Authorization": f"Bearer {token}"}
 
-    mockito.when(github_helper)._GitHubMetricsHelper__create_github_app_jwt().thenReturn(jwt)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_id(owner, repo, jwt).thenReturn(installation_id)
-    mockito.when(github_helper)._GitHubMetricsHelper__get_installation_access_token(installation_id, jwt).thenReturn(
-        token
-    )
-    mockito.when(requests).get(clones_url, headers=headers).thenReturn(
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn(token)
+    mockito.when(session).get(clones_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"clones": [{"timestamp": "2023-09-30T00:00:00Z", "count": 10, "uniques": 5}]},
             }
         )
     )
-    mockito.when(requests).get(views_url, headers=headers).thenReturn(
+    mockito.when(session).get(views_url, headers=headers, timeout=TIMEOUT).thenReturn(
         mockito.mock(
             {
                 "status_code": 200,
+                "headers": {},
                 "json": lambda: {"views": [{"timestamp": "2023-09-30T00:00:00Z", "count": 20, "uniques": 10}]},
             }
         )
@@ -254,3 +339,306 @@ def test_get_repo_traffic_only_yesterday_failure(github_helper):
 
     with pytest.raises(GitHubException):
         github_helper.get_repo_traffic(owner, repo, only_yesterday=True)
+
+
+def test_get_org_traffic(requests_mock):
+    owner = "test_owner"
+    token = "test_token"
+    repositories_url = "https://api.github.com/installation/repositories"
+    github_helper = GitHubMetricsHelper()
+
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn(token)
+    # The repositories are spread over two pages
+    requests_mock.get(
+        f"{repositories_url}?page=1",
+        json={"repositories": [{"name": "repo_b"}]},
+        headers={"Link": f'<{repositories_url}?page=2&per_page=100>; rel="last"'},
+    )
+    requests_mock.get(f"{repositories_url}?page=2", json={"repositories": [{"name": "repo_a"}, {"name": "repo_c"}]})
+    for repo in ["repo_a", "repo_b"]:
+        requests_mock.get(
+            f"https://api.github.com/repos/{owner}/{repo}/traffic/clones",
+            request_headers={"Authorization": f"Bearer {token}"},
+            json={
+                "clones": [
+                    {"timestamp": "2023-10-01T00:00:00Z", "count": 10, "uniques": 5},
+                    {"timestamp": "2023-10-02T00:00:00Z", "count": 15, "uniques": 7},
+                ]
+            },
+        )
+        requests_mock.get(
+            f"https://api.github.com/repos/{owner}/{repo}/traffic/views",
+            request_headers={"Authorization": f"Bearer {token}"},
+            json={"views": [{"timestamp": "2023-10-02T00:00:00Z", "count": 20, "uniques": 10}]},
+        )
+    requests_mock.get(f"https://api.github.com/repos/{owner}/repo_c/traffic/clones", status_code=403)
+    requests_mock.get(f"https://api.github.com/repos/{owner}/repo_c/traffic/views", json={"views": []})
+
+    traffic_data, failures = github_helper.get_org_traffic(owner)
+
+    assert [(row["timestamp"], row["repo"]) for row in traffic_data] == [
+        ("2023-10-01T00:00:00Z", "test_owner/repo_a"),
+        ("2023-10-01T00:00:00Z", "test_owner/repo_b"),
+        ("2023-10-02T00:00:00Z", "test_owner/repo_a"),
+        ("2023-10-02T00:00:00Z", "test_owner/repo_b"),
+    ]
+    assert traffic_data[2] == {
+        "timestamp": "2023-10-02T00:00:00Z",
+        "repo": "test_owner/repo_a",
+        "clones": 15,
+        "unique clones": 7,
+        "views": 20,
+        "unique views": 10,
+    }
+    assert list(failures) == ["repo_c"]
+    assert isinstance(failures["repo_c"], GitHubException)
+
+
+def test_get_org_traffic_replaces_revoked_token(requests_mock):
+    owner = "test_owner"
+    repositories_url = "https://api.github.com/installation/repositories"
+    github_helper = GitHubMetricsHelper()
+
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn(
+        "revoked_token", "new_token"
+    )
+    mockito.when(github_helper.token_manager).invalidate(owner, "revoked_token")
+    requests_mock.get(repositories_url, request_headers={"Authorization": "Bearer revoked_token"}, status_code=401)
+    requests_mock.get(
+        repositories_url,
+        request_headers={"Authorization": "Bearer new_token"},
+        json={"repositories": [{"name": "test_repo"}]},
+    )
+    for kind in ["clones", "views"]:
+        requests_mock.get(
+            f"https://api.github.com/repos/{owner}/test_repo/traffic/{kind}",
+            request_headers={"Authorization": "Bearer new_token"},
+            json={kind: [{"timestamp": "2023-10-01T00:00:00Z", "count": 10, "uniques": 5}]},
+        )
+
+    traffic_data, failures = github_helper.get_org_traffic(owner)
+
+    assert [row["repo"] for row in traffic_data] == ["test_owner/test_repo"]
+    assert not failures
+    mockito.verify(github_helper.token_manager, times=1).invalidate(owner, "revoked_token")
+
+
+def test_get_repo_traffic_gives_up_after_one_new_token(github_helper, requests_mock):
+    owner = "test_owner"
+    repo = "test_repo"
+
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn("token")
+    requests_mock.get(f"https://api.github.com/repos/{owner}/{repo}/traffic/clones", status_code=401)
+    requests_mock.get(f"https://api.github.com/repos/{owner}/{repo}/traffic/views", status_code=401)
+
+    with pytest.raises(GitHubException):
+        github_helper.get_repo_traffic(owner, repo)
+    mockito.verify(github_helper.token_manager, times=2).get_installation_token(owner, ...)
+
+
+def test_get_repo_info_uses_cached_response(tmpdir, requests_mock):
+    owner = "test_owner"
+    repo = "test_repo"
+    url = f"https://api.github.com/repos/{owner}/{repo}"
+    releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+    mockito.when(Settings).get_github_token().thenReturn("test_token")
+    github_helper = GitHubMetricsHelper(cache=ResponseCache(str(tmpdir)))
+
+    requests_mock.get(url, json={"name": repo}, headers={"ETag": '"repo_etag"'})
+    requests_mock.get(releases_url, json=[{"tag_name": "v1.0", "assets": [{"download_count": 10}]}])
+    github_helper.get_repo_info(owner, repo)
+
+    # The second time around, the repo info hasn't changed
+    requests_mock.get(url, status_code=304, request_headers={"If-None-Match": '"repo_etag"'})
+    repo_info = GitHubMetricsHelper(cache=ResponseCache(str(tmpdir))).get_repo_info(owner, repo)
+
+    assert repo_info["name"] == repo
+    assert repo_info["download_count"] == 10
+
+
+def test_get_repo_traffic_uses_cached_response_with_new_token(tmpdir, requests_mock):
+    owner = "test_owner"
+    repo = "test_repo"
+    clones_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/clones"
+    views_url = f"https://api.github.com/repos/{owner}/{repo}/traffic/views"
+    clones = {"clones": [{"timestamp": "2023-10-01T00:00:00Z", "count": 10, "uniques": 5}]}
+    views = {"views": [{"timestamp": "2023-10-01T00:00:00Z", "count": 20, "uniques": 10}]}
+
+    github_helper = GitHubMetricsHelper(cache=ResponseCache(str(tmpdir)))
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn("token_1")
+    requests_mock.get(clones_url, json=clones, headers={"ETag": '"clones_etag"'})
+    requests_mock.get(views_url, json=views, headers={"ETag": '"views_etag"'})
+    github_helper.get_repo_traffic(owner, repo)
+
+    # The next run gets a new installation access token, but the traffic hasn't changed
+    github_helper = GitHubMetricsHelper(cache=ResponseCache(str(tmpdir)))
+    mockito.when(github_helper.token_manager).get_installation_token(owner, ...).thenReturn("token_2")
+    requests_mock.get(clones_url, status_code=304, request_headers={"If-None-Match": '"clones_etag"'})
+    requests_mock.get(views_url, status_code=304, request_headers={"If-None-Match": '"views_etag"'})
+    traffic_data = github_helper.get_repo_traffic(owner, repo, exclude_today=False)
+
+    assert all("If-None-Match" in request.headers for request in requests_mock.request_history[-2:])
+    assert traffic_data == [
+        {"timestamp": "2023-10-01T00:00:00Z", "clones": 10, "unique clones": 5, "views": 20, "unique views": 10}
+    ]
+
+
+def test_get_installation_id_is_not_cached(tmpdir, requests_mock):
+    owner = "test_owner"
+    github_helper = GitHubMetricsHelper(cache=ResponseCache(str(tmpdir)))
+    requests_mock.get(f"https://api.github.com/users/{owner}/installation", json={"id": 12345}, headers={"ETag": '"a"'})
+
+    assert github_helper._GitHubMetricsHelper__get_installation_id(owner, None, "test_jwt") == 12345
+    assert "If-None-Match" not in requests_mock.last_request.headers
+    # Requests signed with a JWT are never cached, since the JWT changes every few minutes
+    assert not tmpdir.listdir()
+
+
+def test_get_repo_info_retries_when_rate_limited(github_helper, requests_mock):
+    owner = "test_owner"
+    repo = "test_repo"
+    url = f"https://api.github.com/repos/{owner}/{repo}"
+    releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+
+    requests_mock.get(
+        url,
+        [
+            {"status_code": 429, "headers": {"Retry-After": "0"}},
+            {"json": {"name": repo}, "headers": {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4998"}},
+        ],
+    )
+    requests_mock.get(releases_url, json=[])
+
+    repo_info = github_helper.get_repo_info(owner, repo)
+
+    assert repo_info["name"] == repo
+    assert github_helper.rate_limiter.get_usage()["remaining"] == {"core": 4998}
+
+
+def test_get_repo_info_skips_releases_without_download_count(github_helper, session):
+    owner = "test_owner"
+    repo = "test_repo"
+    url = f"https://api.github.com/repos/{owner}/{repo}"
+    releases_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+    headers = {"Authorization": "Bearer test_token"}
+
+    mockito.when(session).get(url, headers=headers, timeout=TIMEOUT).thenReturn(
+        mockito.mock({"status_code": 200, "headers": {}, "json": lambda: {"name": repo, "forks": 10}})
+    )
+
+    repo_info = github_helper.get_repo_info(owner, repo, fields=["forks"])
+
+    assert repo_info["forks"] == 10
+    assert "download_count" not in repo_info
+    mockito.verify(session, times=0).get(releases_url, ...)
+
+
+def test_waiting_for_rate_limit_does_not_hold_engine_slot(requests_mock):
+    owner = "test_owner"
+    repo = "test_repo"
+    budget_reset = threading.Event()
+    waiting_for_budget = threading.Event()
+
+    class ExhaustedRateLimiter:
+        def acquire(self, url, authorization):
+            waiting_for_budget.set()
+            budget_reset.wait(5)
+            return None
+
+        def release(self, key, response):
+            pass
+
+    engine = FetchEngine(max_workers=1)
+    github_helper = GitHubMetricsHelper(engine=engine, rate_limiter=ExhaustedRateLimiter())
+    dockerhub_helper = DockerHubMetricsHelper(engine=engine)
+    requests_mock.get(f"https://api.github.com/repos/{owner}/{repo}", json={"name": repo})
+    requests_mock.get(f"https://hub.docker.com/v2/repositories/{owner}/{repo}", json={"name": repo})
+
+    github_thread = threading.Thread(target=github_helper.get_repo_info, args=(owner, repo, ["name"]))
+    github_thread.start()
+    try:
+        waiting_for_budget.wait(5)
+        # The only slot in the engine is free for DockerHub while GitHub waits for its budget
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(dockerhub_helper.get_repo_info, owner, repo)
+            assert future.result(timeout=2) == {"name": repo}
+    finally:
+        budget_reset.set()
+        github_thread.join(5)
+
+
+def test_hedged_request_counts_against_engine_and_rate_limit():
+    owner = "test_owner"
+    repo = "test_repo"
+    release = threading.Event()
+    slots = []
+    keys = []
+
+    class SlowSession(requests.Session):
+        calls = 0
+
+        def get(self, url, **kwargs):
+            SlowSession.calls += 1
+            if SlowSession.calls == 1:
+                # The first request is stuck until the hedge has been answered
+                release.wait(5)
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = io.BytesIO()
+            response._content = json.dumps({"name": repo}).encode()
+            return response
+
+    class CountingRateLimiter:
+        def acquire(self, url, authorization):
+            keys.append(url)
+            return url
+
+        def release(self, key, response):
+            pass
+
+    class CountingEngine(FetchEngine):
+        @contextlib.contextmanager
+        def slot(self):
+            slots.append(threading.current_thread())
+            with super().slot():
+                yield
+
+    github_helper = GitHubMetricsHelper(
+        session=SlowSession(),
+        engine=CountingEngine(),
+        rate_limiter=CountingRateLimiter(),
+        request_policies=RequestPolicies(RequestPolicy(hedge_after=0.01)),
+    )
+
+    try:
+        assert github_helper.get_repo_info(owner, repo, ["name"]) == {"name": repo}
+        # The hedge took a slot in the engine and rate limit budget, just like the request it duplicates
+        assert SlowSession.calls == 2
+        assert len(slots) == 2
+        assert len(keys) == 2
+    finally:
+        release.set()
+
+
+def test_release_scans_are_bounded(requests_mock, monkeypatch):
+    monkeypatch.setattr(github, "MAX_RELEASE_SCANS", 2)
+    github_helper = GitHubMetricsHelper()
+    repos = [("test_owner", f"repo{i}") for i in range(4)]
+    for owner, repo in repos:
+        requests_mock.get(f"https://api.github.com/repos/{owner}/{repo}", json={"name": repo})
+        requests_mock.get(
+            f"https://api.github.com/repos/{owner}/{repo}/releases",
+            json=[{"tag_name": "v1.0", "assets": [{"download_count": 1}]}],
+        )
+    # This repo's releases can't be fetched
+    requests_mock.get("https://api.github.com/repos/test_owner/repo3/releases", status_code=404)
+
+    results = github_helper.get_repo_info_batch(repos)
+
+    assert [result["download_count"] for result in results[:3]] == [1, 1, 1]
+    assert isinstance(results[3], GitHubException)
+    # Only the most recent scans are kept, along with the locks for them
+    assert len(github_helper._GitHubMetricsHelper__release_scans) == 2
+    assert set(github_helper._GitHubMetricsHelper__release_scan_locks) <= set(
+        github_helper._GitHubMetricsHelper__release_scans
+    )
@@ -0,0 +1,174 @@
+import datetime
+import json
+import os
+
+import mockito
+import pytest
+
+from repo_metrics.metrics import github_app
+from repo_metrics.metrics.github import GitHubException
+from repo_metrics.metrics.github_app import GitHubAppTokenManager
+from repo_metrics.settings import Settings
+
+
+@pytest.fixture
+def settings():
+    settings = Settings()
+    settings.github_app_client_id = "test_client_id"
+    settings.github_app_private_key = "test_private_key"
+    return settings
+
+
+@pytest.fixture(autouse=True)
+def encode_jwt():
+    mockito.when(github_app.jwt).encode(..., "test_private_key", algorithm="RS256").thenReturn("test_jwt")
+    yield
+    mockito.unstub()
+
+
+def expires_in(seconds: int) -> str:
+    expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+    return expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def test_get_jwt_reuses_jwt(settings):
+    token_manager = GitHubAppTokenManager(settings)
+
+    assert token_manager.get_jwt() == "test_jwt"
+    assert token_manager.get_jwt() == "test_jwt"
+
+    mockito.verify(github_app.jwt, times=1).encode(...)
+
+
+def test_get_jwt_missing_credentials(settings):
+    settings.github_app_private_key = None
+    token_manager = GitHubAppTokenManager(settings)
+
+    with pytest.raises(GitHubException):
+        token_manager.get_jwt()
+
+
+def test_get_installation_token_reuses_token(settings):
+    token_manager = GitHubAppTokenManager(settings)
+    installation_id_lookups = []
+    tokens_created = []
+
+    def get_installation_id(jwt):
+        installation_id_lookups.append(jwt)
+        return 12345
+
+    def create_installation_token(installation_id, jwt):
+        tokens_created.append((installation_id, jwt))
+        return {"token": "test_token", "expires_at": expires_in(3600)}
+
+    for _ in range(3):
+        token = token_manager.get_installation_token("test_owner", get_installation_id, create_installation_token)
+        assert token == "test_token"
+
+    assert installation_id_lookups == ["test_jwt"]
+    assert tokens_created == [(12345, "test_jwt")]
+
+
+def test_get_installation_token_refreshes_expiring_token(settings):
+    token_manager = GitHubAppTokenManager(settings)
+    tokens = iter(
+        [
+            {"token": "expiring_token", "expires_at": expires_in(30)},
+            {"token": "new_token", "expires_at": expires_in(3600)},
+        ]
+    )
+
+    def create_installation_token(installation_id, jwt):
+        return next(tokens)
+
+    assert token_manager.get_installation_token("test_owner", lambda jwt: 12345, create_installation_token) == (
+        "expiring_token"
+    )
+    assert token_manager.get_installation_token("test_owner", lambda jwt: 12345, create_installation_token) == (
+        "new_token"
+    )
+
+
+def test_get_installation_token_cache_file(settings, tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+
+    token_manager = GitHubAppTokenManager(settings, cache_path)
+    token = token_manager.get_installation_token(
+        "test_owner",
+        lambda jwt: 12345,
+        lambda installation_id, jwt: {"token": "test_token", "expires_at": expires_in(3600)},
+    )
+    assert token == "test_token"
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+    with open(cache_path, "r") as f:
+        assert json.load(f)["test_client_id"]["installation_ids"] == {"test_owner": 12345}
+
+    # A new run reuses the installation ID and token without making any requests
+    def fail(*args):
+        raise AssertionError("Unexpected request")
+
+    token_manager = GitHubAppTokenManager(settings, cache_path)
+    assert token_manager.get_installation_token("test_owner", fail, fail) == "test_token"
+
+
+def test_get_installation_token_looks_up_reinstalled_installation(settings, tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+    token_manager = GitHubAppTokenManager(settings, cache_path)
+    token_manager.get_installation_token(
+        "test_owner",
+        lambda jwt: 12345,
+        lambda installation_id, jwt: {"token": "old_token", "expires_at": expires_in(30)},
+    )
+
+    # The app has been reinstalled, so the cached installation ID no longer works
+    def create_installation_token(installation_id, jwt):
+        if installation_id == 12345:
+            raise GitHubException("Not Found")
+        return {"token": "new_token", "expires_at": expires_in(3600)}
+
+    token_manager = GitHubAppTokenManager(settings, cache_path)
+    token = token_manager.get_installation_token("test_owner", lambda jwt: 67890, create_installation_token)
+
+    assert token == "new_token"
+    with open(cache_path, "r") as f:
+        cached = json.load(f)["test_client_id"]
+    assert cached["installation_ids"] == {"test_owner": 67890}
+    assert list(cached["installation_tokens"]) == ["67890"]
+
+
+def test_get_installation_token_failure_for_new_installation_id(settings):
+    token_manager = GitHubAppTokenManager(settings)
+    installation_id_lookups = []
+
+    def get_installation_id(jwt):
+        installation_id_lookups.append(jwt)
+        return 12345
+
+    def create_installation_token(installation_id, jwt):
+        raise GitHubException("Forbidden")
+
+    with pytest.raises(GitHubException):
+        token_manager.get_installation_token("test_owner", get_installation_id, create_installation_token)
+    # An ID that was just looked up isn't looked up again
+    assert installation_id_lookups == ["test_jwt"]
+
+
+def test_invalidate(settings):
+    token_manager = GitHubAppTokenManager(settings)
+    tokens = iter(["first_token", "second_token"])
+
+    def create_installation_token(installation_id, jwt):
+        return {"token": next(tokens), "expires_at": expires_in(3600)}
+
+    assert token_manager.get_installation_token("test_owner", lambda jwt: 12345, create_installation_token) == (
+        "first_token"
+    )
+    token_manager.invalidate("test_owner", "first_token")
+    assert token_manager.get_installation_token("test_owner", lambda jwt: 12345, create_installation_token) == (
+        "second_token"
+    )
+    # A token that has already been replaced doesn't make the new one be forgotten
+    token_manager.invalidate("test_owner", "first_token")
+    assert token_manager.get_installation_token("test_owner", lambda jwt: 12345, create_installation_token) == (
+        "second_token"
+    )
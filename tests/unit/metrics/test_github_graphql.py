@@ -0,0 +1,164 @@
+import json
+
+import mockito
+import pytest
+
+from repo_metrics.metrics import request_policy
+from repo_metrics.metrics.github import GitHubException
+from repo_metrics.metrics.github_graphql import GitHubGraphQLMetricsHelper
+from repo_metrics.metrics.request_policy import RequestPolicies, RequestPolicy
+from repo_metrics.settings import DEFAULT_GITHUB_API_URL, Settings
+
+GRAPHQL_URL = f"{DEFAULT_GITHUB_API_URL}/graphql"
+
+
+@pytest.fixture
+def github_helper():
+    mockito.when(Settings).get_github_token().thenReturn("test_token")
+    return GitHubGraphQLMetricsHelper()
+
+
+@pytest.fixture(autouse=True)
+def unstub():
+    yield
+    mockito.unstub()
+
+
+def make_releases(tags_and_counts, has_next_page=False, end_cursor=None):
+    return {
+        "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+        "nodes": [
+            {
+                "id": f"release_{tag}",
+                "tagName": tag,
+                "releaseAssets": {
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    "nodes": [{"downloadCount": count} for count in counts],
+                },
+            }
+            for tag, counts in tags_and_counts
+        ],
+    }
+
+
+def make_repo(name, releases):
+    return {
+        "name": name,
+        "nameWithOwner": f"test_owner/{name}",
+        "forkCount": 10,
+        "stargazerCount": 110,
+        "watchers": {"totalCount": 120},
+        "issues": {"totalCount": 900},
+        "pullRequests": {"totalCount": 100},
+        "releases": releases,
+    }
+
+
+def test_get_repo_info_batch(github_helper, requests_mock):
+    requests_mock.post(
+        GRAPHQL_URL,
+        json={
+            "data": {
+                "repo0": make_repo("test_repo", make_releases([("v1.0", [10, 20]), ("v1.1", [5])])),
+                "repo1": None,
+            },
+            "errors": [{"path": ["repo1"], "message": "Could not resolve to a Repository"}],
+        },
+    )
+
+    results = github_helper.get_repo_info_batch([("test_owner", "test_repo"), ("test_owner", "missing_repo")])
+
+    assert requests_mock.call_count == 1
+    request = requests_mock.last_request
+    assert request.headers["Authorization"] == "Bearer test_token"
+    assert request.json()["variables"] == {
+        "owner0": "test_owner",
+        "name0": "test_repo",
+        "owner1": "test_owner",
+        "name1": "missing_repo",
+    }
+    assert results[0] == {
+        "name": "test_repo",
+        "full_name": "test_owner/test_repo",
+        "forks": 10,
+        "forks_count": 10,
+        "open_issues": 1000,
+        "open_issues_count": 1000,
+        "watchers": 110,
+        "watchers_count": 110,
+        "stargazers_count": 110,
+        "subscribers_count": 120,
+        "download_count": 35,
+    }
+    assert isinstance(results[1], GitHubException)
+    assert "Could not resolve" in str(results[1])
+
+
+def test_get_repo_info_paginates_releases(github_helper, requests_mock):
+    def respond(request, context):
+        variables = request.json()["variables"]
+        if "cursor" in variables:
+            assert variables == {"owner": "test_owner", "name": "test_repo", "cursor": "cursor_1"}
+            return json.dumps({"data": {"repository": {"releases": make_releases([("v1.0", [7])])}}})
+        return json.dumps({"data": {"repo0": make_repo("test_repo", make_releases([("v1.1", [5])], True, "cursor_1"))}})
+
+    requests_mock.post(GRAPHQL_URL, text=respond)
+
+    repo_info = github_helper.get_repo_info("test_owner", "test_repo")
+
+    assert repo_info["download_count"] == 12
+    assert requests_mock.call_count == 2
+
+
+def test_get_release_download_counts(github_helper, requests_mock):
+    requests_mock.post(
+        GRAPHQL_URL,
+        json={"data": {"repository": {"releases": make_releases([("v1.1", [5]), ("v1.0", [10, 20])])}}},
+    )
+
+    release_download_counts = github_helper.get_release_download_counts("test_owner", "test_repo")
+
+    assert release_download_counts == {"v1.1": 5, "v1.0": 30}
+
+
+def test_query_failure(github_helper, requests_mock):
+    mockito.when(request_policy.time).sleep(...).thenReturn(None)
+    requests_mock.post(GRAPHQL_URL, status_code=502)
+
+    with pytest.raises(GitHubException):
+        github_helper.get_repo_info("test_owner", "test_repo")
+    # POST requests aren't retried unless their endpoint's policy says to
+    assert requests_mock.call_count == 1
+
+
+def test_query_failure_retried_when_opted_in(requests_mock):
+    mockito.when(request_policy.time).sleep(...).thenReturn(None)
+    requests_mock.post(GRAPHQL_URL, status_code=502)
+    mockito.when(Settings).get_github_token().thenReturn("test_token")
+    policies = RequestPolicies(endpoints={"POST */graphql": RequestPolicy(retry_methods=("POST",))})
+    github_helper = GitHubGraphQLMetricsHelper(request_policies=policies)
+
+    with pytest.raises(GitHubException):
+        github_helper.get_repo_info("test_owner", "test_repo")
+    # The policy retries the request three times before giving up
+    assert requests_mock.call_count == 4
+
+
+def test_requires_token():
+    mockito.when(Settings).get_github_token().thenReturn(None)
+    github_helper = GitHubGraphQLMetricsHelper()
+
+    with pytest.raises(GitHubException):
+        github_helper.get_repo_info("test_owner", "test_repo")
+
+
+def test_get_repo_info_only_queries_requested_fields(github_helper, requests_mock):
+    requests_mock.post(GRAPHQL_URL, json={"data": {"repo0": {"forkCount": 10, "stargazerCount": 110}}})
+
+    repo_info = github_helper.get_repo_info("test_owner", "test_repo", fields=["forks", "stargazers_count"])
+
+    assert repo_info == {"forks": 10, "stargazers_count": 110}
+    query = requests_mock.last_request.json()["query"]
+    assert "releases" not in query
+    assert "watchers" not in query
+    assert "issues" not in query
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import requests
+
+from repo_metrics.metrics import rate_limit
+from repo_metrics.metrics.rate_limit import RateLimiter
+
+
+def make_response(status_code: int, headers: dict, text: str = "") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response._content = text.encode()
+    return response
+
+
+def rate_limit_headers(limit: int, remaining: int, reset: float) -> dict:
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int(reset)),
+    }
+
+
+def test_usage():
+    rate_limiter = RateLimiter(4)
+    reset = time.time() + 3600
+
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    rate_limiter.release(key, make_response(200, rate_limit_headers(5000, 4999, reset)))
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    rate_limiter.release(key, make_response(304, rate_limit_headers(5000, 4999, reset)))
+    key = rate_limiter.acquire("https://api.github.com/graphql", "Bearer token")
+    rate_limiter.release(key, make_response(200, rate_limit_headers(5000, 4000, reset)))
+
+    assert rate_limiter.get_usage() == {"used": 2, "not_modified": 1, "remaining": {"core": 4999, "graphql": 4000}}
+
+
+def test_is_rate_limited():
+    assert RateLimiter.is_rate_limited(make_response(429, {}))
+    assert RateLimiter.is_rate_limited(make_response(403, {"Retry-After": "30"}))
+    assert RateLimiter.is_rate_limited(make_response(403, {"X-RateLimit-Remaining": "0"}))
+    assert RateLimiter.is_rate_limited(make_response(403, {}, "You have exceeded a secondary rate limit"))
+    assert not RateLimiter.is_rate_limited(make_response(403, {"X-RateLimit-Remaining": "10"}, "Forbidden"))
+    assert not RateLimiter.is_rate_limited(make_response(200, {"X-RateLimit-Remaining": "0"}))
+
+
+def test_throttles_as_budget_drains():
+    rate_limiter = RateLimiter(8)
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    # 5 left out of 100 is half of the 10% low water mark, so only half the requests can be in flight
+    rate_limiter.release(key, make_response(200, rate_limit_headers(100, 5, time.time() + 3600)))
+
+    keys = [rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token") for _ in range(4)]
+    bucket = rate_limiter._RateLimiter__buckets[keys[0]]
+
+    assert rate_limiter._RateLimiter__get_wait(bucket, time.time()) is None
+
+
+def test_waits_for_retry_after():
+    rate_limiter = RateLimiter(4)
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    rate_limiter.release(key, make_response(429, {"Retry-After": "30"}))
+    bucket = rate_limiter._RateLimiter__buckets[key]
+
+    assert 29 < rate_limiter._RateLimiter__get_wait(bucket, time.time()) <= 30
+    # Other identities have their own budget
+    rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer other_token")
+
+
+def test_budget_resets():
+    rate_limiter = RateLimiter(4)
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    rate_limiter.release(key, make_response(200, rate_limit_headers(5000, 0, time.time() - 1)))
+
+    # The reset time has passed, so this doesn't wait
+    rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+
+
+def test_budget_without_reset_time_is_probed_again(monkeypatch):
+    rate_limiter = RateLimiter(4)
+    key = rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+    rate_limiter.release(key, make_response(200, {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0"}))
+    bucket = rate_limiter._RateLimiter__buckets[key]
+    now = time.time()
+
+    assert rate_limiter._RateLimiter__get_wait(bucket, now) == rate_limit.SECONDARY_RATE_LIMIT_WAIT + 1
+
+    # Once the wait is over, a request is let through to find out whether there's budget again
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now + rate_limit.SECONDARY_RATE_LIMIT_WAIT + 2)
+    acquired = threading.Event()
+
+    def acquire():
+        rate_limiter.acquire("https://api.github.com/repos/owner/repo", "Bearer token")
+        acquired.set()
+
+    threading.Thread(target=acquire, daemon=True).start()
+    assert acquired.wait(5)
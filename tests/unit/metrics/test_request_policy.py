@@ -0,0 +1,210 @@
+import json
+import threading
+
+import mockito
+import pytest
+import requests
+
+from repo_metrics.metrics import request_policy
+from repo_metrics.metrics.request_policy import RequestPolicies, RequestPolicy, get_endpoint
+
+URL = "https://api.github.com/repos/test_owner/test_repo"
+
+
+@pytest.fixture(autouse=True)
+def sleeps():
+    sleeps = []
+    mockito.when(request_policy.time).sleep(...).thenAnswer(sleeps.append)
+    yield sleeps
+    mockito.unstub()
+
+
+def test_send_sets_timeouts(requests_mock):
+    requests_mock.get(URL, json={})
+
+    RequestPolicy(connect_timeout=2, read_timeout=5).send(requests.Session().get, URL)
+
+    assert requests_mock.last_request.timeout == (2, 5)
+
+
+def test_run_retries_transient_failures(requests_mock, sleeps):
+    requests_mock.get(URL, [{"status_code": 502}, {"status_code": 503}, {"status_code": 200, "json": {}}])
+    policy = RequestPolicy(backoff_base=1)
+    session = requests.Session()
+
+    response = policy.run(lambda: policy.send(session.get, URL), "GET", URL)
+
+    assert response.status_code == 200
+    assert requests_mock.call_count == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2
+
+
+def test_run_returns_last_response_when_retries_run_out(requests_mock, sleeps):
+    requests_mock.get(URL, status_code=500)
+    policy = RequestPolicy(retries=2)
+    session = requests.Session()
+
+    response = policy.run(lambda: policy.send(session.get, URL), "GET", URL)
+
+    assert response.status_code == 500
+    assert requests_mock.call_count == 3
+    assert len(sleeps) == 2
+
+
+def test_run_does_not_retry_client_errors(requests_mock, sleeps):
+    requests_mock.get(URL, status_code=404)
+    policy = RequestPolicy()
+    session = requests.Session()
+
+    assert policy.run(lambda: policy.send(session.get, URL), "GET", URL).status_code == 404
+    assert requests_mock.call_count == 1
+    assert not sleeps
+
+
+def test_run_raises_connection_error_when_retries_run_out(requests_mock):
+    requests_mock.get(URL, exc=requests.ConnectionError)
+    policy = RequestPolicy(retries=1)
+    session = requests.Session()
+
+    with pytest.raises(requests.ConnectionError):
+        policy.run(lambda: policy.send(session.get, URL), "GET", URL)
+    assert requests_mock.call_count == 2
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH", "DELETE"])
+def test_run_does_not_retry_other_methods_by_default(requests_mock, sleeps, method):
+    requests_mock.request(method, URL, status_code=502)
+    session = requests.Session()
+
+    assert RequestPolicy().run(lambda: session.request(method, URL), method, URL).status_code == 502
+    assert requests_mock.call_count == 1
+    assert not sleeps
+
+
+def test_run_retries_methods_opted_in(requests_mock):
+    requests_mock.post(URL, [{"status_code": 502}, {"status_code": 200, "json": {}}])
+    session = requests.Session()
+
+    response = RequestPolicy(retry_methods=("POST",)).run(lambda: session.post(URL), "post", URL)
+
+    assert response.status_code == 200
+    assert requests_mock.call_count == 2
+
+
+def test_get_backoff_is_capped():
+    policy = RequestPolicy(backoff_base=1, backoff_max=4)
+
+    assert all(0 <= policy.get_backoff(retry) <= 4 for retry in range(10) for _ in range(100))
+
+
+class FakeResponse:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+def test_send_hedges_slow_request():
+    release = threading.Event()
+    slow, fast = FakeResponse(), FakeResponse()
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            # The first request is stuck until the test ends
+            release.wait(5)
+            return slow
+        return fast
+
+    try:
+        assert RequestPolicy(hedge_after=0.01).send(get, URL) is fast
+    finally:
+        release.set()
+    assert len(calls) == 2
+    assert calls[1]["timeout"] == (10.0, 30.0)
+    # The slower response is closed once it arrives, so its connection isn't held
+    assert slow.closed.wait(5)
+    assert not fast.closed.is_set()
+
+
+def test_send_does_not_hedge_fast_request():
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        return "fast"
+
+    assert RequestPolicy(hedge_after=5).send(get, URL) == "fast"
+    assert calls == [URL]
+
+
+def test_send_hedge_waits_for_other_request_if_one_fails():
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            threading.Event().wait(0.05)
+            raise requests.ConnectionError()
+        threading.Event().wait(0.1)
+        return "hedged"
+
+    assert RequestPolicy(hedge_after=0.01).send(get, URL) == "hedged"
+
+
+def test_get_endpoint():
+    assert get_endpoint("get", f"{URL}/releases?page=2") == "GET api.github.com/repos/{owner}/{repo}/releases"
+    assert (
+        get_endpoint("GET", "https://hub.docker.com/v2/repositories/test_owner/test_repo/tags/")
+        == "GET hub.docker.com/v2/repositories/{namespace}/{repo}/tags/"
+    )
+    assert get_endpoint("POST", "https://api.github.com/graphql") == "POST api.github.com/graphql"
+
+
+def test_policies_match_endpoints():
+    releases = RequestPolicy(hedge_after=2)
+    graphql = RequestPolicy(read_timeout=60)
+    policies = RequestPolicies(endpoints={"GET */releases": releases, "POST */graphql": graphql})
+
+    assert policies.get("get", f"{URL}/releases") is releases
+    assert policies.get("post", "https://api.github.com/graphql") is graphql
+    assert policies.get("get", URL) is policies.default
+    assert policies.get("post", f"{URL}/releases") is policies.default
+
+
+def test_load_from_json_file(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(
+        json.dumps({"default": {"read_timeout": 20, "retries": 1}, "endpoints": {"GET */releases": {"hedge_after": 2}}})
+    )
+
+    policies = RequestPolicies.load_from_json_file(str(path))
+
+    assert policies.default == RequestPolicy(read_timeout=20, retries=1)
+    # Endpoint policies start from the default one
+    assert policies.get("GET", f"{URL}/releases") == RequestPolicy(read_timeout=20, retries=1, hedge_after=2)
+
+
+def test_load_from_json_file_retry_methods(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"endpoints": {"POST */graphql": {"retry_methods": ["post"]}}}))
+
+    policies = RequestPolicies.load_from_json_file(str(path))
+
+    assert policies.get("POST", "https://api.github.com/graphql").retry_methods == ("POST",)
+    assert policies.default.retry_methods == ("GET", "HEAD")
+
+
+def test_load_from_json_file_default():
+    assert RequestPolicies.load_from_json_file(None).default == RequestPolicy()
+
+
+def test_load_from_json_file_unknown_field(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"endpoints": {"GET */releases": {"timeout": 2}}}))
+
+    with pytest.raises(ValueError):
+        RequestPolicies.load_from_json_file(str(path))
@@ -0,0 +1,18 @@
+from repo_metrics.metrics.session import RETRY_STATUSES, create_session
+
+
+def test_create_session_pool_size():
+    session = create_session(pool_size=4, retries=2)
+
+    for prefix in ["https://", "http://"]:
+        adapter = session.get_adapter(f"{prefix}api.github.com")
+        assert adapter._pool_connections == 4
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 2
+        assert set(adapter.max_retries.status_forcelist) == set(RETRY_STATUSES)
+
+
+def test_create_session_shares_adapter_across_hosts():
+    session = create_session()
+
+    assert session.get_adapter("https://api.github.com") is session.get_adapter("https://hub.docker.com")
@@ -0,0 +1,60 @@
+import gzip
+import sys
+
+import pytest
+
+from repo_metrics.output.compression import get_compression, open_file
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [("output.csv.gz", "gzip"), ("output.jsonl.zst", "zstd"), ("output.csv", None), ("output.gz.csv", None)],
+)
+def test_get_compression(path, expected):
+    assert get_compression(path) == expected
+
+
+@pytest.mark.parametrize("extension", ["", ".gz", ".zst"])
+def test_append_round_trip(tmpdir, extension):
+    path = str(tmpdir.join("test_output.txt" + extension))
+    with open_file(path, "w") as f:
+        f.write("line1\n")
+    with open_file(path, "a") as f:
+        f.write("line2\n")
+
+    with open_file(path, "r") as f:
+        assert f.read() == "line1\nline2\n"
+
+
+def test_gzip_append_adds_member(tmpdir):
+    path = str(tmpdir.join("test_output.txt.gz"))
+    with open_file(path, "w") as f:
+        f.write("line1\n")
+    with open_file(path, "a") as f:
+        f.write("line2\n")
+
+    # Any gzip reader can read the file, not just open_file
+    with gzip.open(path, "rt") as f:
+        assert f.read() == "line1\nline2\n"
+
+
+def test_zstd_append_adds_frame(tmpdir):
+    zstandard = pytest.importorskip("zstandard")
+    path = str(tmpdir.join("test_output.txt.zst"))
+    with open_file(path, "w") as f:
+        f.write("line1\n")
+    with open_file(path, "a") as f:
+        f.write("line2\n")
+
+    with open(path, "rb") as f:
+        frames = f.read()
+    first_frame = zstandard.ZstdDecompressor().decompressobj()
+    assert first_frame.decompress(frames) == b"line1\n"
+    assert first_frame.unused_data
+
+
+def test_zstd_without_zstandard(tmpdir, monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+
+    with pytest.raises(ImportError, match="repo_metrics\\[zstd\\]"):
+        open_file(str(tmpdir.join("test_output.txt.zst")), "w")
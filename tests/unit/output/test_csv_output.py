@@ -1,7 +1,10 @@
 import csv
+import os
+import threading
 
 import pytest
 
+from repo_metrics.output.compression import open_file
 from repo_metrics.output.csv_output import CsvOutput
 
 
@@ -52,3 +55,106 @@ def test_append_with_different_fields(temp_file):
         assert len(rows) == 2
         assert rows[0] == {"name": "test1", "value": "123", "extra_field": ""}
         assert rows[1] == {"name": "test2", "value": "", "extra_field": "456"}
+
+
+def test_append_with_same_fields_does_not_rewrite(temp_file, monkeypatch):
+    CsvOutput(str(temp_file)).write([{"name": "test1", "value": "123"}])
+
+    def fail(*args):
+        raise AssertionError("File was rewritten")
+
+    monkeypatch.setattr("repo_metrics.output.csv_output.os.replace", fail)
+    # Fewer fields than the header is fine too
+    CsvOutput(str(temp_file), append=True).write([{"value": "456", "name": "test2"}, {"name": "test3"}])
+
+    with open(temp_file, "r") as f:
+        rows = list(csv.DictReader(f))
+        assert rows == [
+            {"name": "test1", "value": "123"},
+            {"name": "test2", "value": "456"},
+            {"name": "test3", "value": ""},
+        ]
+
+
+def test_append_keeps_existing_column_order(temp_file):
+    with open(temp_file, "w", newline="") as f:
+        f.write("value,name\r\n123,test1\r\n")
+
+    CsvOutput(str(temp_file), append=True).write([{"name": "test2", "value": "456"}])
+
+    with open(temp_file, "r") as f:
+        assert f.read() == "value,name\n123,test1\n456,test2\n"
+
+
+def test_append_to_nonexistent_file(temp_file):
+    data = [{"name": "test", "value": "123"}]
+    CsvOutput(str(temp_file), append=True).write(data)
+
+    with open(temp_file, "r") as f:
+        rows = list(csv.DictReader(f))
+        assert rows == data
+
+
+def test_stream_rows(temp_file):
+    with CsvOutput(str(temp_file)) as csv_output:
+        csv_output.write_row({"name": "test1", "value": "123"})
+        # Each row is in the file as soon as it's written
+        with open(temp_file, "r") as f:
+            assert list(csv.DictReader(f)) == [{"name": "test1", "value": "123"}]
+        csv_output.write_row({"name": "test2", "value": "456"})
+
+    with open(temp_file, "r") as f:
+        assert list(csv.DictReader(f)) == [{"name": "test1", "value": "123"}, {"name": "test2", "value": "456"}]
+
+
+def test_stream_rows_with_new_columns(temp_file):
+    CsvOutput(str(temp_file)).write([{"name": "test1", "value": "123"}])
+
+    with CsvOutput(str(temp_file), append=True) as csv_output:
+        csv_output.write_row({"name": "test2", "nested": {"extra": "456"}})
+        csv_output.write_row({"value": "789"})
+
+    with open(temp_file, "r") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == ["name", "nested.extra", "value"]
+        assert list(reader) == [
+            {"name": "test1", "nested.extra": "", "value": "123"},
+            {"name": "test2", "nested.extra": "456", "value": ""},
+            {"name": "", "nested.extra": "", "value": "789"},
+        ]
+
+
+def test_stream_rows_with_new_columns_to_pipe(tmpdir):
+    # Streaming to a pipe (like stdout) can't rewrite the header, so the rows are written on close
+    path = str(tmpdir.join("pipe"))
+    os.mkfifo(path)
+    lines = []
+    reader = threading.Thread(target=lambda: lines.extend(open(path, "r", newline="")))
+    reader.start()
+
+    with CsvOutput(path) as csv_output:
+        csv_output.write_row({"github_repo": "test/repo1", "forks": 1})
+        csv_output.write_row({"github_repo": "test/repo2", "forks": 2, "dockerhub_repo": "test/repo2"})
+    reader.join(5)
+
+    assert list(csv.DictReader(lines)) == [
+        {"dockerhub_repo": "", "forks": "1", "github_repo": "test/repo1"},
+        {"dockerhub_repo": "test/repo2", "forks": "2", "github_repo": "test/repo2"},
+    ]
+    assert os.listdir(str(tmpdir)) == ["pipe"]
+
+
+@pytest.mark.parametrize("extension", [".gz", ".zst"])
+def test_append_with_different_fields_to_compressed_file(tmpdir, extension):
+    path = str(tmpdir.join("test_output.csv" + extension))
+    CsvOutput(path).write([{"name": "test1", "value": "123"}])
+    CsvOutput(path, append=True).write([{"name": "test2", "value": "456"}])
+    CsvOutput(path, append=True).write([{"name": "test3", "extra_field": "789"}])
+
+    with open_file(path, "r", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [
+        {"name": "test1", "value": "123", "extra_field": ""},
+        {"name": "test2", "value": "456", "extra_field": ""},
+        {"name": "test3", "value": "", "extra_field": "789"},
+    ]
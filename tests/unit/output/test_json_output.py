@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from repo_metrics.output.compression import open_file
+from repo_metrics.output.json_output import JsonOutput
+
+
+@pytest.fixture
+def temp_file(tmpdir):
+    return tmpdir.join("test_output.json")
+
+
+@pytest.mark.parametrize("data", [[], [{"name": "test"}], [{"name": "test1", "nested": {"value": [1, 2]}}, {}]])
+def test_write_matches_json_dump(temp_file, data):
+    JsonOutput(str(temp_file)).write(data)
+
+    with open(temp_file, "r") as f:
+        assert f.read() == json.dumps(data, indent=4)
+
+
+@pytest.mark.parametrize("existing_data", [[], [{"name": "test1"}]])
+def test_append_matches_json_dump(temp_file, existing_data):
+    with open(temp_file, "w") as f:
+        json.dump(existing_data, f, indent=4)
+
+    JsonOutput(str(temp_file), append=True).write([{"name": "test2"}, {"name": "test3"}])
+
+    with open(temp_file, "r") as f:
+        assert f.read() == json.dumps(existing_data + [{"name": "test2"}, {"name": "test3"}], indent=4)
+
+
+def test_append_to_nonexistent_file(temp_file):
+    JsonOutput(str(temp_file), append=True).write([{"name": "test"}])
+
+    with open(temp_file, "r") as f:
+        assert json.load(f) == [{"name": "test"}]
+
+
+def test_append_to_non_array(temp_file):
+    with open(temp_file, "w") as f:
+        json.dump({"name": "test"}, f)
+
+    with pytest.raises(ValueError):
+        JsonOutput(str(temp_file), append=True).write([{"name": "test2"}])
+
+
+def test_stream_rows_kept_after_error(temp_file):
+    with pytest.raises(RuntimeError):
+        with JsonOutput(str(temp_file)) as json_output:
+            json_output.write_row({"name": "test1"})
+            raise RuntimeError("Failed partway through")
+
+    # The array is closed, so the rows written before the error are still readable
+    with open(temp_file, "r") as f:
+        assert json.load(f) == [{"name": "test1"}]
+
+
+@pytest.mark.parametrize("extension", [".gz", ".zst"])
+@pytest.mark.parametrize("existing_data", [[], [{"name": "test1"}]])
+def test_append_to_compressed_file(tmpdir, extension, existing_data):
+    path = str(tmpdir.join("test_output.json" + extension))
+    JsonOutput(path).write(existing_data)
+
+    JsonOutput(path, append=True).write([{"name": "test2"}])
+
+    with open_file(path, "r") as f:
+        assert f.read() == json.dumps(existing_data + [{"name": "test2"}], indent=4)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_append_to_compressed_non_array(tmpdir):
+    path = str(tmpdir.join("test_output.json.gz"))
+    with open_file(path, "w") as f:
+        json.dump({"name": "test"}, f)
+
+    with pytest.raises(ValueError):
+        JsonOutput(path, append=True).write([{"name": "test2"}])
+    assert not os.path.exists(path + ".tmp")
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from repo_metrics.output.jsonl_output import JsonLinesOutput, read_json_lines
+
+
+@pytest.fixture
+def temp_file(tmpdir):
+    return tmpdir.join("test_output.jsonl")
+
+
+def test_write_new_file(temp_file):
+    data = [{"name": "test1", "value": 123}, {"name": "test2", "value": {"nested": 456}}]
+    JsonLinesOutput(str(temp_file)).write(data)
+
+    with open(temp_file, "r") as f:
+        lines = f.readlines()
+    assert [json.loads(line) for line in lines] == data
+
+
+def test_overwrite_file(temp_file):
+    JsonLinesOutput(str(temp_file)).write([{"name": "test1"}])
+    JsonLinesOutput(str(temp_file)).write([{"name": "test2"}])
+
+    assert list(read_json_lines(str(temp_file))) == [{"name": "test2"}]
+
+
+def test_append_to_file(temp_file):
+    data1 = [{"name": "test1", "value": 123}]
+    data2 = [{"name": "test2", "other_value": 456}]
+    JsonLinesOutput(str(temp_file)).write(data1)
+    JsonLinesOutput(str(temp_file), append=True).write(data2)
+
+    assert list(read_json_lines(str(temp_file))) == data1 + data2
+
+
+def test_append_to_nonexistent_file(temp_file):
+    data = [{"name": "test", "value": 123}]
+    JsonLinesOutput(str(temp_file), append=True).write(data)
+
+    assert list(read_json_lines(str(temp_file))) == data
+
+
+def test_read_json_lines_skips_blank_lines(temp_file):
+    with open(temp_file, "w") as f:
+        f.write('{"name": "test1"}\n\n{"name": "test2"}\n')
+
+    assert list(read_json_lines(str(temp_file))) == [{"name": "test1"}, {"name": "test2"}]
+
+
+def test_stream_rows(temp_file):
+    JsonLinesOutput(str(temp_file)).write([{"name": "test1"}])
+
+    with JsonLinesOutput(str(temp_file), append=True) as jsonl_output:
+        jsonl_output.write_row({"name": "test2"})
+        assert list(read_json_lines(str(temp_file))) == [{"name": "test1"}, {"name": "test2"}]
+        jsonl_output.write_row({"name": "test3"})
+
+    assert list(read_json_lines(str(temp_file))) == [{"name": "test1"}, {"name": "test2"}, {"name": "test3"}]
+
+
+@pytest.mark.parametrize("extension", [".gz", ".zst"])
+def test_append_to_compressed_file(tmpdir, extension):
+    path = str(tmpdir.join("test_output.jsonl" + extension))
+    JsonLinesOutput(path).write([{"name": "test1"}])
+    JsonLinesOutput(path, append=True).write([{"name": "test2"}])
+
+    assert list(read_json_lines(path)) == [{"name": "test1"}, {"name": "test2"}]
@@ -0,0 +1,102 @@
+import sys
+
+import pytest
+
+from repo_metrics.output.parquet_output import ParquetOutput
+
+
+def test_missing_pyarrow(tmpdir, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    with pytest.raises(ImportError, match="repo_metrics\\[parquet\\]"):
+        ParquetOutput(str(tmpdir.join("output.parquet")))
+
+
+def test_write_new_file(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output.parquet"))
+    data = [
+        {"timestamp": "2023-10-01T00:00:00Z", "github": {"stargazers_count": 10, "name": "repo"}},
+        {"timestamp": "2023-10-02T00:00:00Z", "github": {"stargazers_count": 12, "name": "repo"}},
+    ]
+
+    ParquetOutput(path).write(data)
+
+    table = pq.read_table(path)
+    assert table.column_names == ["timestamp", "github.stargazers_count", "github.name"]
+    assert str(table.schema.field("github.stargazers_count").type) == "int64"
+    assert table.column("github.stargazers_count").to_pylist() == [10, 12]
+
+
+def test_append_to_directory(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output"))
+
+    ParquetOutput(path, append=True).write([{"name": "test1", "value": 123}])
+    ParquetOutput(path, append=True).write([{"name": "test2", "value": 456}])
+
+    partitions = tmpdir.join("output").listdir()
+    assert len(partitions) == 1
+    assert partitions[0].basename.startswith("date=")
+    assert len(partitions[0].listdir()) == 2
+    table = pq.read_table(str(partitions[0]))
+    assert sorted(table.column("value").to_pylist()) == [123, 456]
+
+
+@pytest.mark.parametrize("values", [[None, "2023-10-01T00:00:00Z"], ["2023-10-01T00:00:00Z", None]])
+def test_append_null_column_reads_as_dataset(tmpdir, values):
+    ds = pytest.importorskip("pyarrow.dataset")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output"))
+
+    # The column is null in every row of one of the appends
+    for i, value in enumerate(values):
+        ParquetOutput(path, append=True).write([{"tag": f"v{i}", "tag_last_pulled": value, "full_size": None}])
+
+    files = [str(f) for f in tmpdir.join("output").visit("*.parquet")]
+    for f in files:
+        assert str(pq.read_schema(f).field("tag_last_pulled").type) == "string"
+        assert str(pq.read_schema(f).field("full_size").type) == "string"
+    # Whichever file the dataset takes its schema from, the others can be read with it
+    for f in [files, files[::-1]]:
+        table = ds.dataset(f, format="parquet").to_table()
+        assert sorted(table.column("tag_last_pulled").to_pylist(), key=str) == ["2023-10-01T00:00:00Z", None]
+
+
+def test_append_keeps_existing_types(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output"))
+
+    ParquetOutput(path, append=True).write([{"repo": "test/repo", "clones": 10}])
+    ParquetOutput(path, append=True).write([{"repo": "test/repo", "clones": None}])
+
+    for f in tmpdir.join("output").visit("*.parquet"):
+        assert str(pq.read_schema(str(f)).field("clones").type) == "int64"
+
+
+def test_write_null_column(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output.parquet"))
+
+    ParquetOutput(path).write([{"name": "test", "value": None}])
+
+    assert str(pq.read_schema(path).field("value").type) == "string"
+
+
+def test_append_to_file(tmpdir):
+    pytest.importorskip("pyarrow")
+    path = str(tmpdir.join("output.parquet"))
+    ParquetOutput(path).write([{"name": "test1"}])
+
+    with pytest.raises(ValueError):
+        ParquetOutput(path, append=True).write([{"name": "test2"}])
+
+
+def test_compression_from_extension(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("output.parquet.zst"))
+
+    ParquetOutput(path).write([{"name": "test", "value": 1}])
+
+    assert pq.ParquetFile(path).metadata.row_group(0).column(0).compression == "ZSTD"
+    assert pq.read_table(path).to_pylist() == [{"name": "test", "value": 1}]
@@ -1,4 +1,4 @@
-from repo_metrics.output.preprocess import filter, flatten, merge
+from repo_metrics.output.preprocess import filter, flatten, flatten_batch, merge
 
 
 def test_filter_empty_fields():
@@ -66,3 +66,39 @@ def test_flatten_deeply_nested():
     result = flatten(data)
     expected = {"name": "test", "details.value": 123, "details.more_details.description": "example"}
     assert result == expected
+
+
+def test_flatten_batch_matches_flatten():
+    data = [
+        {"date_and_time": "t1", "github": {"name": "repo", "owner": {"login": "owner"}, "forks": 1}},
+        {"date_and_time": "t2", "github": {"name": "repo", "forks": 2}, "dockerhub": {"pull_count": 3}},
+        {"a.b": 1, "a": {"b": 2}},
+    ]
+    table = flatten_batch(data)
+
+    assert table.records() == [flatten(d) for d in data]
+    assert len(table) == 3
+    assert table.fieldnames == [
+        "date_and_time",
+        "github.name",
+        "github.owner.login",
+        "github.forks",
+        "dockerhub.pull_count",
+        "a.b",
+    ]
+
+
+def test_flatten_batch_rows_and_columns():
+    table = flatten_batch([{"name": "test1", "nested": {"value": 1}}, {"name": "test2", "other": None}])
+
+    assert table.rows() == [("test1", 1, None), ("test2", None, None)]
+    assert table.rows(["other", "name", "unknown"], missing="") == [("", "test1", ""), (None, "test2", "")]
+    assert table.columns() == {"name": ["test1", "test2"], "nested.value": [1, None], "other": [None, None]}
+
+
+def test_flatten_batch_empty():
+    table = flatten_batch([])
+
+    assert table.fieldnames == []
+    assert table.rows() == []
+    assert table.columns() == {}
@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+from repo_metrics.output import sqlite_output
+from repo_metrics.output.sqlite_output import SqliteOutput
+
+
+@pytest.fixture
+def temp_file(tmpdir):
+    return str(tmpdir.join("test_output.db"))
+
+
+def read_rows(path: str, table: str) -> list[dict]:
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in connection.execute(f'SELECT * FROM "{table}" ORDER BY repo, timestamp')]
+    finally:
+        connection.close()
+
+
+def test_write_new_database(temp_file):
+    data = [
+        {"repo": "owner/repo", "timestamp": "2023-10-01T00:00:00Z", "clones": 10, "unique clones": 5},
+        {"repo": "owner/repo", "timestamp": "2023-10-02T00:00:00Z", "clones": 15, "unique clones": 7},
+    ]
+    SqliteOutput(temp_file, "traffic", ["repo", "timestamp"]).write(data)
+
+    assert read_rows(temp_file, "traffic") == data
+    connection = sqlite3.connect(temp_file)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # Looking up a repo's history uses the unique index on the key
+    plan = connection.execute("EXPLAIN QUERY PLAN SELECT * FROM traffic WHERE repo = 'owner/repo'").fetchall()
+    assert "traffic_key" in plan[0][-1]
+    connection.close()
+
+
+def test_rerun_upserts(temp_file):
+    output = SqliteOutput(temp_file, "traffic", ["repo", "timestamp"])
+    output.write(
+        [
+            {"repo": "owner/repo", "timestamp": "2023-10-01T00:00:00Z", "clones": 10, "views": 20},
+            {"repo": "owner/repo", "timestamp": "2023-10-02T00:00:00Z", "clones": 3, "views": 4},
+        ]
+    )
+    # The second run sees the same window, with the second day now complete
+    output.write(
+        [
+            {"repo": "owner/repo", "timestamp": "2023-10-01T00:00:00Z", "clones": 10, "views": 20},
+            {"repo": "owner/repo", "timestamp": "2023-10-02T00:00:00Z", "clones": 15},
+            {"repo": "owner/repo", "timestamp": "2023-10-03T00:00:00Z", "clones": 1, "views": 2},
+        ]
+    )
+
+    assert read_rows(temp_file, "traffic") == [
+        {"repo": "owner/repo", "timestamp": "2023-10-01T00:00:00Z", "clones": 10, "views": 20},
+        # Columns a row doesn't have are left as they were
+        {"repo": "owner/repo", "timestamp": "2023-10-02T00:00:00Z", "clones": 15, "views": 4},
+        {"repo": "owner/repo", "timestamp": "2023-10-03T00:00:00Z", "clones": 1, "views": 2},
+    ]
+
+
+def test_new_columns_and_nested_data(temp_file):
+    output = SqliteOutput(temp_file, "get", ["repo", "timestamp"])
+    output.write([{"repo": "owner/repo", "timestamp": "t1", "github": {"forks": 1}}])
+    output.write([{"repo": "owner/repo", "timestamp": "t2", "github": {"forks": 2, "topics": ["a", "b"]}}])
+
+    assert read_rows(temp_file, "get") == [
+        {"repo": "owner/repo", "timestamp": "t1", "github.forks": 1, "github.topics": None},
+        {"repo": "owner/repo", "timestamp": "t2", "github.forks": 2, "github.topics": '["a", "b"]'},
+    ]
+
+
+def test_missing_key_values(temp_file):
+    output = SqliteOutput(temp_file, "traffic", ["repo", "timestamp"])
+    output.write([{"timestamp": "t1", "clones": 1}])
+    output.write([{"timestamp": "t1", "clones": 2}])
+
+    assert read_rows(temp_file, "traffic") == [{"repo": "", "timestamp": "t1", "clones": 2}]
+
+
+def test_stream_rows(temp_file):
+    with SqliteOutput(temp_file, "traffic", ["repo", "timestamp"]) as output:
+        output.write_row({"repo": "owner/repo", "timestamp": "t1", "clones": 1})
+        output.write_row({"repo": "owner/repo", "timestamp": "t2", "clones": 2})
+
+    assert read_rows(temp_file, "traffic") == [
+        {"repo": "owner/repo", "timestamp": "t1", "clones": 1},
+        {"repo": "owner/repo", "timestamp": "t2", "clones": 2},
+    ]
+
+
+def test_stream_rows_in_batches(temp_file, monkeypatch):
+    monkeypatch.setattr(sqlite_output, "BATCH_SIZE", 2)
+
+    with SqliteOutput(temp_file, "traffic", ["repo", "timestamp"]) as output:
+        output.write_row({"repo": "owner/repo", "timestamp": "t1", "clones": 1})
+        output.write_row({"repo": "owner/repo", "timestamp": "t2", "clones": 2})
+        # A full batch is in the database before the output is closed
+        assert len(read_rows(temp_file, "traffic")) == 2
+        # Later batches can add columns
+        output.write_row({"repo": "owner/repo", "timestamp": "t3", "views": 3})
+
+    assert read_rows(temp_file, "traffic") == [
+        {"repo": "owner/repo", "timestamp": "t1", "clones": 1, "views": None},
+        {"repo": "owner/repo", "timestamp": "t2", "clones": 2, "views": None},
+        {"repo": "owner/repo", "timestamp": "t3", "clones": None, "views": 3},
+    ]
@@ -0,0 +1,8 @@
+import repo_metrics
+from repo_metrics import log
+
+
+def test_module_name_width_fits_all_modules():
+    module_names = log.get_dot_separated_submodule_names(repo_metrics)
+
+    assert log.MODULE_NAME_WIDTH == max(len(name) for name in module_names)
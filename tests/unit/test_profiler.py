@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+from repo_metrics.output import JsonLinesOutput, read_json_lines
+from repo_metrics.profiler import Profiler, get_endpoint
+
+
+@pytest.mark.parametrize(
+    "method, url, expected",
+    [
+        (
+            "GET",
+            "https://api.github.com/repos/owner/repo/releases?page=2",
+            "GET api.github.com/repos/{owner}/{repo}/releases",
+        ),
+        ("GET", "https://api.github.com/users/owner/installation", "GET api.github.com/users/{owner}/installation"),
+        (
+            "POST",
+            "https://api.github.com/app/installations/123/access_tokens",
+            "POST api.github.com/app/installations/{id}/access_tokens",
+        ),
+        ("GET", "https://api.github.com/installation/repositories", "GET api.github.com/installation/repositories"),
+        (
+            "GET",
+            "https://hub.docker.com/v2/repositories/owner/repo",
+            "GET hub.docker.com/v2/repositories/{namespace}/{repo}",
+        ),
+    ],
+)
+def test_get_endpoint(method, url, expected):
+    assert get_endpoint(method, url) == expected
+
+
+def test_attach_records_requests(requests_mock):
+    requests_mock.get("https://api.github.com/repos/owner/repo1", text="a" * 10)
+    requests_mock.get("https://api.github.com/repos/owner/repo2", status_code=404, text="b" * 5)
+    requests_mock.get("https://api.github.com/repos/owner/repo3", status_code=304)
+    session = requests.Session()
+    profiler = Profiler()
+    profiler.attach(session)
+    # Attaching twice doesn't record requests twice
+    profiler.attach(session)
+
+    session.get("https://api.github.com/repos/owner/repo1")
+    session.get("https://api.github.com/repos/owner/repo2", headers={"If-None-Match": '"etag"'})
+    session.get("https://api.github.com/repos/owner/repo3", headers={"If-None-Match": '"etag"'})
+
+    summary = profiler.get_summary()
+    assert summary["requests"] == {"count": 3, "bytes": 15, "cache_hits": 1, "cache_misses": 1}
+    endpoint = summary["endpoints"]["GET api.github.com/repos/{owner}/{repo}"]
+    assert endpoint["count"] == 3
+    assert endpoint["statuses"] == {"200": 1, "304": 1, "404": 1}
+    assert endpoint["latency_p50"] <= endpoint["latency_p95"]
+
+
+def test_wrap_output_records_time(tmpdir):
+    path = str(tmpdir.join("output.jsonl"))
+    profiler = Profiler()
+
+    with profiler.wrap_output(JsonLinesOutput(path)) as output:
+        output.write_row({"name": "test1"})
+        output.write_row({"name": "test2"})
+
+    assert list(read_json_lines(path)) == [{"name": "test1"}, {"name": "test2"}]
+    summary = profiler.get_summary()
+    # The open, each row and the close
+    assert summary["output"]["calls"] == 4
+    assert summary["output"]["time"] > 0